@@ -25,6 +25,13 @@ target_metadata = None
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Ulanish ilova bilan bir xil: .env dagi DATABASE_* (alembic.ini dagi namuna URL o'rniga).
+# Migratsiyalar xom SQL bilan yoziladi, modellar Tortoise da - autogenerate ishlatilmaydi.
+if config.get_main_option("sqlalchemy.url", "").startswith("driver://"):
+    from app.database import DATABASE_URL
+
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("sqlite://", "sqlite:///", 1))
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
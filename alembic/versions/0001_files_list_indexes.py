@@ -0,0 +1,56 @@
+"""files: GET /files filter va saralash shakllari uchun tarkibiy indekslar
+
+Indekslar ``app.models.file.File.Meta.indexes`` dagi ``ListIndex`` lar bilan bir xil
+(nom va ustunlar): yangi bazada ``generate_schemas`` ularni o'zi yaratadi, mavjud
+bazada shu migratsiya. Postgres da ``CREATE INDEX CONCURRENTLY`` - katta jadvalga
+yozish bloklanmaydi (shuning uchun tranzaksiyadan tashqarida).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nom, ustunlar, qisman indeks sharti)
+INDEXES = [
+    ("files_date_id_idx", ("date", "id"), None),
+    ("files_name_id_idx", ("name", "id"), None),
+    ("files_size_id_idx", ("size", "id"), None),
+    ("files_format_id_idx", ("format", "id"), None),
+    ("files_format_date_id_idx", ("format", "date", "id"), None),
+    ("files_format_name_id_idx", ("format", "name", "id"), None),
+    ("files_format_size_id_idx", ("format", "size", "id"), None),
+    ("files_private_date_id_idx", ("date", "id"), "public"),
+    ("files_unshared_date_id_idx", ("date", "id"), "shareable"),
+]
+
+
+def upgrade() -> None:
+    postgres = op.get_bind().dialect.name == "postgresql"
+    # Shart ORM so'rovidagi kabi yozilishi kerak, aks holda qisman indeks tanlanmaydi
+    false = "false" if postgres else "0"
+    concurrently = "CONCURRENTLY " if postgres else ""
+    with op.get_context().autocommit_block():
+        for name, columns, false_column in INDEXES:
+            where = f' WHERE "{false_column}" = {false}' if false_column else ""
+            fields = ", ".join(f'"{column}"' for column in columns)
+            op.execute(sa.text(f'CREATE INDEX {concurrently}IF NOT EXISTS "{name}" ON "files" ({fields}){where}'))
+
+
+def downgrade() -> None:
+    postgres = op.get_bind().dialect.name == "postgresql"
+    concurrently = "CONCURRENTLY " if postgres else ""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(sa.text(f'DROP INDEX {concurrently}IF EXISTS "{name}"'))
@@ -0,0 +1,73 @@
+"""blobs, upload_sessions, upload_chunks: hash bo'yicha saqlash va qismlab yuklash jadvallari
+
+Yangi bazada jadvallarni ``generate_schemas`` yaratadi; seriyadan oldingi bazada ular
+yo'q, shuning uchun ``0002`` (``blobs.codec``) dan oldin shu migratsiya. Jadvallar
+``codec`` siz (``0002`` qo'shadi) va ``IF NOT EXISTS`` bilan: ilova oldin ishga tushib
+ularni yaratgan bo'lsa ham migratsiya o'tadi. Nomlar (unique, indeks) Tortoise niki bilan
+bir xil. Mavjud fayllar uchun blob yozuvlari ``python manage.py migrate_blobs`` bilan.
+
+Revision ID: 0001b
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001b"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _types(postgres: bool) -> dict:
+    if postgres:
+        return {"pk": "SERIAL NOT NULL PRIMARY KEY", "ts": "TIMESTAMPTZ", "uuid": "UUID", "bool": "BOOL", "false": "FALSE"}
+    return {"pk": "INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL", "ts": "TIMESTAMP", "uuid": "CHAR(36)", "bool": "INT", "false": "0"}
+
+
+def upgrade() -> None:
+    t = _types(op.get_bind().dialect.name == "postgresql")
+    statements = [
+        f'''CREATE TABLE IF NOT EXISTS "blobs" (
+            "id" {t["pk"]},
+            "hash_code" VARCHAR(255) NOT NULL UNIQUE,
+            "path" VARCHAR(255) NOT NULL,
+            "size" INT NOT NULL,
+            "ref_count" INT NOT NULL DEFAULT 0,
+            "created_at" {t["ts"]} NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )''',
+        f'''CREATE TABLE IF NOT EXISTS "upload_sessions" (
+            "id" {t["uuid"]} NOT NULL PRIMARY KEY,
+            "name" VARCHAR(255) NOT NULL,
+            "format" VARCHAR(50) NOT NULL,
+            "size" INT NOT NULL,
+            "chunk_size" INT NOT NULL,
+            "temp_path" VARCHAR(255) NOT NULL,
+            "nonce_prefix" VARCHAR(32) NOT NULL,
+            "key_id" VARCHAR(64) NOT NULL,
+            "status" VARCHAR(20) NOT NULL DEFAULT 'open',
+            "created_at" {t["ts"]} NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS "idx_upload_sess_created_e67c5e" ON "upload_sessions" ("created_at")',
+        f'''CREATE TABLE IF NOT EXISTS "upload_chunks" (
+            "id" {t["pk"]},
+            "number" INT NOT NULL,
+            "hash_code" VARCHAR(64) NOT NULL,
+            "size" INT NOT NULL,
+            "complete" {t["bool"]} NOT NULL DEFAULT {t["false"]},
+            "session_id" {t["uuid"]} NOT NULL REFERENCES "upload_sessions" ("id") ON DELETE CASCADE,
+            CONSTRAINT "uid_upload_chun_session_57889c" UNIQUE ("session_id", "number")
+        )''',
+    ]
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def downgrade() -> None:
+    for table in ("upload_chunks", "upload_sessions", "blobs"):
+        op.execute(sa.text(f'DROP TABLE IF EXISTS "{table}"'))
@@ -0,0 +1,53 @@
+"""files, blobs: shifrlashdan oldingi siqish kodeki
+
+Mavjud yozuvlar siqilmagan (``identity``). Yangi bazada ustunni ``generate_schemas``
+yaratadi (``File.codec``, ``Blob.codec``), mavjud bazada shu migratsiya. Ustun bor
+bo'lsa (ilova ``blobs`` ni oldin yaratgan) o'tkazib yuboriladi, qayta ishga tushirish xavfsiz.
+
+Revision ID: 0002
+Revises: 0001b
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("files", "blobs")
+
+
+def _has_codec(inspector, table: str) -> bool:
+    return "codec" in {column["name"] for column in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    postgres = bind.dialect.name == "postgresql"
+    inspector = sa.inspect(bind)
+    for table in TABLES:
+        if postgres:
+            op.execute(sa.text(
+                f"ALTER TABLE \"{table}\" ADD COLUMN IF NOT EXISTS \"codec\" VARCHAR(16) NOT NULL DEFAULT 'identity'"
+            ))
+        elif not _has_codec(inspector, table):
+            # SQLite da ADD COLUMN IF NOT EXISTS yo'q
+            op.execute(sa.text(f"ALTER TABLE \"{table}\" ADD COLUMN \"codec\" VARCHAR(16) NOT NULL DEFAULT 'identity'"))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    postgres = bind.dialect.name == "postgresql"
+    inspector = sa.inspect(bind)
+    for table in reversed(TABLES):
+        if postgres:
+            op.execute(sa.text(f'ALTER TABLE "{table}" DROP COLUMN IF EXISTS "codec"'))
+        elif _has_codec(inspector, table):
+            op.execute(sa.text(f'ALTER TABLE "{table}" DROP COLUMN "codec"'))
@@ -0,0 +1,46 @@
+"""files: nom bo'yicha qidiruv uchun pg_trgm va tsvector GIN indekslari (Postgres)
+
+Avval ``init_search()`` ularni ilova ishga tushganda oddiy ``CREATE INDEX`` bilan
+yaratardi - katta jadval yozish uchun bloklanardi. Endi ``CREATE INDEX CONCURRENTLY``
+(tranzaksiyadan tashqarida), ``init_search()`` esa faqat indekslar borligini tekshiradi.
+Ifodalar ``app.utils.search`` dagi so'rovlar bilan aynan bir xil bo'lishi kerak, aks
+holda indeks tanlanmaydi. SQLite da FTS5 jadvallarini ilova o'zi yaratadi.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("files_name_trgm_idx", "lower(name) gin_trgm_ops"),
+    ("files_name_tsv_idx", "to_tsvector('simple', regexp_replace(name, '[^[:alnum:]]+', ' ', 'g'))"),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    with op.get_context().autocommit_block():
+        for name, expression in INDEXES:
+            op.execute(sa.text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "files" USING gin ({expression})'))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(sa.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
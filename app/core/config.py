@@ -1,13 +1,107 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, List, Literal, Optional
 
 class Settings(BaseSettings):
     testing: bool = False
     redis_url: str = "redis://localhost"
+    # JWT: kalitlar to'plami (JSON: {"kid": "maxfiy kalit"}; bo'sh bo'lsa jwt_secret_key "default" kid bilan),
+    # yangi tokenlarni imzolovchi kid (standart - birinchisi) va token muddati
+    jwt_keys: Dict[str, str] = {}
+    jwt_active_kid: Optional[str] = None
+    jwt_secret_key: str = "your-secret-key-keep-it-secret"
+    jwt_algorithm: str = "HS256"
+    jwt_expire_minutes: int = 60
+    # Tekshirilgan tokenlar keshi (worker ichida): bekor qilish boshqa workerlarda shu TTL ichida kuchga kiradi
+    jwt_cache_size: int = 4096
+    jwt_cache_ttl_seconds: float = 30
+    # Redis xatosidan keyin shuncha vaqt denylist so'ralmaydi (sekund)
+    jwt_denylist_retry_seconds: float = 5
+    # Fayllarni shifrlash kalitlari (Fernet formatida, birinchisi faol): ENCRYPTION_KEYS (JSON ro'yxat),
+    # avvalgi yagona FERNET_KEY yoki (ikkalasi ham berilmasa) barcha workerlar uchun umumiy kalit fayli
+    # (standart - manba papkasidan tashqarida, foydalanuvchi uy papkasida)
+    encryption_keys: List[str] = []
+    fernet_key: str = ""
+    encryption_key_file: str = "~/.config/fastapi-file-server/encryption.json"
+    # Kalit fayli o'zgarishi (rotatsiya) shu oraliqda tekshiriladi (sekund)
+    encryption_key_reload_seconds: float = 5
+    # Rate limit backend: "redis" (umumiy, sobit oyna), "local" (worker ichida) yoki "hybrid"
+    rate_limit_backend: Literal["redis", "local", "hybrid"] = "redis"
+    # hybrid: qabul qilinganlar Redis ga shu oraliqda yuboriladi (ms)
+    rate_limit_sync_interval_ms: int = 100
+    # Redis xatosidan keyin shuncha vaqt lokal limitlar ishlatiladi (sekund)
+    rate_limit_retry_seconds: float = 5
+
+    # Bir nechta node (DB umumiy, disklar alohida): shu node id si (files.server) va boshqa nodelar
+    # (JSON: {"node-b": "http://10.0.0.2:8000"}); blob lokal bo'lmasa egasidan olinadi
+    node_id: str = "localhost"
+    peers: Dict[str, str] = {}
+    # Boshqa nodelardan olingan bloblar keshi (to'lsa eng eski ishlatilgani chiqariladi)
+    peer_cache_dir: str = "app/uploaded_files/peer_cache"
+    peer_cache_max_bytes: int = 1024 * 1024 * 1024
+    peer_fetch_timeout_seconds: float = 30
+
+    # Public fayllar uchun Cache-Control max-age (sekund)
+    download_cache_max_age: int = 86400
+
+    # Hash va shifrlash uchun thread hovuzi (0 - event loop ichida inline)
+    cpu_executor_workers: int = 4
+    # Hovuzda kutayotgan ishlar soni chegarasi (undan oshsa yangi ishlar kutadi)
+    cpu_executor_max_queue: int = 64
+
+    # Disk I/O (o'qish, yozish, fsync, rename, delete) uchun alohida thread hovuzi
+    io_executor_workers: int = 8
+    io_executor_max_queue: int = 256
+    # fsync siyosati: "none", "per-file" yoki "batched" (bir necha faylni bitta guruhda)
+    fsync_policy: Literal["none", "per-file", "batched"] = "per-file"
+    # "batched" rejimida guruh yig'ish oynasi (millisekund)
+    fsync_batch_interval_ms: int = 5
+
+    # Audit log (JSONL segmentlar) va fon yozuvchi sozlamalari
+    audit_log_dir: str = "app/audit_log"
+    audit_segment_max_bytes: int = 16 * 1024 * 1024
+    audit_batch_size: int = 256
+    audit_flush_interval_ms: int = 200
+
+    # Qismlab (resumable) yuklash: qism hajmi shifrlash segmentiga (64KB) karrali bo'lishi kerak
+    upload_chunk_size: int = 4 * 1024 * 1024
+    # Qismlab yuklanadigan fayl hajmi chegarasi (files.size 32-bit butun son)
+    resumable_max_file_size: int = 1024 * 1024 * 1024
+    # Yakunlanmagan sessiya shu vaqtdan keyin o'chiriladi (sekund)
+    upload_session_ttl_seconds: int = 86400
+
+    # GET /files va GET /files/{id} uchun Redis metadata keshi (yozuvlarda versiya bilan eskiradi)
+    metadata_cache_enabled: bool = True
+    metadata_cache_file_ttl_seconds: int = 300
+    metadata_cache_list_ttl_seconds: int = 60
+
+    # Ommaviy endpointlar: bitta so'rovdagi fayllar (yuklash) va yozuvlar (o'chirish/yangilash) chegarasi
+    batch_max_files: int = 100
+    batch_max_items: int = 1000
+
+    # Decrypt qilingan kichik fayllar uchun worker ichidagi LRU kesh (0 - o'chirilgan)
+    content_cache_max_bytes: int = 32 * 1024 * 1024
+    content_cache_max_file_size: int = 1024 * 1024
+
+    # Shifrlashdan oldin siqish (text/plain, .doc): "auto" - zstd bo'lsa zstd, aks holda gzip
+    compression_codec: Literal["auto", "zstd", "gzip", "none"] = "auto"
+    # Namuna shu nisbatdan ko'proq kichraymasa fayl siqilmasdan saqlanadi
+    compression_min_ratio: float = 0.9
+
+    # So'rov bosqichlari: Server-Timing header (ichki nomlarni ko'rsatadi - faqat debug uchun)
+    # va app.timing JSON logi (shu vaqtdan sekinlari, ms)
+    server_timing_enabled: bool = False
+    request_log_threshold_ms: float = 500
+    # Namunaviy stek profili: so'rovlar ulushi (0 - o'chirilgan), chegarasi va namuna oralig'i (ms)
+    profile_sample_rate: float = 0.0
+    profile_threshold_ms: float = 500
+    profile_interval_ms: float = 5
+    profile_dir: str = "app/profiles"
     
     class Config:
         env_file = ".env"
+        extra = "ignore"
 
 @lru_cache()
 def get_settings():
-    return Settings()
\ No newline at end of file
+    return Settings()
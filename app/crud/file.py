@@ -1,43 +1,341 @@
 from tortoise.transactions import in_transaction
-from app.models.file import File
-from app.schemas.file import FileCreate, FileUpdate, PaginationParams, FileResponse, SortField, SortOrder
-import hashlib
-from typing import Optional, List, Tuple
+from tortoise import connections
+from tortoise.expressions import F, Q
+from tortoise.functions import Min
+from app.models.file import File, Blob
+from app.schemas.file import (
+    FileCreate, FileUpdate, PaginationParams, FileResponse, SortField, SortOrder, CountMode, BatchFilter
+)
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.search import apply_search
+from app.utils.cache import get_metadata_cache
+from app.utils.content_cache import get_content_cache
+from app.utils.metrics import query_part, record_upload, timed_query, timed_query_parts
+from app.utils.peers import get_peer_fetcher
+from app.core.config import get_settings
+from collections import Counter
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Iterable, Optional, List, Tuple
+import asyncio
+import json
+import logging
 import math
 import os
+import weakref
+from app.utils import storage
 
+logger = logging.getLogger(__name__)
 
+# Bir hash ustidagi yuklash va o'chirishni jarayon ichida ketma-ket bajarish:
+# aks holda o'chirish fizik faylni yangi yuklash uni qayta yozgandan keyin olib tashlashi mumkin
+_blob_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _blob_lock(hash_code: str) -> asyncio.Lock:
+    lock = _blob_locks.get(hash_code)
+    if lock is None:
+        lock = _blob_locks[hash_code] = asyncio.Lock()
+    return lock
+
+
+@asynccontextmanager
+async def _blob_locks_held(hash_codes: Iterable[str]):
+    """Bir nechta hash qulfini olish (doim bir xil tartibda - o'zaro kutib qolmaslik uchun)"""
+    async with AsyncExitStack() as stack:
+        for hash_code in sorted(set(hash_codes)):
+            await stack.enter_async_context(_blob_lock(hash_code))
+        yield
+
+
+@timed_query
 async def get_file_by_hash(hash_code: str):
     return await File.filter(hash_code=hash_code).first()
 
 
+@timed_query
 async def get_file_by_id(file_id: int) -> Optional[File]:
     """ID bo'yicha fayl olish"""
     return await File.filter(id=file_id).first()
 
 
-async def create_file(file: FileCreate):
-    async with in_transaction() as connection:
-        db_file = File(**file.dict())
-        await db_file.save(using_db=connection)
-        return db_file
+@timed_query
+async def get_file_by_saved_name(saved_name: str) -> Optional[File]:
+    """Saqlangan nom bo'yicha fayl olish (dublikatlar bir xil nom va hashga ega)"""
+    return await File.filter(saved_name=saved_name).order_by("id").first()
+
+
+@timed_query
+async def get_files_by_ids(file_ids: List[int]) -> List[File]:
+    """ID lar bo'yicha fayllar (so'ralgan tartibda, topilmaganlari tashlab ketiladi)"""
+    files = {file.id: file for file in await File.filter(id__in=file_ids)}
+    return [files[file_id] for file_id in dict.fromkeys(file_ids) if file_id in files]
+
+
+@timed_query
+async def get_files_by_url_date(date: str, legacy_folder: str) -> List[File]:
+    """
+    URL dagi sanasi ``date`` (YYYY-MM-DD) bo'lgan fayllar: saqlash nomi shu kun bilan boshlanadi
+    yoki (eski yozuvlar) fayl shu kunning papkasida turadi.
+    """
+    stamp = date.replace("-", "")
+    return list(await File.filter(
+        Q(saved_name__startswith=stamp) | Q(path__startswith=legacy_folder + os.sep)
+    ).order_by("id"))
+
+
+@timed_query
+async def get_blob_by_hash(hash_code: str) -> Optional[Blob]:
+    return await Blob.filter(hash_code=hash_code).first()
+
+
+@timed_query
+async def get_servers_by_hash(hash_code: str) -> List[str]:
+    """Shu hashdagi yozuvlarni yuklagan (blob nusxasi bo'lishi mumkin bo'lgan) nodelar"""
+    return list(dict.fromkeys(
+        await File.filter(hash_code=hash_code).order_by("id").values_list("server", flat=True)
+    ))
+
+
+@timed_query
+async def mark_used_by_other_servers(hash_code: str):
+    """Blob boshqa node tomonidan olingan: shu hashdagi yozuvlarni belgilash"""
+    updated = await File.filter(hash_code=hash_code, is_used_by_other_servers=False).update(
+        is_used_by_other_servers=True
+    )
+    if updated:
+        await get_metadata_cache().invalidate()
+
+
+async def _reference_existing_blob(file: FileCreate, connection) -> Optional[File]:
+    """
+    Hash bo'yicha mavjud blobga ishora qiluvchi yozuv yaratish (``ref_count`` oshiriladi).
+
+    Yangi yozuv mavjud faylning saqlash nomi, yo'li, kodeki va serverini (blob nusxasi
+    o'sha nodeda) oladi. Blob yo'q bo'lsa yoki
+    hajm mos kelmasa None qaytaradi. Chaqiruvchi hash qulfi va tranzaksiya ichida bo'lishi kerak.
+    """
+    blob = await Blob.filter(hash_code=file.hash_code).using_db(connection).select_for_update().first()
+    # files.hash_code indeksi bo'yicha
+    existing = await File.filter(hash_code=file.hash_code).using_db(connection).order_by("id").first()
+    if blob is None and existing is not None:
+        # Blob jadvalidan oldingi yozuvlar: mavjud faylni blob sifatida qabul qilish
+        references = await File.filter(path=existing.path).using_db(connection).count()
+        blob = await Blob.create(
+            hash_code=file.hash_code, path=existing.path, size=existing.size, codec=existing.codec,
+            ref_count=references, using_db=connection
+        )
+    if blob is None or blob.size != file.size:
+        return None
+
+    await Blob.filter(id=blob.id).using_db(connection).update(ref_count=F("ref_count") + 1)
+    data = file.dict()
+    data["path"] = blob.path
+    data["codec"] = blob.codec
+    if existing is not None:
+        data["saved_name"] = existing.saved_name
+        data["server"] = existing.server
+    return await File.create(**data, using_db=connection)
+
+
+@timed_query_parts
+async def add_file_reference(file: FileCreate, temp_file: storage.TempFile) -> Tuple[File, bool]:
+    """
+    Yuklangan fayl uchun yozuv yaratish va blobga ishorani qo'shish.
+
+    Hash bo'yicha blob mavjud bo'lsa ``ref_count`` oshiriladi, vaqtinchalik fayl
+    o'chiriladi va yangi yozuv mavjud faylning saqlash nomi va yo'lini oladi.
+    Aks holda vaqtinchalik fayl ``file.path`` ga ko'chiriladi va blob yaratiladi.
+    Blob va yozuv bitta tranzaksiyada o'zgaradi.
+
+    Returns:
+        Tuple[File, bool]: (yaratilgan yozuv, dublikatmi)
+    """
+    async with _blob_lock(file.hash_code):
+        committed = False
+        try:
+            async with in_transaction() as connection:
+                with query_part("dedup_lookup"):
+                    db_file = await _reference_existing_blob(file, connection)
+                duplicate = db_file is not None
+                if not duplicate:
+                    await storage.ensure_dir(os.path.dirname(file.path))
+                    await temp_file.commit(file.path)
+                    committed = True
+                    with query_part("insert"):
+                        await Blob.create(
+                            hash_code=file.hash_code, path=file.path, size=file.size, codec=file.codec,
+                            ref_count=1, using_db=connection
+                        )
+                        db_file = await File.create(**file.dict(), using_db=connection)
+        except BaseException:
+            # Tranzaksiya bekor bo'ldi: yangi ko'chirilgan faylga hech kim ishora qilmaydi
+            if committed:
+                await storage.remove_file(file.path)
+            else:
+                await temp_file.discard()
+            raise
+
+    if duplicate:
+        await temp_file.discard()
+    record_upload(duplicate)
+    await get_metadata_cache().invalidate()
+    return db_file, duplicate
+
+
+@timed_query_parts
+async def add_reference_by_hash(file: FileCreate) -> Optional[File]:
+    """
+    Tarkib yuborilmasdan, faqat hash va hajm bo'yicha mavjud blobga yozuv qo'shish.
+
+    Returns:
+        Optional[File]: yaratilgan yozuv; blob topilmasa None (fayl yuklanishi kerak)
+    """
+    async with _blob_lock(file.hash_code):
+        with query_part("dedup_lookup"):
+            async with in_transaction() as connection:
+                db_file = await _reference_existing_blob(file, connection)
+    if db_file is not None:
+        record_upload(duplicate=True)
+        await get_metadata_cache().invalidate()
+    return db_file
+
+
+@timed_query_parts
+async def add_file_references(items: List[Tuple[FileCreate, storage.TempFile]]) -> List[Tuple[File, bool]]:
+    """
+    Bir nechta yuklangan fayl uchun yozuvlarni bitta tranzaksiyada qo'shish.
+
+    Qoidalar ``add_file_reference`` dagidek: mavjud blobga ishora qilinadi yoki vaqtinchalik
+    fayl yangi blob bo'ladi. Partiya ichidagi bir xil tarkibli fayllar bitta blobni ulashadi.
+    Bloblar va yozuvlar ``bulk_create`` bilan (bittadan INSERT) qo'shiladi, mavjud bloblarning
+    ``ref_count`` i hash boshiga bitta UPDATE bilan oshiriladi.
+
+    Returns:
+        List[Tuple[File, bool]]: kirish tartibida (yozuv, dublikatmi); yozuvlarning ``id`` si to'ldirilmaydi
+    """
+    hashes = sorted({file.hash_code for file, _ in items})
+    committed = []
+    committed_temps = []
+    async with _blob_locks_held(hashes):
+        try:
+            async with in_transaction() as connection:
+                with query_part("dedup_lookup"):
+                    blobs = {
+                        blob.hash_code: blob
+                        for blob in await Blob.filter(hash_code__in=hashes).using_db(connection).select_for_update()
+                    }
+                    # Har bir hash bo'yicha birinchi yozuv: dublikatlar uning saqlash nomini oladi
+                    first_ids = await File.filter(hash_code__in=hashes).using_db(connection).annotate(
+                        first_id=Min("id")
+                    ).group_by("hash_code").values_list("first_id", flat=True)
+                    first_rows = {
+                        row.hash_code: row for row in await File.filter(id__in=list(first_ids)).using_db(connection)
+                    }
+                    for hash_code, existing in first_rows.items():
+                        if hash_code not in blobs:
+                            # Blob jadvalidan oldingi yozuvlar: mavjud faylni blob sifatida qabul qilish
+                            references = await File.filter(path=existing.path).using_db(connection).count()
+                            blobs[hash_code] = await Blob.create(
+                                hash_code=hash_code, path=existing.path, size=existing.size, codec=existing.codec,
+                                ref_count=references, using_db=connection
+                            )
 
+                rows, results, new_blobs, increments = [], [], {}, Counter()
+                for file, temp_file in items:
+                    data = file.dict()
+                    blob = new_blobs.get(file.hash_code) or blobs.get(file.hash_code)
+                    duplicate = blob is not None and blob.size == file.size
+                    if duplicate:
+                        if file.hash_code in new_blobs:
+                            blob.ref_count += 1
+                        else:
+                            increments[blob.id] += 1
+                        data["path"] = blob.path
+                        data["codec"] = blob.codec
+                        if file.hash_code in first_rows:
+                            data["saved_name"] = first_rows[file.hash_code].saved_name
+                            data["server"] = first_rows[file.hash_code].server
+                    else:
+                        await storage.ensure_dir(os.path.dirname(file.path))
+                        await temp_file.commit(file.path)
+                        committed.append(file.path)
+                        committed_temps.append(temp_file)
+                        new_blobs[file.hash_code] = Blob(
+                            hash_code=file.hash_code, path=file.path, size=file.size, codec=file.codec, ref_count=1
+                        )
+                    row = File(**data)
+                    first_rows.setdefault(file.hash_code, row)
+                    rows.append(row)
+                    results.append((row, duplicate))
 
+                with query_part("insert"):
+                    if new_blobs:
+                        await Blob.bulk_create(list(new_blobs.values()), using_db=connection)
+                    for blob_id, count in increments.items():
+                        await Blob.filter(id=blob_id).using_db(connection).update(ref_count=F("ref_count") + count)
+                    await File.bulk_create(rows, using_db=connection)
+        except BaseException:
+            # Tranzaksiya bekor bo'ldi: ko'chirilgan fayllarga hech kim ishora qilmaydi
+            for path in committed:
+                await storage.remove_file(path)
+            for _, temp_file in items:
+                if not any(temp_file is done for done in committed_temps):
+                    await temp_file.discard()
+            raise
+
+    for (file, temp_file), (_, duplicate) in zip(items, results):
+        if duplicate:
+            await temp_file.discard()
+        record_upload(duplicate)
+    await get_metadata_cache().invalidate()
+    return results
+
+
+async def _estimate_count(query) -> int:
+    """
+    Jami sonni rejalashtiruvchi bahosidan olish (Postgres, ``EXPLAIN``), jadvalni skan qilmasdan.
+
+    Baho qo'llab-quvvatlanmaydigan DB larda (SQLite) aniq ``COUNT(*)`` qaytariladi.
+    """
+    connection = connections.get("default")
+    if connection.capabilities.dialect != "postgres":
+        return await query.count()
+    rows = await connection.execute_query_dict(f"EXPLAIN (FORMAT JSON) {query.sql()}")
+    plan = rows[0]["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+@timed_query
 async def get_files(
     params: PaginationParams
-) -> Tuple[List[File], int]:
+) -> Tuple[List[File], Optional[int], Optional[str], Optional[str]]:
     """
     Fayllarni pagination, filtering va sorting bilan olish
-    
+
+    ``params.cursor`` berilsa keyset pagination: ``(sort_field, id)`` bo'yicha kursordan
+    keyingi (yoki oldingi) yozuvlar olinadi, OFFSET yo'q - chuqur sahifalar ham birinchi
+    sahifa kabi tez. Aks holda eski ``page`` (OFFSET) rejimi. Ikkala rejimda ham
+    ``next``/``prev`` kursorlar qaytariladi.
+
+    Raises:
+        InvalidCursor: kursor buzilgan yoki saralash tartibiga mos emas
+
     Returns:
-        Tuple[List[File], int]: (fayllar ro'yxati, jami soni)
+        Tuple[List[File], Optional[int], Optional[str], Optional[str]]:
+        (fayllar ro'yxati, jami soni yoki None, keyingi kursor, oldingi kursor)
     """
+    sort_field = params.sort_by.value if params.sort_by else "date"
+
     # Base query
     query = File.all()
     
-    # Qidiruv (fayl nomi bo'yicha)
+    # Qidiruv (fayl nomi bo'yicha, trigram / FTS indeksi orqali)
     if params.search:
-        query = query.filter(name__icontains=params.search)
+        query = apply_search(
+            query, params.search, params.search_mode.value, with_relevance=sort_field == SortField.relevance.value
+        )
     
     # Format bo'yicha filter
     if params.format:
@@ -52,22 +350,57 @@ async def get_files(
         query = query.filter(public=params.public)
     
     # Jami soni
-    total = await query.count()
-    
-    # Sorting
-    sort_field = params.sort_by.value if params.sort_by else "date"
-    if params.sort_order and params.sort_order == SortOrder.desc:
-        sort_field = f"-{sort_field}"
-    
-    query = query.order_by(sort_field)
+    if params.count == CountMode.exact:
+        total = await query.count()
+    elif params.count == CountMode.estimate:
+        total = await _estimate_count(query)
+    else:
+        total = None
     
-    # Pagination
-    offset = (params.page - 1) * params.page_size
-    files = await query.offset(offset).limit(params.page_size)
+    # Sorting (id - bir xil qiymatlar uchun barqaror tartib va kursor kaliti)
+    descending = params.sort_order == SortOrder.desc
+    sort_order = SortOrder.desc.value if descending else SortOrder.asc.value
+    backward = False
+
+    if params.cursor:
+        cursor = decode_cursor(params.cursor, sort_field, sort_order)
+        backward = cursor["d"] == "prev"
+        # Kamayish tartibida oldinga yurish (yoki o'sishda orqaga) - kichikroq qiymatlar
+        op = "lt" if descending != backward else "gt"
+        value = cursor["v"]
+        # Birinchi shart indeks oralig'ini cheklaydi, ikkinchisi teng qiymatlarni id bo'yicha ajratadi
+        query = query.filter(**{f"{sort_field}__{op}e": value}).filter(
+            Q(**{f"{sort_field}__{op}": value}) | Q(**{f"id__{op}": cursor["id"]})
+        )
+        reverse = descending == backward
+        ordering = [sort_field, "id"] if reverse else [f"-{sort_field}", "-id"]
+        rows = list(await query.order_by(*ordering).limit(params.page_size + 1))
+    else:
+        ordering = [f"-{sort_field}", "-id"] if descending else [sort_field, "id"]
+        offset = (params.page - 1) * params.page_size
+        rows = list(await query.order_by(*ordering).offset(offset).limit(params.page_size + 1))
+
+    has_more = len(rows) > params.page_size
+    files = rows[:params.page_size]
+    if backward:
+        files.reverse()
+
+    next_cursor = prev_cursor = None
+    if files:
+        def make_cursor(record: File, direction: str) -> str:
+            return encode_cursor(sort_field, sort_order, direction, getattr(record, sort_field), record.id)
+
+        # Orqaga yurilganda keyingi sahifa albatta bor; oldinga yoki OFFSET da - faqat ortiqcha yozuv bo'lsa
+        if has_more or backward:
+            next_cursor = make_cursor(files[-1], "next")
+        has_previous = has_more if backward else bool(params.cursor) or params.page > 1
+        if has_previous:
+            prev_cursor = make_cursor(files[0], "prev")
     
-    return list(files), total
+    return files, total, next_cursor, prev_cursor
 
 
+@timed_query
 async def update_file(file_id: int, file_update: FileUpdate) -> Optional[File]:
     """Fayl ma'lumotlarini yangilash"""
     file = await get_file_by_id(file_id)
@@ -82,9 +415,40 @@ async def update_file(file_id: int, file_update: FileUpdate) -> Optional[File]:
         for field, value in update_data.items():
             setattr(file, field, value)
         await file.save(using_db=connection)
-        return file
+    # Keshdagi yozuv va sahifalar faqat commit dan keyin eskiradi
+    await get_metadata_cache().invalidate()
+    return file
+
+
+@timed_query
+async def update_files(
+    file_update: FileUpdate, ids: Optional[List[int]] = None, filters: Optional[BatchFilter] = None
+) -> List[int]:
+    """
+    Bir nechta fayl metadata sini bitta UPDATE bilan yangilash (ID lar yoki filter bo'yicha).
+
+    Returns:
+        List[int]: mos kelgan (yangilangan) yozuvlar ID lari
+    """
+    update_data = file_update.dict(exclude_unset=True)
+    async with in_transaction() as connection:
+        if ids is not None:
+            query = File.filter(id__in=ids)
+        else:
+            query = File.all()
+            if filters.search:
+                query = apply_search(query, filters.search, filters.search_mode.value)
+            conditions = filters.dict(include={"format", "shareable", "public"}, exclude_none=True)
+            query = query.filter(**conditions)
+        matched = list(await query.using_db(connection).order_by("id").values_list("id", flat=True))
+        if matched and update_data:
+            await File.filter(id__in=matched).using_db(connection).update(**update_data)
+    if matched and update_data:
+        await get_metadata_cache().invalidate()
+    return matched
 
 
+@timed_query_parts
 async def delete_file(file_id: int) -> Tuple[bool, Optional[str]]:
     """
     Faylni o'chirish (fizik fayl va DB yozuvi)
@@ -95,25 +459,115 @@ async def delete_file(file_id: int) -> Tuple[bool, Optional[str]]:
     file = await get_file_by_id(file_id)
     if not file:
         return False, "File not found"
-    
-    # Fizik faylni o'chirish
-    file_path = file.path
-    if os.path.exists(file_path):
+
+    async with _blob_lock(file.hash_code):
+        # DB yozuvini o'chirish va blob ishoralarini kamaytirish (bitta tranzaksiyada)
         try:
-            os.remove(file_path)
+            with query_part():
+                async with in_transaction() as connection:
+                    # Qulf olinguncha boshqa so'rov o'chirgan bo'lishi mumkin: qayta o'qish
+                    file = await File.filter(id=file_id).using_db(connection).select_for_update().first()
+                    if file is None:
+                        return False, "File not found"
+                    await file.delete(using_db=connection)
+                    unused_path = None
+                    released = False
+                    blob = await Blob.filter(hash_code=file.hash_code).using_db(connection).select_for_update().first()
+                    if blob is not None:
+                        if blob.ref_count <= 1:
+                            await blob.delete(using_db=connection)
+                            unused_path = blob.path
+                            released = True
+                        else:
+                            await Blob.filter(id=blob.id).using_db(connection).update(ref_count=F("ref_count") - 1)
+                    elif not await File.filter(path=file.path).using_db(connection).exists():
+                        # Blob jadvalidan oldingi yozuv: faylga boshqa yozuv ishora qilmasa o'chiriladi
+                        unused_path = file.path
         except Exception as e:
-            return False, f"Failed to delete physical file: {str(e)}"
-    
-    # DB yozuvini o'chirish
-    try:
-        async with in_transaction() as connection:
-            await file.delete(using_db=connection)
-        return True, None
-    except Exception as e:
-        return False, f"Failed to delete database record: {str(e)}"
-
-
-def hash_file(file_data: bytes):
-    hasher = hashlib.sha256()
-    hasher.update(file_data)
-    return hasher.hexdigest()
+            return False, f"Failed to delete database record: {str(e)}"
+        await get_metadata_cache().invalidate()
+
+        # Fizik faylni faqat oxirgi ishora o'chirilganda o'chirish (I/O hovuzida)
+        if unused_path:
+            get_content_cache().invalidate(unused_path)
+            try:
+                await storage.remove_file(unused_path)
+            except Exception as e:
+                return False, f"Failed to delete physical file: {str(e)}"
+        # Blob boshqa nodeda (egasi) yoki ularning keshida bo'lishi mumkin
+        if released and get_settings().peers:
+            await get_peer_fetcher().release(file.hash_code)
+    return True, None
+
+
+@timed_query_parts
+async def delete_files(file_ids: List[int]) -> Tuple[List[int], List[int]]:
+    """
+    Bir nechta faylni bitta tranzaksiyada o'chirish.
+
+    Yozuvlar bitta DELETE bilan o'chiriladi; bloblar ``ref_count`` i hash boshiga bir marta
+    kamaytiriladi, ishorasiz qolgan bloblar bitta DELETE bilan o'chiriladi. Fizik fayllar
+    tranzaksiyadan keyin olib tashlanadi.
+
+    Returns:
+        Tuple[List[int], List[int]]: (o'chirilgan ID lar, topilmagan ID lar)
+    """
+    file_ids = list(dict.fromkeys(file_ids))
+    with query_part():
+        candidates = await File.filter(id__in=file_ids).values_list("hash_code", flat=True)
+    unused_paths = set()
+    released = []
+    async with _blob_locks_held(candidates):
+        with query_part():
+            async with in_transaction() as connection:
+                # Qulf olinguncha boshqa so'rov o'chirgan bo'lishi mumkin: qayta o'qish
+                files = list(await File.filter(id__in=file_ids).using_db(connection).select_for_update())
+                if files:
+                    await File.filter(id__in=[file.id for file in files]).using_db(connection).delete()
+                    references = Counter(file.hash_code for file in files)
+                    blobs = await Blob.filter(hash_code__in=list(references)).using_db(connection).select_for_update()
+                    unused_blobs = [blob for blob in blobs if blob.ref_count <= references[blob.hash_code]]
+                    if unused_blobs:
+                        await Blob.filter(id__in=[blob.id for blob in unused_blobs]).using_db(connection).delete()
+                        unused_paths.update(blob.path for blob in unused_blobs)
+                        released.extend(blob.hash_code for blob in unused_blobs)
+                    for blob in blobs:
+                        if blob.ref_count > references[blob.hash_code]:
+                            await Blob.filter(id=blob.id).using_db(connection).update(
+                                ref_count=F("ref_count") - references[blob.hash_code]
+                            )
+                    # Blob jadvalidan oldingi yozuvlar: faylga boshqa yozuv ishora qilmasa o'chiriladi
+                    blob_hashes = {blob.hash_code for blob in blobs}
+                    legacy_paths = {file.path for file in files if file.hash_code not in blob_hashes}
+                    if legacy_paths:
+                        used = await File.filter(path__in=list(legacy_paths)).using_db(connection).values_list("path", flat=True)
+                        unused_paths.update(legacy_paths - set(used))
+
+        for path in unused_paths:
+            get_content_cache().invalidate(path)
+            try:
+                await storage.remove_file(path)
+            except Exception as e:
+                # Yozuvlar allaqachon o'chirilgan: ishorasiz fayl faqat joy egallaydi
+                logger.warning("Failed to delete physical file %s: %s", path, e)
+        if released and get_settings().peers:
+            fetcher = get_peer_fetcher()
+            await asyncio.gather(*(fetcher.release(hash_code) for hash_code in released))
+
+    deleted = {file.id for file in files}
+    if deleted:
+        await get_metadata_cache().invalidate()
+    return [i for i in file_ids if i in deleted], [i for i in file_ids if i not in deleted]
+
+
+async def release_blob(hash_code: str, path: str) -> bool:
+    """
+    Oxirgi ishorasi boshqa nodeda o'chirilgan blobning shu nodedagi nusxasini o'chirish.
+    Shu orada qayta yuklangan (DB da yana ishora bor) blob o'chirilmaydi
+    """
+    async with _blob_lock(hash_code):
+        if await Blob.filter(hash_code=hash_code).exists() or await File.filter(hash_code=hash_code).exists():
+            return False
+        get_content_cache().invalidate(path)
+        return await storage.remove_file(path)
+
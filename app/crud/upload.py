@@ -0,0 +1,103 @@
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+from app.models.file import UploadSession, UploadChunk
+from app.utils.metrics import timed_query
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import uuid
+
+
+@timed_query
+async def create_upload_session(
+    name: str, format: str, size: int, chunk_size: int, temp_path: str, nonce_prefix: bytes, key_id: str
+) -> UploadSession:
+    async with in_transaction() as connection:
+        return await UploadSession.create(
+            id=uuid.uuid4(),
+            name=name,
+            format=format,
+            size=size,
+            chunk_size=chunk_size,
+            temp_path=temp_path,
+            nonce_prefix=nonce_prefix.hex(),
+            key_id=key_id,
+            using_db=connection
+        )
+
+
+@timed_query
+async def get_upload_session(upload_id: str) -> Optional[UploadSession]:
+    """ID bo'yicha sessiya olish (noto'g'ri UUID bo'lsa None)"""
+    try:
+        session_id = uuid.UUID(upload_id)
+    except ValueError:
+        return None
+    return await UploadSession.filter(id=session_id).first()
+
+
+@timed_query
+async def get_received_chunks(session: UploadSession) -> List[int]:
+    """To'liq yozilgan qismlar raqamlari (o'sish tartibida)"""
+    return list(
+        await UploadChunk.filter(session_id=session.id, complete=True).order_by("number").values_list("number", flat=True)
+    )
+
+
+@timed_query
+async def claim_chunk(session: UploadSession, number: int, hash_code: str, size: int) -> UploadChunk:
+    """
+    Qism uchun yozuvni olish yoki yaratish.
+
+    Parallel so'rovlar bir xil qismni yaratsa unique cheklov bittasini qoldiradi;
+    chaqiruvchi qaytgan yozuvning ``hash_code`` ini o'zinikiga solishtiradi.
+    """
+    chunk = await UploadChunk.filter(session_id=session.id, number=number).first()
+    if chunk:
+        return chunk
+    try:
+        async with in_transaction() as connection:
+            return await UploadChunk.create(
+                session_id=session.id, number=number, hash_code=hash_code, size=size, using_db=connection
+            )
+    except IntegrityError:
+        return await UploadChunk.get(session_id=session.id, number=number)
+
+
+@timed_query
+async def mark_chunk_complete(chunk: UploadChunk):
+    await UploadChunk.filter(id=chunk.id).update(complete=True)
+
+
+@timed_query
+async def set_session_status(session: UploadSession, expected: str, status: str) -> bool:
+    """
+    Holatni faqat u ``expected`` bo'lsa o'zgartirish (shartli UPDATE).
+
+    Bir nechta worker bir sessiyani bir vaqtda yakunlashga uringanda faqat bittasi muvaffaqiyatli bo'ladi.
+    """
+    updated = await UploadSession.filter(id=session.id, status=expected).update(status=status)
+    if updated:
+        session.status = status
+    return bool(updated)
+
+
+@timed_query
+async def delete_upload_session(session: UploadSession):
+    """Sessiya va uning qismlari yozuvlarini o'chirish (vaqtinchalik fayl chaqiruvchi tomonidan)"""
+    async with in_transaction() as connection:
+        await UploadChunk.filter(session_id=session.id).using_db(connection).delete()
+        await session.delete(using_db=connection)
+
+
+@timed_query
+async def get_expired_sessions(ttl_seconds: int, finalize_grace_seconds: int) -> List[UploadSession]:
+    """
+    Muddati o'tgan ochiq sessiyalar va yakunlash vaqtida to'xtab qolganlari (jarayon
+    ``finalizing`` holatida tushgan): ular muddatidan yana ``finalize_grace_seconds`` o'tgach
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+    stale_cutoff = cutoff - timedelta(seconds=finalize_grace_seconds)
+    return list(await UploadSession.filter(
+        Q(status="open", created_at__lt=cutoff) | Q(status="finalizing", created_at__lt=stale_cutoff)
+    ))
@@ -1,4 +1,5 @@
 from tortoise import Tortoise, run_async
+from app.utils.search import init_search
 from dotenv import load_dotenv
 import os
 
@@ -13,7 +14,8 @@ else:
     DATABASE_NAME = os.getenv("DATABASE_NAME")
     DATABASE_HOST = os.getenv("DATABASE_HOST")
 
-    DATABASE_URL = f"postgresql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}/{DATABASE_NAME}"
+    # To'liq URL (masalan bir mashinadagi bir nechta node uchun umumiy sqlite fayli) alohida sozlamalardan ustun
+    DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}/{DATABASE_NAME}"
 
 TORTOISE_ORM = {
     "connections": {
@@ -31,6 +33,8 @@ TORTOISE_ORM = {
 async def init():
     await Tortoise.init(config=TORTOISE_ORM)
     await Tortoise.generate_schemas()
+    # Fayl nomlari bo'yicha qidiruv indekslari (pg_trgm / FTS5)
+    await init_search()
 
 
 async def close_db_connection():
@@ -1,7 +1,14 @@
 from fastapi import FastAPI
 from app.database import init, close_db_connection
 from tortoise.contrib.fastapi import register_tortoise
-from app.routers import file, auth
+from app.routers import file, auth, metrics, audit, upload, peer
+from app.utils.audit import get_audit_log
+from app.utils.executor import shutdown_executors
+from app.core.config import get_settings
+from app.utils.metrics import PrometheusMiddleware
+from app.utils.peers import close_peer_fetcher
+from app.utils.rate_limit import init_rate_limiter
+from app.utils.timing import TimingMiddleware
 from fastapi.responses import JSONResponse
 from redis import asyncio as aioredis
 import fastapi_limiter
@@ -18,20 +25,32 @@ from contextlib import asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init()
-    redis = aioredis.from_url("redis://localhost", encoding="utf-8", decode_responses=True)
-    await fastapi_limiter.FastAPILimiter.init(redis)
+    redis = aioredis.from_url(get_settings().redis_url, encoding="utf-8", decode_responses=True)
+    # Redis ishlamasa ham ilova ishga tushadi: rate limit lokal hisoblanadi
+    await init_rate_limiter(redis)
+    await get_audit_log().start()
     
     yield
     
     # Shutdown
+    await get_audit_log().stop()
     await close_db_connection()
+    await close_peer_fetcher()
     await redis.close()
-    await fastapi_limiter.FastAPILimiter.reset()
+    fastapi_limiter.FastAPILimiter.redis = None
+    shutdown_executors()
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(TimingMiddleware)
 
 
 app.include_router(auth.router)
+# metrics/audit/upload routerlarini file dan oldin ulash kerak: /{date}/{filename} hamma ikki qismli yo'llarni ushlaydi
+app.include_router(metrics.router)
+app.include_router(audit.router)
+app.include_router(upload.router)
+app.include_router(peer.router)
 app.include_router(file.router)
 
 
@@ -1,5 +1,33 @@
 from tortoise import fields
+from tortoise.indexes import Index
 from tortoise.models import Model
+from typing import Dict, Optional
+
+
+class ListIndex(Index):
+    """
+    ``GET /files`` so'rov shakli uchun nomli (ixtiyoriy qisman) indeks.
+
+    Nom aniq beriladi: shu indekslar ``alembic`` migratsiyasida ham yaratiladi,
+    ``generate_schemas`` esa mavjudini qayta yaratmaydi (``IF NOT EXISTS``).
+    Qisman indeks sharti ORM so'rovdagi kabi yoziladi (SQLite: ``public = 0``,
+    Postgres: ``public = false``), aks holda rejalashtiruvchi indeksni tanlamaydi.
+    """
+    INDEX_CREATE_TEMPLATE = "CREATE INDEX {exists}{index_name} ON {table_name} ({fields}){extra};"
+
+    def __init__(self, *fields: str, name: str, where: Optional[Dict[str, bool]] = None):
+        super().__init__(fields=fields, name=name)
+        self.where = where or {}
+
+    def get_sql(self, schema_generator, model, safe):
+        if self.where:
+            sqlite = schema_generator.client.capabilities.dialect == "sqlite"
+            terms = [
+                f"{schema_generator.quote(field)} = {int(value) if sqlite else str(value).lower()}"
+                for field, value in self.where.items()
+            ]
+            self.extra = " WHERE " + " AND ".join(terms)
+        return super().get_sql(schema_generator, model, safe)
 
 
 class File(Model):
@@ -15,7 +43,81 @@ class File(Model):
     public = fields.BooleanField(default=True)
     size = fields.IntField()
     format = fields.CharField(max_length=50)
+    # Shifrlashdan oldingi siqish: identity, gzip yoki zstd (blobniki bilan bir xil)
+    codec = fields.CharField(max_length=16, default="identity")
 
     class Meta:
         table = "files"
-        indexes = ["name", "saved_name", "hash_code", "server"]
+        indexes = [
+            ("name", "saved_name", "hash_code", "server"),
+            # GET /files: saralash maydoni + id (barqaror tartib va kursor kaliti)
+            ListIndex("date", "id", name="files_date_id_idx"),
+            ListIndex("name", "id", name="files_name_id_idx"),
+            ListIndex("size", "id", name="files_size_id_idx"),
+            ListIndex("format", "id", name="files_format_id_idx"),
+            # format=... filtri (tenglik) + saralash
+            ListIndex("format", "date", "id", name="files_format_date_id_idx"),
+            ListIndex("format", "name", "id", name="files_format_name_id_idx"),
+            ListIndex("format", "size", "id", name="files_format_size_id_idx"),
+            # Kam uchraydigan public=false / shareable=false ro'yxatlari (standart saralash - date)
+            ListIndex("date", "id", name="files_private_date_id_idx", where={"public": False}),
+            ListIndex("date", "id", name="files_unshared_date_id_idx", where={"shareable": False}),
+        ]
+
+
+class Blob(Model):
+    """
+    Hash bo'yicha bir marta saqlanadigan fizik fayl.
+
+    ``ref_count`` - shu blobga ishora qiluvchi ``files`` yozuvlari soni; fizik fayl
+    oxirgi yozuv o'chirilgandagina o'chiriladi.
+    """
+    id = fields.IntField(pk=True)
+    hash_code = fields.CharField(max_length=255, unique=True)
+    path = fields.CharField(max_length=255)
+    size = fields.IntField()
+    # Fizik fayl qanday siqilgan (``size`` - asl tarkib hajmi)
+    codec = fields.CharField(max_length=16, default="identity")
+    ref_count = fields.IntField(default=0)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "blobs"
+
+
+class UploadSession(Model):
+    """
+    Qismlab (resumable) yuklash sessiyasi.
+
+    Qismlar shifrlangan holda ``temp_path`` dagi vaqtinchalik faylning o'z joyiga
+    yoziladi; ``nonce_prefix`` va ``key_id`` har qanday worker da shu fayl uchun
+    segmentlarni muhrlashni qayta tiklashga imkon beradi.
+    """
+    id = fields.UUIDField(pk=True)
+    name = fields.CharField(max_length=255)
+    format = fields.CharField(max_length=50)
+    size = fields.IntField()
+    chunk_size = fields.IntField()
+    temp_path = fields.CharField(max_length=255)
+    nonce_prefix = fields.CharField(max_length=32)
+    key_id = fields.CharField(max_length=64)
+    # open -> finalizing -> (o'chiriladi)
+    status = fields.CharField(max_length=20, default="open")
+    created_at = fields.DatetimeField(auto_now_add=True, index=True)
+
+    class Meta:
+        table = "upload_sessions"
+
+
+class UploadChunk(Model):
+    """Sessiyaga qabul qilingan qism; ``hash_code`` bir indeksga boshqa tarkib yozilishidan himoya qiladi"""
+    id = fields.IntField(pk=True)
+    session = fields.ForeignKeyField("models.UploadSession", related_name="chunks", on_delete=fields.CASCADE)
+    number = fields.IntField()
+    hash_code = fields.CharField(max_length=64)
+    size = fields.IntField()
+    complete = fields.BooleanField(default=False)
+
+    class Meta:
+        table = "upload_chunks"
+        unique_together = (("session", "number"),)
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse as DownloadResponse
+from starlette.background import BackgroundTask
+from app.utils.rate_limit import RateLimiter
+from app.utils.security import verify_token
+from app.utils.audit import get_audit_log
+from app.utils.executor import run_io
+import os
+import tempfile
+import traceback
+
+router = APIRouter()
+
+
+@router.get("/audit/export")
+async def export_audit_log(
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=2, seconds=60))
+):
+    """
+    Audit logdan Excel (xlsx) fayl qurib yuklab berish
+
+    Fayl so'rov paytida loglarni oqim sifatida o'qib quriladi va yuborilgandan keyin o'chiriladi.
+    """
+    fd, output_path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await run_io(get_audit_log().export_xlsx, output_path)
+    except Exception as e:
+        os.remove(output_path)
+        if os.environ.get("TESTING"):
+            tb = traceback.format_exc()
+            raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+    return DownloadResponse(
+        output_path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename="file_records.xlsx",
+        background=BackgroundTask(os.remove, output_path),
+    )
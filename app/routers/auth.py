@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException
-from app.utils.security import create_access_token
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.config import get_settings
+from app.utils.security import create_access_token, verify_token
+from app.utils.tokens import get_token_manager
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -14,6 +16,20 @@ async def login(user: UserLogin):
     if user.username == "test" and user.password == "test":
         return {
             "access_token": create_access_token({"sub": user.username}),
-            "token_type": "bearer"
+            "token_type": "bearer",
+            "expires_in": get_settings().jwt_expire_minutes * 60
         }
-    raise HTTPException(status_code=401, detail="Invalid credentials")
\ No newline at end of file
+    raise HTTPException(status_code=401, detail="Invalid credentials")
+
+
+@router.post("/token/revoke")
+async def revoke_token(token: dict = Depends(verify_token)):
+    """
+    Joriy tokenni muddati tugaguncha bekor qilish (logout)
+
+    Shu workerda darhol, boshqalarida token keshi TTL i (`JWT_CACHE_TTL_SECONDS`) ichida
+    kuchga kiradi. Denylist Redis ga yozilmasa `503`.
+    """
+    if not await get_token_manager().revoke(token):
+        raise HTTPException(status_code=503, detail="Token revocation could not be stored")
+    return {"message": "Token revoked"}
@@ -1,29 +1,75 @@
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query
-from fastapi.responses import StreamingResponse
-from tortoise.transactions import in_transaction
-from app.models.file import File as FileModel
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
 from app.schemas.file import (
     FileCreate, FileUpdate, FileResponse, FileListResponse, 
-    PaginationParams, SortField, SortOrder
+    PaginationParams, SortField, SortOrder, SearchMode, CountMode, UploadPrecheck, BatchDelete, BatchUpdate
 )
-from app.utils.file import save_file_to_disk, save_to_excel, validate_file, ALLOWED_EXTENSIONS
-from app.utils.security import verify_token, decrypt_file
-from app.crud.file import get_files, get_file_by_id, update_file, delete_file
-import fastapi_limiter
-from fastapi_limiter.depends import RateLimiter
+from app.utils.file import (
+    validate_file_type, write_upload_to_temp, make_saved_name, blob_path, build_file_url,
+    get_plaintext_size, iter_file_range, iter_content_range, ALLOWED_EXTENSIONS
+)
+from app.utils.compression import IDENTITY, accepts_encoding
+from app.utils.http_range import (
+    RangeNotSatisfiable, parse_range_header, if_range_matches, content_range, multipart_byteranges
+)
+from app.utils.http_cache import make_etag, http_date, cache_control, is_not_modified
+from app.utils import storage
+from app.utils.audit import get_audit_log
+from app.utils.cache import MetadataCache, get_metadata_cache
+from app.utils.content_cache import get_content_cache
+from app.utils.zip_stream import ZipMember, stream_zip, unique_name
+from app.utils.pagination import InvalidCursor
+from app.utils.peers import PeerUnavailable, get_peer_fetcher
+from app.utils.security import verify_token
+from app.core.config import get_settings
+from app.crud.file import (
+    get_files, get_file_by_id, get_file_by_saved_name, update_file, delete_file, add_file_reference,
+    add_reference_by_hash, add_file_references, update_files, delete_files, get_files_by_ids,
+    get_files_by_url_date, get_servers_by_hash, mark_used_by_other_servers
+)
+from app.utils.rate_limit import RateLimiter
+import logging
 import os
 import uuid
-from datetime import datetime
-import hashlib
 import traceback
 import math
+from datetime import datetime, timezone
+from typing import List, Optional
 
 
 router = APIRouter()
 
 UPLOAD_FOLDER = "app/uploaded_files"
-EXCEL_PATH = "app/file_records.xlsx"
-DEFAULT_SERVER = "localhost"
+# Fayllar hash bo'yicha bir marta saqlanadi: blobs/ab/cd/<hash>
+BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, "blobs")
+
+logger = logging.getLogger(__name__)
+
+
+async def _iter_bytes(data: bytes, start: int = 0, end: Optional[int] = None):
+    """Keshdagi tarkibning ``[start, end)`` oralig'i"""
+    yield data[start:end]
+
+
+async def _blob_location(record) -> Optional[str]:
+    """
+    Yozuv blobining shu nodedagi yo'li: o'zi, boshqa nodedan olingan keshdagi nusxasi yoki
+    (``peers`` sozlangan bo'lsa) egasidan hozir olingani. Hech qaerda yo'q bo'lsa None;
+    nodelarga ulanib bo'lmasa ``PeerUnavailable``
+    """
+    if await storage.path_exists(record.path):
+        return record.path
+    if not get_settings().peers:
+        return None
+    fetcher = get_peer_fetcher()
+    path = await fetcher.cached_path(record.hash_code)
+    if path is None:
+        servers = [record.server] + await get_servers_by_hash(record.hash_code)
+        path = await fetcher.fetch(record.hash_code, servers)
+        if path is not None:
+            await mark_used_by_other_servers(record.hash_code)
+    return path
 
 
 # ============ Fayllarni boshqarish API endpointlari ============
@@ -33,11 +79,14 @@ async def list_files(
     page: int = Query(default=1, ge=1, description="Sahifa raqami"),
     page_size: int = Query(default=10, ge=1, le=100, description="Sahifadagi elementlar soni"),
     search: str = Query(default=None, description="Qidiruv matni (fayl nomi bo'yicha)"),
+    search_mode: SearchMode = Query(default=SearchMode.substring, description="Qidiruv rejimi: substring, prefix yoki token"),
     format: str = Query(default=None, description="Fayl formati bo'yicha filter"),
     shareable: bool = Query(default=None, description="Shareable bo'yicha filter"),
     public: bool = Query(default=None, description="Public bo'yicha filter"),
     sort_by: SortField = Query(default=SortField.date, description="Sorting maydoni"),
     sort_order: SortOrder = Query(default=SortOrder.desc, description="Sorting tartibi"),
+    cursor: str = Query(default=None, description="Keyset pagination kursori (next_cursor / prev_cursor)"),
+    count: CountMode = Query(default=CountMode.exact, description="Jami son: exact, estimate yoki none"),
     token: dict = Depends(verify_token),
     rate_limiter: None = Depends(RateLimiter(times=30, seconds=60))
 ):
@@ -46,62 +95,160 @@ async def list_files(
     
     - **page**: Sahifa raqami (1 dan boshlanadi)
     - **page_size**: Sahifadagi elementlar soni (1-100 oraliq)
-    - **search**: Fayl nomi bo'yicha qidiruv
+    - **search**: Fayl nomi bo'yicha qidiruv (indeksli: pg_trgm / SQLite FTS5)
+    - **search_mode**: `substring` (istalgan joyda), `prefix` (boshi) yoki `token` (har bir so'z boshi)
     - **format**: Fayl formati bo'yicha filter (masalan: "text/plain", "image/png")
     - **shareable**: Shareable bo'yicha filter (true/false)
     - **public**: Public bo'yicha filter (true/false)
-    - **sort_by**: Sorting maydoni (date, name, size, format)
+    - **sort_by**: Sorting maydoni (date, name, size, format; search bilan `relevance`)
     - **sort_order**: Sorting tartibi (asc, desc)
+    - **cursor**: Oldingi javobdagi `next_cursor` yoki `prev_cursor` (berilsa `page` e'tiborga olinmaydi,
+      OFFSET siz keyset pagination - chuqur sahifalar ham tez)
+    - **count**: `exact` (COUNT), `estimate` (Postgres rejalashtiruvchi bahosi) yoki `none` (total null)
     """
     try:
+        if sort_by == SortField.relevance and not search:
+            raise HTTPException(status_code=400, detail="sort_by=relevance requires search")
+
         params = PaginationParams(
             page=page,
             page_size=page_size,
             search=search,
+            search_mode=search_mode,
             format=format,
             shareable=shareable,
             public=public,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            cursor=cursor,
+            count=count
         )
         
-        files, total = await get_files(params)
-        
-        # FileResponse ga aylantirish (URL qo'shish)
-        file_responses = []
-        for file in files:
-            # URL ni yaratish (path dan date va saved_name ni olish)
-            path_parts = file.path.split(os.sep)
-            if len(path_parts) >= 2:
-                date_part = path_parts[-2]  # YYYY-MM-DD
-                file_url = f"/{date_part}/{file.saved_name}"
+        async def load_page() -> dict:
+            try:
+                files, total, next_cursor, prev_cursor = await get_files(params)
+            except InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            # FileResponse ga aylantirish (URL qo'shish)
+            file_responses = []
+            for file in files:
+                # URL ni yaratish (path dan date va saved_name ni olish)
+                file_url = build_file_url(file.saved_name, file.path)
+
+                file_response = FileResponse(
+                    id=file.id,
+                    date=file.date,
+                    name=file.name,
+                    saved_name=file.saved_name,
+                    hash_code=file.hash_code,
+                    server=file.server,
+                    shareable=file.shareable,
+                    public=file.public,
+                    size=file.size,
+                    format=file.format,
+                    url=file_url
+                )
+                file_responses.append(file_response)
+
+            if total is None:
+                total_pages = None
             else:
-                file_url = f"/{file.saved_name}"
-            
-            file_response = FileResponse(
-                id=file.id,
-                date=file.date,
-                name=file.name,
-                saved_name=file.saved_name,
-                hash_code=file.hash_code,
-                server=file.server,
-                shareable=file.shareable,
-                public=file.public,
-                size=file.size,
-                format=file.format,
-                url=file_url
-            )
-            file_responses.append(file_response)
-        
-        total_pages = math.ceil(total / page_size) if total > 0 else 0
-        
-        return FileListResponse(
-            items=file_responses,
-            total=total,
-            page=page,
-            page_size=page_size,
-            total_pages=total_pages
+                total_pages = math.ceil(total / page_size) if total > 0 else 0
+
+            return jsonable_encoder(FileListResponse(
+                items=file_responses,
+                total=total,
+                page=page,
+                page_size=page_size,
+                total_pages=total_pages,
+                next_cursor=next_cursor,
+                prev_cursor=prev_cursor
+            ))
+
+        # Bir xil parametrli sahifa (masalan dashboard so'rovlari) keshdan beriladi
+        return await get_metadata_cache().get_or_load(
+            "list", MetadataCache.params_key(jsonable_encoder(params)), load_page
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        if os.environ.get("TESTING"):
+            tb = traceback.format_exc()
+            raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.get("/files/archive")
+async def download_archive(
+    ids: Optional[List[int]] = Query(default=None, description="Arxivga qo'shiladigan fayllar ID lari"),
+    date: Optional[str] = Query(default=None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Shu kunning fayllari (YYYY-MM-DD)"),
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=10, seconds=60))
+):
+    """
+    Bir nechta faylni bitta ZIP arxiv sifatida yuklab olish
+
+    - **ids**: fayllar ID lari (`?ids=1&ids=2`) yoki
+    - **date**: URL dagi sanasi shu kun bo'lgan barcha fayllar (`/{date}/{filename}` bilan bir xil)
+
+    Arxiv oqim sifatida quriladi: har bir fayl decrypt qilinib darhol yuboriladi,
+    vaqtinchalik fayl yo'q va xotira sarfi arxiv hajmiga bog'liq emas.
+    """
+    if (ids is None) == (date is None):
+        raise HTTPException(status_code=400, detail="Exactly one of ids or date is required")
+    try:
+        if ids is not None:
+            if len(ids) > get_settings().batch_max_items:
+                raise HTTPException(status_code=400, detail=f"Too many items. Maximum is {get_settings().batch_max_items}")
+            records = await get_files_by_ids(ids)
+            archive_name = "files.zip"
+        else:
+            folder = os.path.join(UPLOAD_FOLDER, date)
+            records = await get_files_by_url_date(date, folder)
+            archive_name = f"files-{date}.zip"
+
+        members, used_names = [], set()
+        for record in records:
+            try:
+                path = await _blob_location(record)
+            except PeerUnavailable as e:
+                logger.warning("Skipping %s: %s", record.saved_name, e)
+                continue
+            if path is not None:
+                members.append(ZipMember(
+                    unique_name(record.name, used_names), path, record.size, record.date, record.format, record.codec
+                ))
+
+        if date is not None:
+            # Yozuvsiz eski fayllar (GET /{date}/{filename} ularni ham beradi)
+            known = {os.path.basename(record.path) for record in records}
+            for filename, mtime in await storage.list_dir(folder):
+                if filename in known:
+                    continue
+                path = os.path.join(folder, filename)
+                try:
+                    size = await get_plaintext_size(path)
+                except Exception as e:
+                    # Ochib bo'lmaydigan fayl (boshqa kalit, buzilgan) arxivni to'xtatmasin
+                    logger.warning("Skipping unreadable file %s: %r", path, e)
+                    continue
+                extension = filename.rsplit(".", 1)[-1].lower()
+                members.append(ZipMember(
+                    unique_name(filename, used_names), path, size,
+                    datetime.fromtimestamp(mtime, timezone.utc), ALLOWED_EXTENSIONS.get(extension, "application/octet-stream")
+                ))
+
+        if not members:
+            raise HTTPException(status_code=404, detail="No files found")
+
+        return StreamingResponse(
+            stream_zip(members),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={archive_name}"}
         )
+    except HTTPException:
+        raise
     except Exception as e:
         if os.environ.get("TESTING"):
             tb = traceback.format_exc()
@@ -121,31 +268,32 @@ async def get_file_by_id_endpoint(
     - **file_id**: Fayl ID si
     """
     try:
-        file = await get_file_by_id(file_id)
+        async def load_file() -> Optional[dict]:
+            file = await get_file_by_id(file_id)
+            if not file:
+                return None
+
+            # URL ni yaratish
+            file_url = build_file_url(file.saved_name, file.path)
+
+            return jsonable_encoder(FileResponse(
+                id=file.id,
+                date=file.date,
+                name=file.name,
+                saved_name=file.saved_name,
+                hash_code=file.hash_code,
+                server=file.server,
+                shareable=file.shareable,
+                public=file.public,
+                size=file.size,
+                format=file.format,
+                url=file_url
+            ))
+
+        file = await get_metadata_cache().get_or_load("file", str(file_id), load_file)
         if not file:
             raise HTTPException(status_code=404, detail="File not found")
-        
-        # URL ni yaratish
-        path_parts = file.path.split(os.sep)
-        if len(path_parts) >= 2:
-            date_part = path_parts[-2]  # YYYY-MM-DD
-            file_url = f"/{date_part}/{file.saved_name}"
-        else:
-            file_url = f"/{file.saved_name}"
-        
-        return FileResponse(
-            id=file.id,
-            date=file.date,
-            name=file.name,
-            saved_name=file.saved_name,
-            hash_code=file.hash_code,
-            server=file.server,
-            shareable=file.shareable,
-            public=file.public,
-            size=file.size,
-            format=file.format,
-            url=file_url
-        )
+        return file
     except HTTPException:
         raise
     except Exception as e:
@@ -174,12 +322,7 @@ async def update_file_endpoint(
             raise HTTPException(status_code=404, detail="File not found")
         
         # URL ni yaratish
-        path_parts = updated_file.path.split(os.sep)
-        if len(path_parts) >= 2:
-            date_part = path_parts[-2]  # YYYY-MM-DD
-            file_url = f"/{date_part}/{updated_file.saved_name}"
-        else:
-            file_url = f"/{updated_file.saved_name}"
+        file_url = build_file_url(updated_file.saved_name, updated_file.path)
         
         return FileResponse(
             id=updated_file.id,
@@ -236,6 +379,80 @@ async def delete_file_endpoint(
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+@router.post("/files/batch/delete")
+async def delete_files_endpoint(
+    batch: BatchDelete,
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=10, seconds=60))
+):
+    """
+    Bir nechta faylni bitta so'rov va bitta tranzaksiyada o'chirish
+
+    - Body: `{"ids": [1, 2, 3]}` (ko'pi bilan `BATCH_MAX_ITEMS` ta)
+    - Har bir ID uchun natija: `{"file_id": 1, "deleted": true}` yoki `{"file_id": 9, "error": "File not found"}`
+    """
+    try:
+        if len(batch.ids) > get_settings().batch_max_items:
+            raise HTTPException(status_code=400, detail=f"Too many items. Maximum is {get_settings().batch_max_items}")
+
+        deleted, missing = await delete_files(batch.ids)
+        missing = set(missing)
+        results = [
+            {"file_id": file_id, "error": "File not found"} if file_id in missing
+            else {"file_id": file_id, "deleted": True}
+            for file_id in dict.fromkeys(batch.ids)
+        ]
+        return {"deleted": len(deleted), "failed": len(missing), "results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        if os.environ.get("TESTING"):
+            tb = traceback.format_exc()
+            raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/files/batch/update")
+async def update_files_endpoint(
+    batch: BatchUpdate,
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=20, seconds=60))
+):
+    """
+    Bir nechta fayl metadata sini bitta UPDATE bilan yangilash
+
+    - Body: `{"ids": [1, 2], "update": {"public": false}}` yoki
+      `{"filter": {"format": "image/png"}, "update": {"shareable": false}}`
+    - Filter `GET /files` dagidek: `search`, `search_mode`, `format`, `shareable`, `public`
+    - Har bir fayl uchun natija: `{"file_id": 1, "updated": true}`; `ids` da topilmaganlari - `"error": "File not found"`
+    """
+    try:
+        max_items = get_settings().batch_max_items
+        if batch.ids is not None and len(batch.ids) > max_items:
+            raise HTTPException(status_code=400, detail=f"Too many items. Maximum is {max_items}")
+
+        updated = await update_files(batch.update, ids=batch.ids, filters=batch.filter)
+        if batch.filter is not None and len(updated) > max_items:
+            # Yozuvlar yangilangan, natijalar ro'yxati esa cheklangan
+            return {"updated": len(updated), "failed": 0, "results": None}
+
+        found = set(updated)
+        targets = dict.fromkeys(batch.ids) if batch.ids is not None else updated
+        results = [
+            {"file_id": file_id, "updated": True} if file_id in found
+            else {"file_id": file_id, "error": "File not found"}
+            for file_id in targets
+        ]
+        return {"updated": len(updated), "failed": len(results) - len(found), "results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        if os.environ.get("TESTING"):
+            tb = traceback.format_exc()
+            raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
 # ============ Fayl yuklash va yuklab olish endpointlari ============
 
 
@@ -246,64 +463,42 @@ async def upload_file(
         rate_limiter: None = Depends(RateLimiter(times=10, seconds=60))  # 10 requests per minute
 ):
     try:
-        file_data = await file.read()
-        
-        # Fayl turini va hajmini tekshirish
-        validate_file(file.content_type, len(file_data))
-        
-        hash_code = hash_file(file_data)
-
-        existing_file = await FileModel.filter(hash_code=hash_code).first()
-        if existing_file:
-            duplicate_file_info = FileCreate(
-                name=file.filename,
-                saved_name=existing_file.saved_name,
-                path=existing_file.path,
-                hash_code=hash_code,
-                server=DEFAULT_SERVER,
-                shareable=True,
-                public=True,
-                size=len(file_data),
-                format=file.content_type
-            )
-            async with in_transaction() as connection:
-                await FileModel.create(**duplicate_file_info.dict(), using_db=connection)
-            saved_date = existing_file.path.split(os.sep)[-2]
-            return {
-                "message": "File already exists",
-                "url": f"/{saved_date}/{existing_file.saved_name}"
-            }
+        # Fayl turini yuklashdan oldin tekshirish
+        validate_file_type(file.content_type)
 
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        daily_folder = os.path.join(UPLOAD_FOLDER, current_date)
-        if not os.path.exists(daily_folder):
-            os.makedirs(daily_folder)
-
-        unique_filename = f"{uuid.uuid4().hex}"
-
-        saved_name, file_path = save_file_to_disk(daily_folder, file_data, unique_filename)
-        file_size = len(file_data)
+        # Faylni bo'laklab o'qish, hash hisoblash va vaqtinchalik faylga shifrlab yozish
+        temp_file, hash_code, file_size, codec = await write_upload_to_temp(BLOB_FOLDER, file)
 
         file_info = FileCreate(
             name=file.filename,
-            saved_name=saved_name,
-            path=file_path,
+            saved_name=make_saved_name(uuid.uuid4().hex),
+            path=blob_path(BLOB_FOLDER, hash_code),
             hash_code=hash_code,
-            server=DEFAULT_SERVER,
+            server=get_settings().node_id,
             shareable=True,
             public=True,
             size=file_size,
-            format=file.content_type
+            format=file.content_type,
+            codec=codec
         )
 
-        async with in_transaction() as connection:
-            db_file = await FileModel.create(**file_info.dict(), using_db=connection)
-        save_to_excel(file_info.dict(), EXCEL_PATH)
+        # Dublikat bo'lsa vaqtinchalik fayl o'chiriladi va mavjud blobga ishora qo'shiladi
+        db_file, duplicate = await add_file_reference(file_info, temp_file)
+        file_url = build_file_url(db_file.saved_name, db_file.path)
+        if duplicate:
+            return {
+                "message": "File already exists",
+                "url": file_url
+            }
+
+        await get_audit_log().record("upload", file_info.dict())
 
         return {
             "message": "File uploaded successfully",
-            "url": f"/{current_date}/{saved_name}"
+            "url": file_url
         }
+    except HTTPException:
+        raise
     except Exception as e:
         # During testing include the full traceback in the response to aid debugging
         if os.environ.get("TESTING"):
@@ -312,38 +507,237 @@ async def upload_file(
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+@router.post("/upload/batch")
+async def upload_files_batch(
+        files: List[UploadFile] = File(...),
+        token: dict = Depends(verify_token),
+        rate_limiter: None = Depends(RateLimiter(times=10, seconds=60))
+):
+    """
+    Bir nechta faylni bitta so'rovda yuklash (kalit: `files`, takrorlanadi)
+
+    - Har bir fayl `POST /upload/` dagidek tekshiriladi, hash qilinadi va shifrlanadi
+    - Barcha yozuvlar bitta tranzaksiyada qo'shiladi
+    - Har bir fayl uchun natija: `{"name", "message", "url"}` yoki rad etilgan fayl uchun `{"name", "error", "status_code"}`
+    """
+    try:
+        if len(files) > get_settings().batch_max_files:
+            raise HTTPException(status_code=400, detail=f"Too many files. Maximum is {get_settings().batch_max_files}")
+
+        results, accepted = [], []
+        try:
+            for upload in files:
+                try:
+                    validate_file_type(upload.content_type)
+                    temp_file, hash_code, file_size, codec = await write_upload_to_temp(BLOB_FOLDER, upload)
+                except HTTPException as e:
+                    results.append({"name": upload.filename, "error": e.detail, "status_code": e.status_code})
+                    continue
+                file_info = FileCreate(
+                    name=upload.filename,
+                    saved_name=make_saved_name(uuid.uuid4().hex),
+                    path=blob_path(BLOB_FOLDER, hash_code),
+                    hash_code=hash_code,
+                    server=get_settings().node_id,
+                    shareable=True,
+                    public=True,
+                    size=file_size,
+                    format=upload.content_type,
+                    codec=codec
+                )
+                accepted.append((file_info, temp_file))
+                results.append(file_info)
+        except BaseException:
+            for _, temp_file in accepted:
+                await temp_file.discard()
+            raise
+
+        references = iter(await add_file_references(accepted) if accepted else [])
+        uploaded = duplicates = 0
+        for i, item in enumerate(results):
+            if not isinstance(item, FileCreate):
+                continue
+            db_file, duplicate = next(references)
+            results[i] = {
+                "name": item.name,
+                "message": "File already exists" if duplicate else "File uploaded successfully",
+                "url": build_file_url(db_file.saved_name, db_file.path)
+            }
+            if duplicate:
+                duplicates += 1
+            else:
+                uploaded += 1
+                await get_audit_log().record("upload", item.dict())
+
+        return {
+            "uploaded": uploaded,
+            "duplicates": duplicates,
+            "failed": len(results) - uploaded - duplicates,
+            "results": results
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        if os.environ.get("TESTING"):
+            tb = traceback.format_exc()
+            raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/upload/precheck")
+async def precheck_upload(
+        precheck: UploadPrecheck,
+        token: dict = Depends(verify_token),
+        rate_limiter: None = Depends(RateLimiter(times=30, seconds=60))
+):
+    """
+    Faylni yubormasdan oldin tarkib serverda borligini tekshirish
+
+    - Shu SHA-256 va hajmdagi blob bo'lsa yozuv darhol yaratiladi va URL qaytariladi
+      (`upload_needed: false`), fayl yuborilmaydi
+    - Aks holda `upload_needed: true` - faylni `POST /upload/` yoki `/uploads/` orqali yuklang
+    """
+    try:
+        validate_file_type(precheck.format)
+        file_info = FileCreate(
+            name=precheck.name,
+            saved_name=make_saved_name(uuid.uuid4().hex),
+            path=blob_path(BLOB_FOLDER, precheck.hash_code),
+            hash_code=precheck.hash_code,
+            server=get_settings().node_id,
+            shareable=True,
+            public=True,
+            size=precheck.size,
+            format=precheck.format
+        )
+        db_file = await add_reference_by_hash(file_info)
+        if db_file is None:
+            return {"message": "Upload needed", "upload_needed": True}
+        return {
+            "message": "File already exists",
+            "upload_needed": False,
+            "url": build_file_url(db_file.saved_name, db_file.path)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        if os.environ.get("TESTING"):
+            tb = traceback.format_exc()
+            raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
 @router.get("/{date}/{filename}")
 async def get_file(
     date: str, 
     filename: str,
+    range_header: Optional[str] = Header(default=None, alias="Range"),
+    if_range: Optional[str] = Header(default=None, alias="If-Range"),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+    if_modified_since: Optional[str] = Header(default=None, alias="If-Modified-Since"),
+    accept_encoding: Optional[str] = Header(default=None, alias="Accept-Encoding"),
     token: dict = Depends(verify_token),
     rate_limiter: None = Depends(RateLimiter(times=30, seconds=60))  # 30 requests per minute
 ):
-    file_path = os.path.join(UPLOAD_FOLDER, date, filename)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="File not found")
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Accept-Ranges": "bytes",
+    }
 
-    # Faylni o'qish va decrypt qilish
-    with open(file_path, "rb") as f:
-        encrypted_data = f.read()
-    
-    decrypted_data = decrypt_file(encrypted_data)
-    
-    def iterfile():
-        yield decrypted_data
+    # Validatorlar DB yozuvidan olinadi: 304 uchun faylni ochish shart emas
+    record = await get_file_by_saved_name(filename)
+    # Yozuv bo'lsa fayl blob yo'lidan o'qiladi; yozuvsiz eski fayllar kunlik papkada
+    file_path = record.path if record else os.path.join(UPLOAD_FOLDER, date, filename)
+    codec = record.codec if record else IDENTITY
+    # Siqilgan fayl klient qabul qilsa siqilgan holicha beriladi (Range so'rovlari - asl tarkibdan)
+    encoded = accepts_encoding(accept_encoding, codec) and not range_header
+    if codec != IDENTITY:
+        headers["Vary"] = "Accept-Encoding"
+    etag = last_modified = None
+    if record:
+        etag = make_etag(record.hash_code)
+        last_modified = record.date
+        headers["ETag"] = make_etag(record.hash_code, codec) if encoded else etag
+        headers["Last-Modified"] = http_date(last_modified)
+        headers["Cache-Control"] = cache_control(record.public, get_settings().download_cache_max_age)
+        if is_not_modified(if_none_match, if_modified_since, headers["ETag"], last_modified):
+            headers.pop("Content-Disposition")
+            return Response(status_code=304, headers=headers)
+
+    if record:
+        # Blob boshqa nodeda bo'lsa undan olinadi (keshlanadi)
+        try:
+            file_path = await _blob_location(record)
+        except PeerUnavailable:
+            raise HTTPException(status_code=502, detail="File is stored on an unreachable node")
+    elif not await storage.path_exists(file_path):
+        file_path = None
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="File not found")
 
     # Fayl turini aniqlash
     file_extension = filename.split('.')[-1].lower()
     content_type = next((mime for ext, mime in ALLOWED_EXTENSIONS.items() if ext == file_extension), 'application/octet-stream')
-    
-    return StreamingResponse(
-        iterfile(),
-        media_type=content_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
 
+    if encoded:
+        # Siqilgan baytlar faqat decrypt qilinadi: disk, CPU va trafik tejaladi
+        headers["Content-Encoding"] = codec
+        headers["Content-Length"] = str(await get_plaintext_size(file_path))
+        return StreamingResponse(iter_file_range(file_path), media_type=content_type, headers=headers)
+
+    # Kichik fayllar decrypt qilingan (va ochilgan) holda worker xotirasida saqlanadi (LRU)
+    content_cache = get_content_cache()
+    content = content_cache.get(file_path) if record and content_cache.admits(record.size) else None
+    if content is not None:
+        file_size = len(content)
+    else:
+        file_size = record.size if codec != IDENTITY else await get_plaintext_size(file_path)
+        if record and content_cache.admits(file_size):
+            content = b"".join([chunk async for chunk in iter_content_range(file_path, codec)])
+            content_cache.put(file_path, content)
+
+    def read_range(start: int = 0, end: Optional[int] = None):
+        if content is not None:
+            return _iter_bytes(content, start, end)
+        return iter_content_range(file_path, codec, start, end)
+
+    # Range so'rovi
+    ranges = None
+    if range_header and if_range_matches(if_range, etag, last_modified):
+        try:
+            ranges = parse_range_header(range_header, file_size)
+        except RangeNotSatisfiable:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{file_size}"},
+            )
 
-def hash_file(file_data: bytes):
-    hasher = hashlib.sha256()
-    hasher.update(file_data)
-    return hasher.hexdigest()
+    if not ranges:
+        headers["Content-Length"] = str(file_size)
+        if content is not None:
+            return Response(content=content, media_type=content_type, headers=headers)
+        # Faylni segmentlab o'qish va decrypt qilish (yangi va eski Fernet formatlari)
+        return StreamingResponse(
+            read_range(),
+            media_type=content_type,
+            headers=headers
+        )
+
+    if len(ranges) == 1:
+        # Faqat so'ralgan oraliqni qoplaydigan segmentlar o'qiladi
+        start, end = ranges[0]
+        headers["Content-Range"] = content_range(start, end, file_size)
+        headers["Content-Length"] = str(end - start)
+        return StreamingResponse(
+            read_range(start, end),
+            status_code=206,
+            media_type=content_type,
+            headers=headers
+        )
+
+    multipart_type, length, body = multipart_byteranges(
+        ranges, file_size, content_type, read_range
+    )
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(body, status_code=206, media_type=multipart_type, headers=headers)
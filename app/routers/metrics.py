@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from app.utils.security import verify_token
+from app.utils.executor import get_cpu_executor, get_io_executor
+from app.utils.cache import get_metadata_cache
+from app.utils.content_cache import get_content_cache
+from app.utils.peers import get_peer_fetcher
+from app.utils.tokens import get_token_manager
+from app.utils import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Prometheus ko'rsatkichlari (matn formati)
+
+    Token talab qilinmaydi (scraper uchun); label larda fayl nomlari yo'q, faqat yo'l
+    shablonlari. Tashqi tarmoqdan yopish reverse proxy da.
+    """
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
+
+
+@router.get("/metrics/executor")
+async def executor_metrics(token: dict = Depends(verify_token)):
+    """
+    CPU va disk I/O hovuzlari ko'rsatkichlari
+
+    - **queue_depth**: hovuzda navbat kutayotgan ishlar soni
+    - **active**: hozir bajarilayotgan ishlar soni
+    - **max_queue_depth**: kuzatilgan eng katta navbat
+    - **avg_wait_ms** / **avg_run_ms**: o'rtacha kutish va bajarish vaqti
+    """
+    return {"cpu": get_cpu_executor().stats(), "io": get_io_executor().stats()}
+
+
+@router.get("/metrics/cache")
+async def cache_metrics(token: dict = Depends(verify_token)):
+    """
+    Metadata keshi ko'rsatkichlari (shu worker bo'yicha)
+
+    - **file** / **list**: `GET /files/{id}` va `GET /files` uchun hits, misses, hit_ratio
+    - **invalidations**: yozuvlar sababli versiya oshirilgan marta
+    - **errors**: Redis xatolari (bu holda so'rov DB ga boradi)
+    """
+    return get_metadata_cache().stats()
+
+
+@router.get("/metrics/content-cache")
+async def content_cache_metrics(token: dict = Depends(verify_token)):
+    """
+    Decrypt qilingan fayllar keshi ko'rsatkichlari (shu worker bo'yicha)
+
+    - **entries** / **bytes**: keshdagi fayllar soni va jami hajmi (`max_bytes` chegarasi bilan)
+    - **hits** / **misses** / **hit_ratio**: keshlanadigan hajmdagi yuklab olishlar bo'yicha
+    - **evictions**: joy bo'shatish uchun chiqarilgan fayllar
+    """
+    return get_content_cache().stats()
+
+
+@router.get("/metrics/token-cache")
+async def token_cache_metrics(token: dict = Depends(verify_token)):
+    """
+    Tekshirilgan JWT tokenlar keshi ko'rsatkichlari (shu worker bo'yicha)
+
+    - **entries**: keshdagi tokenlar soni
+    - **hits** / **misses** / **hit_ratio**: imzo tekshiruvisiz qabul qilingan va to'liq tekshirilgan tokenlar
+    """
+    return get_token_manager().stats()
+
+
+@router.get("/metrics/peers")
+async def peer_metrics(token: dict = Depends(verify_token)):
+    """
+    Boshqa nodelardan bloblarni olish ko'rsatkichlari (shu worker bo'yicha)
+
+    - **node_id** / **peers**: shu node va sozlangan boshqa nodelar
+    - **hits**: boshqa node bloblari lokal keshdan berilgan marta
+    - **fetches** / **fetched_bytes**: egasidan olingan bloblar va baytlar
+    - **errors**: nodelarga ulanish xatolari; **evictions**: keshdan chiqarilgan bloblar
+    """
+    return get_peer_fetcher().stats()
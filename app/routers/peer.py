@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi.responses import StreamingResponse
+from app.core.config import get_settings
+from app.crud.file import get_file_by_hash, release_blob
+from app.routers.file import BLOB_FOLDER
+from app.utils import storage
+from app.utils.file import blob_path
+from app.utils.peers import get_peer_fetcher, iter_blob
+from app.utils.security import verify_token
+
+router = APIRouter()
+
+
+def _require_peer(token: dict):
+    if token.get("node") not in get_settings().peers:
+        raise HTTPException(status_code=403, detail="Only peer nodes may access blobs")
+
+
+@router.get("/internal/blobs/{hash_code}", include_in_schema=False)
+async def get_blob(
+    hash_code: str = Path(pattern=r"^[0-9a-f]{64}$"),
+    token: dict = Depends(verify_token),
+):
+    """
+    Blobning shifrlangan baytlari boshqa nodelar uchun (read-through)
+
+    Faqat ``peers`` dagi nodelarning tokenlari (``node`` claim) qabul qilinadi; rate limit yo'q.
+    Blob shu node diskida ham, boshqa nodedan olingan keshida ham bo'lmasa 404.
+    """
+    _require_peer(token)
+    record = await get_file_by_hash(hash_code)
+    path = None
+    if record and await storage.path_exists(record.path):
+        path = record.path
+    elif record:
+        path = await get_peer_fetcher().cached_path(hash_code)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+    f = await storage.open_read(path)
+    return StreamingResponse(
+        iter_blob(f), media_type="application/octet-stream", headers={"Content-Length": str(f.size)}
+    )
+
+
+@router.delete("/internal/blobs/{hash_code}", status_code=204, include_in_schema=False)
+async def release_blob_copy(
+    hash_code: str = Path(pattern=r"^[0-9a-f]{64}$"),
+    token: dict = Depends(verify_token),
+):
+    """
+    Blobning oxirgi ishorasi boshqa nodeda o'chirildi: shu nodedagi nusxa (DB da ishora
+    qolmagan bo'lsa) va keshdagi nusxa o'chiriladi
+    """
+    _require_peer(token)
+    await release_blob(hash_code, blob_path(BLOB_FOLDER, hash_code))
+    await get_peer_fetcher().evict(hash_code)
@@ -0,0 +1,263 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from app.utils.rate_limit import RateLimiter
+from app.schemas.file import FileCreate, UploadSessionCreate, UploadSessionResponse
+from app.models.file import UploadSession
+from app.utils.encryption import SEGMENT_SIZE
+from app.utils.file import (
+    validate_file_type, chunk_count, chunk_length, write_chunk, compress_encrypted_file,
+    make_saved_name, blob_path, build_file_url
+)
+from app.utils.security import verify_token, new_sealer
+from app.utils.audit import get_audit_log
+from app.utils.executor import run_cpu
+from app.utils.metrics import UPLOADS_IN_PROGRESS
+from app.utils import storage
+from app.core.config import get_settings
+from app.crud.file import add_file_reference
+from app.crud.upload import (
+    create_upload_session, get_upload_session, get_received_chunks, claim_chunk, mark_chunk_complete,
+    set_session_status, delete_upload_session, get_expired_sessions
+)
+from app.routers.file import BLOB_FOLDER
+from datetime import timedelta
+from typing import Optional
+import hashlib
+import os
+import traceback
+import uuid
+
+router = APIRouter()
+
+# Muddati o'tgan sessiyani yakunlash shuncha vaqtda tugamasa jarayon tushgan hisoblanadi (sekund)
+FINALIZE_GRACE_SECONDS = 3600
+
+
+def _session_response(session: UploadSession, received: list) -> UploadSessionResponse:
+    # Boshidan uzluksiz qabul qilingan qismlar: klient shu joydan davom ettiradi
+    contiguous = 0
+    while contiguous < len(received) and received[contiguous] == contiguous:
+        contiguous += 1
+    return UploadSessionResponse(
+        upload_id=str(session.id),
+        name=session.name,
+        size=session.size,
+        chunk_size=session.chunk_size,
+        chunk_count=chunk_count(session.size, session.chunk_size),
+        received=received,
+        offset=min(contiguous * session.chunk_size, session.size),
+        expires_at=session.created_at + timedelta(seconds=get_settings().upload_session_ttl_seconds)
+    )
+
+
+async def _get_open_session(upload_id: str) -> UploadSession:
+    session = await get_upload_session(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail="Upload session is being finalized")
+    return session
+
+
+async def _remove_session(session: UploadSession):
+    await storage.remove_file(session.temp_path)
+    await delete_upload_session(session)
+
+
+async def _purge_expired_sessions():
+    """Yakunlanmagan eski sessiyalarni va ularning vaqtinchalik fayllarini o'chirish"""
+    settings = get_settings()
+    sessions = await get_expired_sessions(settings.upload_session_ttl_seconds, FINALIZE_GRACE_SECONDS)
+    for session in sessions:
+        if await set_session_status(session, session.status, "expired"):
+            await _remove_session(session)
+
+
+async def _read_body(request: Request, expected: int) -> bytes:
+    """So'rov tanasini o'qish; kutilgandan uzun bo'lsa o'qishni darhol to'xtatish"""
+    body = bytearray()
+    async for part in request.stream():
+        body += part
+        if len(body) > expected:
+            raise HTTPException(status_code=400, detail=f"Chunk must be {expected} bytes")
+    if len(body) != expected:
+        raise HTTPException(status_code=400, detail=f"Chunk must be {expected} bytes")
+    return bytes(body)
+
+
+def _handle_error(e: Exception):
+    if os.environ.get("TESTING"):
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+    raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/uploads/", response_model=UploadSessionResponse)
+async def create_upload(
+    upload: UploadSessionCreate,
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=10, seconds=60))
+):
+    """
+    Qismlab (resumable) yuklash sessiyasini ochish
+
+    Keyin qismlar `PUT /uploads/{upload_id}/chunks/{number}` bilan istalgan tartibda
+    (parallel ham) yuboriladi va `POST /uploads/{upload_id}/complete` bilan yakunlanadi.
+    """
+    try:
+        validate_file_type(upload.format)
+        settings = get_settings()
+        if upload.size > settings.resumable_max_file_size:
+            raise HTTPException(status_code=400, detail="File size too large")
+
+        await _purge_expired_sessions()
+
+        # Qism chegaralari segment chegaralariga to'g'ri kelishi kerak
+        chunk_size = max(settings.upload_chunk_size // SEGMENT_SIZE, 1) * SEGMENT_SIZE
+        sealer = new_sealer(upload.size, SEGMENT_SIZE)
+        temp_file = await storage.create_temp_file(BLOB_FOLDER)
+        try:
+            await temp_file.write(sealer.header)
+            await temp_file.close()
+            session = await create_upload_session(
+                upload.name, upload.format, upload.size, chunk_size,
+                temp_file.path, sealer.nonce_prefix, sealer.key_id
+            )
+        except BaseException:
+            await temp_file.discard()
+            raise
+        return _session_response(session, [])
+    except HTTPException:
+        raise
+    except Exception as e:
+        _handle_error(e)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload(
+    upload_id: str,
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=60, seconds=60))
+):
+    """Sessiya holati: qabul qilingan qismlar va davom ettirish joyi (`offset`)"""
+    session = await get_upload_session(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return _session_response(session, await get_received_chunks(session))
+
+
+@router.put("/uploads/{upload_id}/chunks/{number}")
+async def upload_chunk(
+    upload_id: str,
+    number: int,
+    request: Request,
+    chunk_sha256: Optional[str] = Header(default=None, alias="X-Chunk-SHA256"),
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=120, seconds=60))
+):
+    """
+    Bitta qismni yuborish (tana - qismning xom baytlari)
+
+    - Oxirgisidan tashqari har bir qism aynan `chunk_size` bayt bo'lishi kerak
+    - `X-Chunk-SHA256` yuborilsa qism tarkibi u bilan tekshiriladi
+    - Qismni qayta yuborish xavfsiz; lekin bir raqamga boshqa tarkib yuborilsa 409
+    """
+    try:
+        session = await _get_open_session(upload_id)
+        if not 0 <= number < chunk_count(session.size, session.chunk_size):
+            raise HTTPException(status_code=400, detail="Chunk number out of range")
+
+        with UPLOADS_IN_PROGRESS.labels("chunk").track_inprogress():
+            data = await _read_body(request, chunk_length(session.size, session.chunk_size, number))
+            hash_code = await run_cpu(lambda: hashlib.sha256(data).hexdigest())
+            if chunk_sha256 and chunk_sha256.lower() != hash_code:
+                raise HTTPException(status_code=400, detail="Chunk checksum mismatch")
+
+            # Bir raqamga boshqa tarkib yozish shu nonce ni qayta ishlatish bo'lardi
+            chunk = await claim_chunk(session, number, hash_code, len(data))
+            if chunk.hash_code != hash_code:
+                raise HTTPException(status_code=409, detail="Chunk already uploaded with different content")
+
+            if not chunk.complete:
+                # Bir xil tarkib bir xil shifrmatn beradi: tugallanmagan qismni qayta yozish xavfsiz
+                sealer = new_sealer(session.size, SEGMENT_SIZE, bytes.fromhex(session.nonce_prefix), session.key_id)
+                await write_chunk(session.temp_path, sealer, session.chunk_size, number, data)
+                await mark_chunk_complete(chunk)
+
+        return {"upload_id": upload_id, "number": number, "size": len(data), "hash_code": hash_code}
+    except HTTPException:
+        raise
+    except Exception as e:
+        _handle_error(e)
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=10, seconds=60))
+):
+    """
+    Sessiyani yakunlash: barcha qismlar qabul qilingan bo'lishi kerak
+
+    Fayl to'liq decrypt qilinib hash hisoblanadi (matn va ``.doc`` fayllar shu o'tishda
+    siqiladi), so'ng oddiy yuklashdagidek blobga qo'shiladi (dublikat bo'lsa mavjud blobga
+    ishora qilinadi).
+    """
+    try:
+        session = await _get_open_session(upload_id)
+        received = await get_received_chunks(session)
+        missing = sorted(set(range(chunk_count(session.size, session.chunk_size))) - set(received))
+        if missing:
+            raise HTTPException(status_code=409, detail={"message": "Upload is incomplete", "missing": missing})
+        if not await set_session_status(session, "open", "finalizing"):
+            raise HTTPException(status_code=409, detail="Upload session is being finalized")
+
+        try:
+            compressed, hash_code, codec = await compress_encrypted_file(BLOB_FOLDER, session.temp_path, session.format)
+            file_info = FileCreate(
+                name=session.name,
+                saved_name=make_saved_name(uuid.uuid4().hex),
+                path=blob_path(BLOB_FOLDER, hash_code),
+                hash_code=hash_code,
+                server=get_settings().node_id,
+                shareable=True,
+                public=True,
+                size=session.size,
+                format=session.format,
+                codec=codec
+            )
+            temp_file = compressed or await storage.reopen_temp_file(session.temp_path)
+            db_file, duplicate = await add_file_reference(file_info, temp_file)
+        except BaseException:
+            # Yakunlash muvaffaqiyatsiz: klient qayta urinishi mumkin
+            await set_session_status(session, "finalizing", "open")
+            raise
+
+        if compressed is not None:
+            # Blobga siqilgan nusxa o'tdi: qismlar yozilgan fayl endi kerak emas
+            await storage.remove_file(session.temp_path)
+        await delete_upload_session(session)
+        file_url = build_file_url(db_file.saved_name, db_file.path)
+        if duplicate:
+            return {"message": "File already exists", "url": file_url}
+
+        await get_audit_log().record("upload", file_info.dict())
+        return {"message": "File uploaded successfully", "url": file_url}
+    except HTTPException:
+        raise
+    except Exception as e:
+        _handle_error(e)
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload(
+    upload_id: str,
+    token: dict = Depends(verify_token),
+    rate_limiter: None = Depends(RateLimiter(times=10, seconds=60))
+):
+    """Sessiyani bekor qilish va qabul qilingan qismlarni o'chirish"""
+    session = await _get_open_session(upload_id)
+    if not await set_session_status(session, "open", "aborted"):
+        raise HTTPException(status_code=409, detail="Upload session is being finalized")
+    await _remove_session(session)
+    return {"message": "Upload aborted", "upload_id": upload_id}
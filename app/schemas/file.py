@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum
@@ -14,6 +14,7 @@ class FileCreate(BaseModel):
     public: bool
     size: int
     format: str
+    codec: str = "identity"
 
 
 class FileUpdate(BaseModel):
@@ -35,6 +36,7 @@ class File(BaseModel):
     public: bool
     size: int
     format: str
+    codec: str
 
     class Config:
         from_attributes = True
@@ -64,6 +66,14 @@ class SortField(str, Enum):
     name = "name"
     size = "size"
     format = "format"
+    relevance = "relevance"  # Faqat search bilan: eng mos natijalar birinchi (sort_order=desc)
+
+
+class SearchMode(str, Enum):
+    """Nom bo'yicha qidiruv rejimi"""
+    substring = "substring"  # Nomning istalgan joyida
+    prefix = "prefix"  # Nom shu matn bilan boshlanadi
+    token = "token"  # Har bir so'z nomdagi biror so'zning boshi
 
 
 class SortOrder(str, Enum):
@@ -72,22 +82,95 @@ class SortOrder(str, Enum):
     desc = "desc"
 
 
+class CountMode(str, Enum):
+    """Jami sonni hisoblash usuli"""
+    exact = "exact"  # COUNT(*) - aniq, katta jadvalda sekin
+    estimate = "estimate"  # Rejalashtiruvchi bahosi (Postgres), boshqa DB larda aniq son
+    none = "none"  # Hisoblanmaydi
+
+
 class PaginationParams(BaseModel):
     """Pagination parametrlari"""
     page: int = Field(default=1, ge=1, description="Sahifa raqami")
     page_size: int = Field(default=10, ge=1, le=100, description="Sahifadagi elementlar soni")
     search: Optional[str] = Field(default=None, description="Qidiruv matni (fayl nomi bo'yicha)")
+    search_mode: SearchMode = Field(default=SearchMode.substring, description="Qidiruv rejimi")
     format: Optional[str] = Field(default=None, description="Fayl formati bo'yicha filter")
     shareable: Optional[bool] = Field(default=None, description="Shareable bo'yicha filter")
     public: Optional[bool] = Field(default=None, description="Public bo'yicha filter")
     sort_by: Optional[SortField] = Field(default=SortField.date, description="Sorting maydoni")
     sort_order: Optional[SortOrder] = Field(default=SortOrder.desc, description="Sorting tartibi")
+    cursor: Optional[str] = Field(default=None, description="Keyset pagination kursori (berilsa page e'tiborga olinmaydi)")
+    count: CountMode = Field(default=CountMode.exact, description="Jami sonni hisoblash usuli")
 
 
 class FileListResponse(BaseModel):
     """Fayllar ro'yxati response modeli"""
     items: List[FileResponse]
-    total: int
+    total: Optional[int]  # count=none bo'lsa None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None  # Keyingi sahifa (yo'q bo'lsa None)
+    prev_cursor: Optional[str] = None  # Oldingi sahifa (yo'q bo'lsa None)
+
+
+class UploadPrecheck(BaseModel):
+    """Yuklashdan oldin tarkib serverda borligini tekshirish"""
+    name: str = Field(..., min_length=1, max_length=255, description="Fayl nomi")
+    size: int = Field(..., ge=0, description="Fayl hajmi (bayt)")
+    hash_code: str = Field(..., pattern="^[0-9a-f]{64}$", description="Tarkibning SHA-256 hashi (hex, kichik harflar)")
+    format: str = Field(..., description="Fayl turi (masalan: \"text/plain\")")
+
+
+class UploadSessionCreate(BaseModel):
+    """Qismlab yuklash sessiyasini ochish"""
+    name: str = Field(..., min_length=1, max_length=255, description="Fayl nomi")
+    size: int = Field(..., ge=0, description="Fayl hajmi (bayt)")
+    format: str = Field(..., description="Fayl turi (masalan: \"text/plain\")")
+
+
+class UploadSessionResponse(BaseModel):
+    """Qismlab yuklash sessiyasi holati"""
+    upload_id: str
+    name: str
+    size: int
+    chunk_size: int
+    chunk_count: int
+    received: List[int]  # Qabul qilingan qismlar raqamlari
+    offset: int  # Boshidan uzluksiz qabul qilingan baytlar soni
+    expires_at: datetime
+
+
+class BatchDelete(BaseModel):
+    """Bir nechta faylni o'chirish"""
+    ids: List[int] = Field(..., min_length=1, description="O'chiriladigan fayllar ID lari")
+
+
+class BatchFilter(BaseModel):
+    """Ommaviy yangilash uchun filter (GET /files dagi filterlar bilan bir xil)"""
+    search: Optional[str] = Field(default=None, description="Qidiruv matni (fayl nomi bo'yicha)")
+    search_mode: SearchMode = Field(default=SearchMode.substring, description="Qidiruv rejimi")
+    format: Optional[str] = Field(default=None, description="Fayl formati bo'yicha filter")
+    shareable: Optional[bool] = Field(default=None, description="Shareable bo'yicha filter")
+    public: Optional[bool] = Field(default=None, description="Public bo'yicha filter")
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        # Bo'sh filter barcha fayllarni yangilab yuborardi
+        if self.search is None and self.format is None and self.shareable is None and self.public is None:
+            raise ValueError("filter must contain at least one condition")
+        return self
+
+
+class BatchUpdate(BaseModel):
+    """Bir nechta fayl metadata sini yangilash: `ids` yoki `filter` dan biri"""
+    ids: Optional[List[int]] = Field(default=None, min_length=1, description="Yangilanadigan fayllar ID lari")
+    filter: Optional[BatchFilter] = Field(default=None, description="Yangilanadigan fayllar filtri")
+    update: FileUpdate
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("exactly one of ids or filter is required")
+        return self
@@ -0,0 +1,182 @@
+"""
+Faqat qo'shiladigan (append-only) audit log.
+
+Yozuvlar JSONL segmentlarga yoziladi (``audit-<vaqt>-<pid>.jsonl``). Har bir jarayon
+o'z segmentiga yozadi, shuning uchun bir nechta worker bir-birining qatorlarini
+buzmaydi. Segment ``Settings.audit_segment_max_bytes`` dan oshsa yangisi ochiladi.
+
+So'rov ichida ``audit_log.record()`` faqat navbatga qo'yadi; fon vazifasi
+yozuvlarni to'plab (``audit_batch_size`` yoki ``audit_flush_interval_ms``) bitta
+yozish bilan diskka tushiradi. Yuklash tezligi tarix hajmiga bog'liq emas.
+
+Excel fayl faqat so'ralganda (``export_xlsx``) loglarni oqim sifatida o'qib quriladi.
+"""
+import asyncio
+import glob
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from app.core.config import get_settings
+from .executor import run_io
+from .metrics import observe_stage
+from .timing import span
+
+logger = logging.getLogger(__name__)
+
+# Excel eksportidagi ustunlar tartibi
+AUDIT_COLUMNS = [
+    "timestamp", "event", "name", "saved_name", "path", "hash_code",
+    "server", "shareable", "public", "size", "format",
+]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class AuditLog:
+    def __init__(self, log_dir: str, segment_max_bytes: int, batch_size: int, flush_interval: float):
+        self.log_dir = log_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._segment_path: Optional[str] = None
+        self._segment_size = 0
+        self._lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+
+    # ---------- yozish ----------
+
+    def _new_segment_path(self) -> str:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
+        return os.path.join(self.log_dir, f"audit-{stamp}-{os.getpid()}.jsonl")
+
+    def _append(self, lines: List[str]):
+        """Qatorlarni joriy segmentga bitta yozish bilan qo'shish (I/O hovuzida)"""
+        data = "".join(lines).encode()
+        with self._lock:
+            rotate = self._segment_size and self._segment_size + len(data) > self.segment_max_bytes
+            if self._segment_path is None or rotate:
+                os.makedirs(self.log_dir, exist_ok=True)
+                self._segment_path = self._new_segment_path()
+                self._segment_size = 0
+            with open(self._segment_path, "ab") as f:
+                f.write(data)
+            self._segment_size += len(data)
+
+    async def _write_batch(self, records: List[dict]):
+        started = time.perf_counter()
+        lines = [json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records]
+        await run_io(self._append, lines)
+        observe_stage("audit_write", time.perf_counter() - started)
+        self.written += len(records)
+        self.batches += 1
+
+    async def record(self, event: str, data: dict):
+        """Yozuvni logga qo'shish (fon yozuvchi ishlayotgan bo'lsa faqat navbatga)"""
+        record = {"timestamp": _now(), "event": event, **data}
+        with span("audit"):
+            if self._task is None or self._task.done():
+                # Fon yozuvchi ishga tushirilmagan (masalan lifespan siz testlar) - darhol yozish
+                await self._write_batch([record])
+                return
+            await self._queue.put(record)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write_batch(batch)
+            except Exception:
+                logger.exception("Audit log write failed (%d records)", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.batch_size * 16)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Navbatdagi barcha yozuvlarni diskka tushirib, fon vazifani to'xtatish"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    # ---------- o'qish va eksport ----------
+
+    def segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.log_dir, "audit-*.jsonl")))
+
+    def iter_records(self) -> Iterator[dict]:
+        """Barcha segmentlardagi yozuvlarni vaqt bo'yicha tartibda o'qish (oqim sifatida)"""
+        def read_segment(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+        yield from heapq.merge(*(read_segment(path) for path in self.segments()), key=lambda r: r.get("timestamp", ""))
+
+    def export_xlsx(self, output_path: str) -> int:
+        """
+        Loglardan Excel fayl qurish. openpyxl write-only rejimi qatorlarni
+        diskka oqim sifatida yozadi, butun tarix xotiraga yuklanmaydi.
+
+        Returns:
+            int: yozilgan qatorlar soni
+        """
+        from openpyxl import Workbook
+
+        started = time.perf_counter()
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("files")
+        sheet.append(AUDIT_COLUMNS)
+        rows = 0
+        for record in self.iter_records():
+            sheet.append([record.get(column) for column in AUDIT_COLUMNS])
+            rows += 1
+        workbook.save(output_path)
+        observe_stage("audit_export", time.perf_counter() - started)
+        return rows
+
+
+_audit_log: Optional[AuditLog] = None
+
+
+def get_audit_log() -> AuditLog:
+    global _audit_log
+    if _audit_log is None:
+        settings = get_settings()
+        _audit_log = AuditLog(
+            settings.audit_log_dir,
+            settings.audit_segment_max_bytes,
+            settings.audit_batch_size,
+            settings.audit_flush_interval_ms / 1000,
+        )
+    return _audit_log
@@ -0,0 +1,136 @@
+"""
+Fayl metadata uchun Redis read-through kesh.
+
+``GET /files/{id}`` javobi va ``GET /files`` sahifalari JSON ko'rinishida Redis da
+saqlanadi (``fastapi_limiter`` ulanishi qayta ishlatiladi). Har bir kalitga umumiy
+versiya raqami kiradi: yozuv o'zgarganda (yuklash, yangilash, o'chirish) versiya
+oshiriladi va barcha eski kalitlar bir vaqtda "ko'rinmas" bo'lib qoladi, keyin TTL
+bilan o'chib ketadi. Versiya DB dan o'qishdan *oldin* olinadi, shuning uchun
+yozuv bilan parallel yuklangan eski ma'lumot faqat eski versiya ostida saqlanadi.
+
+Redis ishga tushirilmagan yoki xato bersa kesh chetlab o'tiladi - so'rov to'g'ridan
+to'g'ri DB ga boradi. Hit/miss hisoblagichlari jarayon (worker) bo'yicha.
+"""
+import hashlib
+import json
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+
+from fastapi_limiter import FastAPILimiter
+
+from app.core.config import get_settings
+
+KINDS = ("file", "list")
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    def __init__(self, prefix: str, file_ttl: int, list_ttl: int, enabled: bool = True):
+        self.prefix = prefix
+        self.ttl = {"file": file_ttl, "list": list_ttl}
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = dict.fromkeys(KINDS, 0)
+        self.misses = dict.fromkeys(KINDS, 0)
+        self.errors = 0
+        self.invalidations = 0
+
+    def _redis(self):
+        return FastAPILimiter.redis if self.enabled else None
+
+    def _count(self, counter: dict, kind: str):
+        with self._lock:
+            counter[kind] += 1
+
+    def _error(self, action: str, e: Exception):
+        with self._lock:
+            self.errors += 1
+        logger.warning("Metadata cache %s failed: %s", action, e)
+
+    @staticmethod
+    def params_key(params: dict) -> str:
+        """So'rov parametrlaridan barqaror kalit (tartibga bog'liq emas)"""
+        encoded = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha1(encoded.encode()).hexdigest()
+
+    async def get_or_load(self, kind: str, key: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """
+        Keshdan olish, bo'lmasa ``loader()`` bilan yuklab saqlash.
+
+        ``loader`` JSON ga aylantiriladigan dict yoki None (topilmadi - keshlanmaydi) qaytaradi.
+        """
+        redis = self._redis()
+        if redis is None:
+            return await loader()
+
+        cache_key = None
+        try:
+            version = await redis.get(f"{self.prefix}:version")
+            if isinstance(version, bytes):
+                version = version.decode()
+            cache_key = f"{self.prefix}:{version or 0}:{kind}:{key}"
+            cached = await redis.get(cache_key)
+        except Exception as e:
+            self._error("read", e)
+            return await loader()
+
+        if cached is not None:
+            self._count(self.hits, kind)
+            return json.loads(cached)
+
+        self._count(self.misses, kind)
+        value = await loader()
+        if value is not None:
+            try:
+                await redis.set(cache_key, json.dumps(value, default=str), ex=self.ttl[kind])
+            except Exception as e:
+                self._error("write", e)
+        return value
+
+    async def invalidate(self):
+        """Barcha keshlangan yozuv va sahifalarni eskirgan deb belgilash (versiyani oshirish)"""
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            await redis.incr(f"{self.prefix}:version")
+        except Exception as e:
+            self._error("invalidate", e)
+            return
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                kind: {
+                    "hits": self.hits[kind],
+                    "misses": self.misses[kind],
+                    "hit_ratio": round(self.hits[kind] / (self.hits[kind] + self.misses[kind]), 3)
+                    if self.hits[kind] + self.misses[kind] else 0.0,
+                }
+                for kind in KINDS
+            }
+            stats.update(
+                enabled=self.enabled, errors=self.errors, invalidations=self.invalidations,
+                file_ttl=self.ttl["file"], list_ttl=self.ttl["list"]
+            )
+            return stats
+
+
+_metadata_cache: Optional[MetadataCache] = None
+
+
+def get_metadata_cache() -> MetadataCache:
+    global _metadata_cache
+    if _metadata_cache is None:
+        settings = get_settings()
+        _metadata_cache = MetadataCache(
+            "files:meta",
+            settings.metadata_cache_file_ttl_seconds,
+            settings.metadata_cache_list_ttl_seconds,
+            settings.metadata_cache_enabled,
+        )
+    return _metadata_cache
@@ -0,0 +1,137 @@
+"""
+Shifrlashdan oldin shaffof siqish.
+
+Matn va ``.doc`` fayllar yaxshi siqiladi: yuklashda ular avval siqilib, keyin
+segmentlab shifrlanadi (shifrlangan ma'lumot siqilmaydi, shuning uchun tartib
+aynan shunday). Kodek fayl yozuvida (``files.codec``, ``blobs.codec``) saqlanadi.
+
+- Kodek tarkib turi (``COMPRESSIBLE_TYPES``) va birinchi bo'lakni sinab siqish
+  bo'yicha tanlanadi: foyda ``compression_min_ratio`` dan kam bo'lsa fayl siqilmaydi
+- ``zstd`` uchun ``zstandard`` paketi kerak (ixtiyoriy); u o'rnatilmagan bo'lsa ``gzip``
+- Hash va ``size`` asl tarkibniki, shuning uchun dedup va ``Range`` kodekka bog'liq emas
+- Yuklab olishda klient ``Accept-Encoding`` da shu kodekni qabul qilsa siqilgan baytlar
+  o'zgarishsiz (``Content-Encoding`` bilan) beriladi, aks holda oqim bilan ochiladi
+"""
+import zlib
+from typing import Optional
+
+from app.core.config import get_settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - ixtiyoriy bog'liqlik
+    zstandard = None
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# Siqishdan foyda bo'ladigan turlar (rasm, pdf, docx allaqachon siqilgan)
+COMPRESSIBLE_TYPES = {"text/plain", "application/msword"}
+# Siqiluvchanlik shu hajmdagi namunada tekshiriladi
+SAMPLE_SIZE = 64 * 1024
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def available_codecs() -> list:
+    """Shu muhitda ishlatish mumkin bo'lgan kodeklar"""
+    return [ZSTD, GZIP] if zstandard is not None else [GZIP]
+
+
+def configured_codec() -> str:
+    """
+    ``compression_codec`` sozlamasidan yuklashda ishlatiladigan kodek.
+
+    ``auto`` - mavjud bo'lsa zstd, aks holda gzip; ``none`` - siqish o'chirilgan.
+    """
+    codec = get_settings().compression_codec
+    if codec == "none":
+        return IDENTITY
+    if codec == "auto" or codec not in available_codecs():
+        return available_codecs()[0]
+    return codec
+
+
+class _Passthrough:
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    decompress = compress
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _ZstdDecompressor:
+    """``zstandard`` decompressobj ga ``flush()`` ni zlib dagidek qo'shish"""
+
+    def __init__(self):
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def new_compressor(codec: str):
+    """``compress(data)`` va ``flush()`` metodlari bor oqimli siquvchi"""
+    if codec == GZIP:
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if codec == ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return _Passthrough()
+
+
+def new_decompressor(codec: str):
+    """``decompress(data)`` va ``flush()`` metodlari bor oqimli ochuvchi"""
+    if codec == GZIP:
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard package is required to read zstd compressed files")
+        return _ZstdDecompressor()
+    return _Passthrough()
+
+
+def choose_codec(content_type: Optional[str], sample: bytes) -> str:
+    """
+    Fayl uchun kodekni tanlash (CPU hovuzida chaqiriladi - namuna siqiladi).
+
+    Siqilmaydigan tur, bo'sh fayl yoki namuna yetarlicha kichraymasa ``identity``.
+    """
+    codec = configured_codec()
+    if codec == IDENTITY or content_type not in COMPRESSIBLE_TYPES or not sample:
+        return IDENTITY
+    sample = sample[:SAMPLE_SIZE]
+    compressor = new_compressor(codec)
+    compressed = len(compressor.compress(sample)) + len(compressor.flush())
+    if compressed > len(sample) * get_settings().compression_min_ratio:
+        return IDENTITY
+    return codec
+
+
+def accepts_encoding(accept_encoding: Optional[str], codec: str) -> bool:
+    """``Accept-Encoding`` sarlavhasi shu kodekni qabul qiladimi (``q=0`` - rad etilgan)"""
+    if not accept_encoding or codec == IDENTITY:
+        return False
+    wildcard = None
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == codec or (codec == GZIP and name == "x-gzip"):
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return bool(wildcard)
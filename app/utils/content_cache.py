@@ -0,0 +1,87 @@
+"""
+Decrypt qilingan kichik fayllar uchun jarayon ichidagi LRU kesh.
+
+Ko'p yuklab olinadigan kichik fayllar (logotiplar, shablonlar) har safar diskdan
+o'qilib decrypt qilinmasligi uchun ularning ochiq tarkibi xotirada saqlanadi.
+Kalit - fayl yo'li: bloblar hash bo'yicha saqlanadi, shuning uchun bir yo'ldagi
+tarkib o'zgarmaydi. Kesh har bir worker da alohida; fayl o'chirilganda shu
+worker dagi yozuv olib tashlanadi, boshqa workerlarda esa ``get_file`` faylning
+diskda borligini tekshirgani uchun o'chirilgan fayl keshdan berilmaydi.
+
+- ``content_cache_max_file_size`` dan katta fayllar keshlanmaydi
+- jami hajm ``content_cache_max_bytes`` dan oshsa eng eski ishlatilganlari chiqariladi
+- ``content_cache_max_bytes=0`` keshni o'chiradi
+"""
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import get_settings
+
+
+class ContentCache:
+    def __init__(self, max_bytes: int, max_file_size: int):
+        self.max_bytes = max_bytes
+        self.max_file_size = min(max_file_size, max_bytes)
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def admits(self, size: int) -> bool:
+        """Shu hajmdagi fayl keshlanadimi"""
+        return self.max_bytes > 0 and size <= self.max_file_size
+
+    def get(self, path: str) -> Optional[bytes]:
+        data = self._entries.get(path)
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(path)
+        self.hits += 1
+        return data
+
+    def put(self, path: str, data: bytes):
+        if not self.admits(len(data)):
+            return
+        self.invalidate(path)
+        self._entries[path] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self, path: str):
+        data = self._entries.pop(path, None)
+        if data is not None:
+            self.size -= len(data)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "enabled": self.max_bytes > 0,
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "max_file_size": self.max_file_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / requests, 3) if requests else 0.0,
+        }
+
+
+_content_cache: Optional[ContentCache] = None
+
+
+def get_content_cache() -> ContentCache:
+    global _content_cache
+    if _content_cache is None:
+        settings = get_settings()
+        _content_cache = ContentCache(settings.content_cache_max_bytes, settings.content_cache_max_file_size)
+    return _content_cache
@@ -0,0 +1,241 @@
+"""
+Segmented, seekable encrypted container.
+
+On-disk layout::
+
+    header:  MAGIC (4) | version (1) | key id length (1) | key id | segment size (4) | nonce prefix (8)
+    body:    segment 0 | segment 1 | ... | final segment
+
+Every segment is ``segment_size`` bytes of plaintext (the final one may be
+shorter, or empty for an empty file) sealed with AES-GCM, so it takes
+``segment_size + TAG_SIZE`` bytes on disk. The nonce is the per-file random
+prefix followed by the segment index, and the associated data binds the
+header, the index and a "final" flag, so segments cannot be reordered,
+swapped between files or truncated without the tag check failing.
+
+Because all segments except the last have the same size, the plaintext size
+and the location of any byte offset follow from the file size alone.
+"""
+import os
+import struct
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"\x89FSE"
+VERSION = 1
+SEGMENT_SIZE = 64 * 1024
+TAG_SIZE = 16
+NONCE_PREFIX_SIZE = 8
+
+_FIXED_HEADER = struct.Struct(">4sBB")
+_SEGMENT_INFO = struct.Struct(">I")
+_SEGMENT_AAD = struct.Struct(">IB")
+
+# Largest possible header (key id length is a single byte)
+MAX_HEADER_SIZE = _FIXED_HEADER.size + 255 + _SEGMENT_INFO.size + NONCE_PREFIX_SIZE
+
+
+class EncryptionFormatError(ValueError):
+    """Raised when a container header is malformed or its key is unknown"""
+
+
+def is_segmented(prefix: bytes) -> bool:
+    """Check whether the leading bytes of a blob belong to this container format"""
+    return prefix[:len(MAGIC)] == MAGIC
+
+
+def _build_header(key_id: str, segment_size: int, nonce_prefix: bytes) -> bytes:
+    key_id_bytes = key_id.encode()
+    return (
+        _FIXED_HEADER.pack(MAGIC, VERSION, len(key_id_bytes))
+        + key_id_bytes
+        + _SEGMENT_INFO.pack(segment_size)
+        + nonce_prefix
+    )
+
+
+def _nonce(nonce_prefix: bytes, index: int) -> bytes:
+    return nonce_prefix + _SEGMENT_INFO.pack(index)
+
+
+def _aad(header: bytes, index: int, final: bool) -> bytes:
+    return header + _SEGMENT_AAD.pack(index, 1 if final else 0)
+
+
+class SegmentEncryptor:
+    """
+    Incremental encryptor: ``update()`` returns whatever ciphertext is ready,
+    ``finalize()`` returns the last segment.
+    """
+
+    def __init__(self, aead: AESGCM, key_id: str, segment_size: int = SEGMENT_SIZE):
+        self._aead = aead
+        self._segment_size = segment_size
+        self._nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self.header = _build_header(key_id, segment_size, self._nonce_prefix)
+        self._header_sent = False
+        self._buffer = bytearray()
+        self._index = 0
+
+    def _seal(self, data: bytes, final: bool) -> bytes:
+        sealed = self._aead.encrypt(
+            _nonce(self._nonce_prefix, self._index), data, _aad(self.header, self._index, final)
+        )
+        self._index += 1
+        return sealed
+
+    def _take_header(self) -> bytes:
+        if self._header_sent:
+            return b""
+        self._header_sent = True
+        return self.header
+
+    def update(self, data: bytes) -> bytes:
+        out = [self._take_header()]
+        self._buffer += data
+        # Keep at least one byte back: only finalize() knows which segment is last
+        while len(self._buffer) > self._segment_size:
+            out.append(self._seal(bytes(self._buffer[:self._segment_size]), final=False))
+            del self._buffer[:self._segment_size]
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        out = self._take_header() + self._seal(bytes(self._buffer), final=True)
+        self._buffer.clear()
+        return out
+
+
+class SegmentSealer:
+    """
+    Seals segments by index for a container whose plaintext size is known up
+    front, so they can be produced in any order and by different processes
+    (e.g. chunks of a resumable upload). The output is byte-for-byte what
+    ``SegmentEncryptor`` would write for the same nonce prefix.
+
+    Sealing is deterministic for a given prefix, index and plaintext: writing
+    the same segment twice is harmless, but sealing *different* plaintext under
+    the same index reuses a nonce and must never happen.
+    """
+
+    def __init__(
+        self,
+        aead: AESGCM,
+        key_id: str,
+        size: int,
+        segment_size: int = SEGMENT_SIZE,
+        nonce_prefix: Optional[bytes] = None,
+    ):
+        self._aead = aead
+        self.key_id = key_id
+        self.size = size
+        self.segment_size = segment_size
+        self.nonce_prefix = nonce_prefix or os.urandom(NONCE_PREFIX_SIZE)
+        if len(self.nonce_prefix) != NONCE_PREFIX_SIZE:
+            raise ValueError("Invalid nonce prefix")
+        self.header = _build_header(key_id, segment_size, self.nonce_prefix)
+        # An empty file still has one (empty) final segment
+        self.segment_count = max(-(-size // segment_size), 1)
+
+    def segment_offset(self, index: int) -> int:
+        """File offset of a sealed segment"""
+        return len(self.header) + index * (self.segment_size + TAG_SIZE)
+
+    def seal(self, index: int, data: bytes) -> bytes:
+        if not 0 <= index < self.segment_count:
+            raise ValueError(f"Segment index out of range: {index}")
+        expected = min(self.segment_size, self.size - index * self.segment_size)
+        if len(data) != expected:
+            raise ValueError(f"Segment {index} must be {expected} bytes, got {len(data)}")
+        final = index == self.segment_count - 1
+        return self._aead.encrypt(_nonce(self.nonce_prefix, index), data, _aad(self.header, index, final))
+
+
+class SegmentReader:
+    """
+    Random access reader over an encrypted container opened in binary mode.
+
+    ``key_lookup`` maps the key id stored in the header to an ``AESGCM`` instance.
+    """
+
+    def __init__(self, f: BinaryIO, key_lookup: Callable[[str], AESGCM], file_size: Optional[int] = None):
+        self._f = f
+        f.seek(0)
+        fixed = f.read(_FIXED_HEADER.size)
+        if len(fixed) < _FIXED_HEADER.size:
+            raise EncryptionFormatError("Truncated header")
+        magic, version, key_id_len = _FIXED_HEADER.unpack(fixed)
+        if magic != MAGIC:
+            raise EncryptionFormatError("Not a segmented container")
+        if version != VERSION:
+            raise EncryptionFormatError(f"Unsupported container version: {version}")
+        rest = f.read(key_id_len + _SEGMENT_INFO.size + NONCE_PREFIX_SIZE)
+        if len(rest) < key_id_len + _SEGMENT_INFO.size + NONCE_PREFIX_SIZE:
+            raise EncryptionFormatError("Truncated header")
+
+        self.key_id = rest[:key_id_len].decode()
+        (self.segment_size,) = _SEGMENT_INFO.unpack_from(rest, key_id_len)
+        self._nonce_prefix = rest[key_id_len + _SEGMENT_INFO.size:]
+        self.header = fixed + rest
+        self._aead = key_lookup(self.key_id)
+
+        if file_size is None:
+            file_size = f.seek(0, os.SEEK_END)
+        body_size = file_size - len(self.header)
+        stride = self.segment_size + TAG_SIZE
+        if body_size < TAG_SIZE:
+            raise EncryptionFormatError("Missing final segment")
+        self.segment_count = -(-body_size // stride)
+        last_sealed = body_size - (self.segment_count - 1) * stride
+        if last_sealed < TAG_SIZE:
+            raise EncryptionFormatError("Truncated segment")
+        self.size = (self.segment_count - 1) * self.segment_size + last_sealed - TAG_SIZE
+
+    def segment_span(self, index: int) -> Tuple[int, int]:
+        """File offset and length of a sealed segment"""
+        stride = self.segment_size + TAG_SIZE
+        return len(self.header) + index * stride, stride
+
+    def open_segment(self, index: int, sealed: bytes) -> bytes:
+        """Authenticate and decrypt a sealed segment read from ``segment_span(index)``"""
+        final = index == self.segment_count - 1
+        return self._aead.decrypt(
+            _nonce(self._nonce_prefix, index), sealed, _aad(self.header, index, final)
+        )
+
+    def read_segment(self, index: int) -> bytes:
+        """Read and authenticate a single segment"""
+        offset, length = self.segment_span(index)
+        self._f.seek(offset)
+        return self.open_segment(index, self._f.read(length))
+
+    def plan_range(self, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """
+        Segments covering plaintext ``[start, end)`` as ``(index, lo, hi)``, where
+        ``lo:hi`` is the slice of that segment's plaintext to return.
+
+        An empty container still yields its final segment (with an empty slice)
+        so that it gets authenticated.
+        """
+        if end is None or end > self.size:
+            end = self.size
+        if start >= end:
+            return [(0, 0, 0)] if self.size == 0 else []
+        first = start // self.segment_size
+        last = (end - 1) // self.segment_size
+        plan = []
+        for index in range(first, last + 1):
+            offset = index * self.segment_size
+            length = min(self.segment_size, self.size - offset)
+            plan.append((index, max(start - offset, 0), min(end - offset, length)))
+        return plan
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield plaintext bytes ``[start, end)``, touching only the segments that cover them"""
+        for index, lo, hi in self.plan_range(start, end):
+            data = self.read_segment(index)
+            if hi > lo:
+                yield data[lo:hi] if lo or hi < len(data) else data
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_range()
@@ -0,0 +1,145 @@
+"""
+CPU talab qiladigan ishlarni (hash, shifrlash, decrypt) va bloklovchi disk I/O ni
+event loop dan tashqarida bajarish.
+
+Hovuz hajmi ``Settings.cpu_executor_workers`` / ``Settings.io_executor_workers`` orqali
+belgilanadi (0 - inline, hovuzsiz). Navbat ``*_max_queue`` bilan cheklangan: navbat
+to'lganda yangi ishlar joy bo'shaguncha kutadi (back-pressure), xotira cheksiz o'smaydi.
+I/O alohida hovuzda: sekin fsync shifrlash ishlarini to'sib qo'ymaydi va aksincha.
+
+hashlib va OpenSSL katta buferlar bilan ishlaganda GIL ni qo'yib yuboradi, shuning uchun
+thread hovuzi yetarli; inkremental hasher/encryptor holatini process larga uzatib bo'lmaydi.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, TypeVar
+
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+_SENTINEL = object()
+
+
+class BoundedExecutor:
+    """Navbati cheklangan thread hovuzi va uning ko'rsatkichlari"""
+
+    def __init__(self, max_workers: int, max_queue: int, name: str = "cpu"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name) if max_workers > 0 else None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Semaphore event loop ga bog'lanadi (testlarda har bir test o'z loop ida)
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+            self._slots_loop = loop
+        return self._slots
+
+    def _track(self, func: Callable[..., T], args, submitted: float) -> T:
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_wait_seconds += started - submitted
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.total_run_seconds += time.perf_counter() - started
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """Funksiyani hovuzda bajarish va natijasini kutish"""
+        if self._pool is None:
+            return func(*args)
+        async with self._get_slots():
+            with self._lock:
+                self.queued += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queued)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, self._track, func, args, time.perf_counter())
+
+    async def iterate(self, iterable: Iterable[T]) -> AsyncIterator[T]:
+        """Sinxron iteratorning har bir ``next()`` chaqiruvini hovuzda bajarish"""
+        iterator = iter(iterable)
+        try:
+            while True:
+                item = await self.run(next, iterator, _SENTINEL)
+                if item is _SENTINEL:
+                    break
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "max_queue_depth": self.max_queue_depth,
+                "avg_wait_ms": round(self.total_wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                "avg_run_ms": round(self.total_run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+
+_executors: Dict[str, BoundedExecutor] = {}
+
+
+def get_cpu_executor() -> BoundedExecutor:
+    """Jarayon bo'yicha yagona CPU hovuzi (sozlamalardan yaratiladi)"""
+    if "cpu" not in _executors:
+        settings = get_settings()
+        _executors["cpu"] = BoundedExecutor(settings.cpu_executor_workers, settings.cpu_executor_max_queue, "cpu")
+    return _executors["cpu"]
+
+
+def get_io_executor() -> BoundedExecutor:
+    """Jarayon bo'yicha yagona disk I/O hovuzi (sozlamalardan yaratiladi)"""
+    if "io" not in _executors:
+        settings = get_settings()
+        _executors["io"] = BoundedExecutor(settings.io_executor_workers, settings.io_executor_max_queue, "io")
+    return _executors["io"]
+
+
+async def run_cpu(func: Callable[..., T], *args) -> T:
+    """CPU ishini umumiy hovuzda bajarish"""
+    return await get_cpu_executor().run(func, *args)
+
+
+async def run_io(func: Callable[..., T], *args) -> T:
+    """Bloklovchi disk operatsiyasini I/O hovuzida bajarish"""
+    return await get_io_executor().run(func, *args)
+
+
+def iterate_cpu(iterable: Iterable[T]) -> AsyncIterator[T]:
+    """Sinxron (decrypt qiluvchi) iteratorni umumiy hovuz orqali async iteratorga aylantirish"""
+    return get_cpu_executor().iterate(iterable)
+
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
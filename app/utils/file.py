@@ -1,9 +1,16 @@
+import io
 import os
-from typing import Tuple
-import pandas as pd
+import time
+import hashlib
+from typing import AsyncIterator, Iterator, Optional, Tuple
 from datetime import datetime
-from fastapi import HTTPException
-from .security import encrypt_file
+from fastapi import HTTPException, UploadFile
+from . import storage
+from .compression import IDENTITY, choose_codec, new_compressor, new_decompressor
+from .encryption import MAX_HEADER_SIZE, SegmentReader, SegmentSealer, is_segmented
+from .executor import run_cpu, iterate_cpu
+from .metrics import UPLOADS_IN_PROGRESS, StageClock
+from .security import new_encryptor, open_encrypted, iter_decrypt_legacy
 
 # Ruxsat etilgan fayl turlari va maksimal hajm
 ALLOWED_EXTENSIONS = {
@@ -20,37 +27,296 @@ ALLOWED_EXTENSIONS = {
 __all__ = ['ALLOWED_EXTENSIONS']
 
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+CHUNK_SIZE = 64 * 1024  # Yuklashda bir martada o'qiladigan bo'lak (64KB)
 
-def validate_file(content_type: str, file_size: int):
-    """Fayl turini va hajmini tekshirish"""
+def validate_file_type(content_type: str):
+    """Fayl turini tekshirish"""
     if content_type not in ALLOWED_EXTENSIONS.values():
         raise HTTPException(status_code=400, detail=f"File type not allowed. Allowed types are: {', '.join(ALLOWED_EXTENSIONS.keys())}")
-    
+
+def validate_file_size(file_size: int):
+    """Fayl hajmini tekshirish"""
     if file_size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail=f"File size too large. Maximum size is {MAX_FILE_SIZE/1024/1024}MB")
 
-def save_file_to_disk(upload_folder: str, file_data: bytes, filename: str) -> Tuple[str, str]:
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
 
-    unique_name = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{filename}"
-    file_path = os.path.join(upload_folder, unique_name)
+async def write_upload_to_temp(upload_folder: str, upload: UploadFile, chunk_size: int = CHUNK_SIZE) -> Tuple[storage.TempFile, str, int, str]:
+    """
+    Yuklanayotgan faylni bo'laklab o'qib, vaqtinchalik faylga shifrlab yozish.
+
+    Har bir bo'lak kelishi bilan SHA-256 yangilanadi, hajm cheklovi tekshiriladi,
+    (kerak bo'lsa) siqiladi, shifrlanadi va diskka yoziladi - xotirada bir vaqtda
+    faqat bir nechta bo'lak turadi. Kodek birinchi bo'lak bo'yicha tanlanadi
+    (``compression.choose_codec``); hash va hajm asl tarkibniki.
+
+    Returns:
+        Tuple[TempFile, str, int, str]: (ochiq vaqtinchalik fayl, hash, hajm, kodek)
+    """
+    temp = await storage.create_temp_file(upload_folder)
+    hasher = hashlib.sha256()
+    encryptor = new_encryptor()
+    file_size = 0
+    codec = compressor = None
+    clock = StageClock()
+    in_progress = UPLOADS_IN_PROGRESS.labels("stream")
+    in_progress.inc()
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            file_size += len(chunk)
+            validate_file_size(file_size)
+            if compressor is None:
+                codec = await run_cpu(choose_codec, getattr(upload, "content_type", None), chunk)
+                compressor = new_compressor(codec)
+            # Hash, siqish va shifrlash CPU hovuzida, yozish I/O hovuzida - event loop bo'sh qoladi
+            sealed = await run_cpu(_hash_compress_encrypt, hasher, compressor, encryptor, chunk, clock)
+            started = time.perf_counter()
+            await temp.write(sealed)
+            clock.add("write", time.perf_counter() - started)
+        sealed = await run_cpu(_encrypt_tail, compressor, encryptor, clock)
+        await temp.write(sealed)
+    except BaseException:
+        await temp.discard()
+        raise
+    finally:
+        in_progress.dec()
+        clock.observe()
+
+    return temp, hasher.hexdigest(), file_size, codec or IDENTITY
+
+
+def _hash_compress_encrypt(hasher, compressor, encryptor, chunk: bytes, clock: StageClock) -> bytes:
+    started = time.perf_counter()
+    hasher.update(chunk)
+    hashed = time.perf_counter()
+    compressed = compressor.compress(chunk)
+    compressed_at = time.perf_counter()
+    sealed = encryptor.update(compressed)
+    clock.add("hash", hashed - started)
+    if compressed is not chunk:  # identity kodek bo'lakni o'zini qaytaradi
+        clock.add("compress", compressed_at - hashed)
+    clock.add("encrypt", time.perf_counter() - compressed_at)
+    return sealed
+
+
+def _encrypt_tail(compressor, encryptor, clock: StageClock) -> bytes:
+    """Siquvchi va shifrlovchidagi qoldiq (bo'sh fayl uchun ham oxirgi segment)"""
+    started = time.perf_counter()
+    tail = compressor.flush() if compressor is not None else b""
+    sealed = encryptor.update(tail) + encryptor.finalize()
+    clock.add("encrypt", time.perf_counter() - started)
+    return sealed
+
+
+def make_saved_name(filename: str) -> str:
+    """Yuklash vaqti bilan boshlanadigan noyob saqlash nomi (URL dagi sana shundan olinadi)"""
+    return f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{filename}"
+
+
+def blob_path(blob_folder: str, hash_code: str) -> str:
+    """
+    Blobning hash bo'yicha joylashuvi: ``<blob_folder>/ab/cd/<hash>``.
+
+    Ikki darajali bo'lish har bir papkadagi fayllar sonini cheklaydi
+    (65536 ta papka, har birida hash bo'yicha teng taqsimlangan fayllar).
+    """
+    return os.path.join(blob_folder, hash_code[:2], hash_code[2:4], hash_code)
+
+
+def build_file_url(saved_name: str, path: str = "") -> str:
+    """
+    Faylni yuklab olish URL'i: ``/YYYY-MM-DD/<saved_name>``.
+
+    Sana saqlash nomining boshidagi vaqtdan olinadi, shuning uchun u fizik fayl
+    qayerda turishiga bog'liq emas. Eski nomlar uchun kunlik papka nomi ishlatiladi.
+    """
+    stamp = saved_name[:8]
+    if stamp.isdigit() and saved_name[8:20].isdigit():
+        return f"/{stamp[:4]}-{stamp[4:6]}-{stamp[6:8]}/{saved_name}"
+    path_parts = path.split(os.sep)
+    if len(path_parts) >= 2:
+        return f"/{path_parts[-2]}/{saved_name}"
+    return f"/{saved_name}"
+
+
+def chunk_count(size: int, chunk_size: int) -> int:
+    """Qismlab yuklashdagi qismlar soni (bo'sh fayl ham bitta bo'sh qism bilan yuklanadi)"""
+    return max(-(-size // chunk_size), 1)
+
+
+def chunk_length(size: int, chunk_size: int, number: int) -> int:
+    """``number`` - qismning kutilgan hajmi (oxirgisidan tashqari hammasi ``chunk_size``)"""
+    return min(chunk_size, size - number * chunk_size)
+
+
+def _seal_chunk(sealer: SegmentSealer, first_segment: int, data: bytes) -> bytes:
+    pieces = [data[i:i + sealer.segment_size] for i in range(0, len(data), sealer.segment_size)] or [b""]
+    return b"".join(sealer.seal(first_segment + i, piece) for i, piece in enumerate(pieces))
+
+
+async def write_chunk(file_path: str, sealer: SegmentSealer, chunk_size: int, number: int, data: bytes):
+    """
+    Qismni shifrlab vaqtinchalik faylning o'z joyiga yozish.
+
+    Qism chegaralari segment chegaralariga to'g'ri keladi, shuning uchun har bir qism
+    boshqalaridan mustaqil muhrlanadi va qismlar istalgan tartibda, parallel yozilishi mumkin.
+    """
+    first_segment = number * (chunk_size // sealer.segment_size)
+    clock = StageClock()
+    sealed = await run_cpu(clock.call, "encrypt", _seal_chunk, sealer, first_segment, data)
+    started = time.perf_counter()
+    await storage.write_at(file_path, sealer.segment_offset(first_segment), sealed)
+    clock.add("write", time.perf_counter() - started)
+    clock.observe()
+
+
+async def compress_encrypted_file(upload_folder: str, file_path: str, content_type: Optional[str]) -> Tuple[Optional[storage.TempFile], str, str]:
+    """
+    Qismlab yuklangan (siqilmasdan muhrlangan) faylni decrypt qilib asl tarkibning SHA-256
+    hashini hisoblash (har bir segment autentifikatsiya qilinadi).
+
+    Kodek ``write_upload_to_temp`` dagidek birinchi bo'lak bo'yicha tanlanadi; fayl
+    siqiladigan bo'lsa u siqilib yangi vaqtinchalik faylga qayta shifrlanadi.
+
+    Returns:
+        Tuple[Optional[TempFile], str, str]: (siqilgan vaqtinchalik fayl yoki None, hash, kodek)
+    """
+    hasher = hashlib.sha256()
+    temp = compressor = encryptor = None
+    codec = IDENTITY
+    clock = StageClock()
+    try:
+        async for chunk in iter_file_range(file_path):
+            if compressor is None:
+                codec = await run_cpu(choose_codec, content_type, chunk)
+                compressor = new_compressor(codec)
+                if codec != IDENTITY:
+                    temp = await storage.create_temp_file(upload_folder)
+                    encryptor = new_encryptor()
+            if temp is None:
+                await run_cpu(clock.call, "hash", hasher.update, chunk)
+                continue
+            sealed = await run_cpu(_hash_compress_encrypt, hasher, compressor, encryptor, chunk, clock)
+            started = time.perf_counter()
+            await temp.write(sealed)
+            clock.add("write", time.perf_counter() - started)
+        if temp is not None:
+            await temp.write(await run_cpu(_encrypt_tail, compressor, encryptor, clock))
+    except BaseException:
+        if temp is not None:
+            await temp.discard()
+        raise
+    finally:
+        clock.observe()
+    return temp, hasher.hexdigest(), codec
+
+
+async def _open_plaintext(f: storage.ReadFile) -> Optional[SegmentReader]:
+    """Segmentlangan fayl uchun reader (faqat header o'qiladi), eski format uchun None"""
+    head = await f.read_at(0, MAX_HEADER_SIZE)
+    if not is_segmented(head):
+        return None
+    return open_encrypted(io.BytesIO(head), file_size=f.size)
+
+
+def _legacy_size(file_path: str) -> int:
+    with open(file_path, "rb") as f:
+        return sum(len(chunk) for chunk in iter_decrypt_legacy(f))
+
+
+def _iter_legacy_range(file_path: str, start: int, end: Optional[int]) -> Iterator[bytes]:
+    with open(file_path, "rb") as f:
+        # Eski format: boshidan o'qib, keraksiz qismini tashlab yuborish
+        offset = 0
+        for chunk in iter_decrypt_legacy(f):
+            chunk_end = offset + len(chunk)
+            if end is not None and offset >= end:
+                break
+            if chunk_end > start:
+                lo = max(start - offset, 0)
+                hi = len(chunk) if end is None else min(end - offset, len(chunk))
+                yield chunk[lo:hi]
+            offset = chunk_end
+
+
+async def get_plaintext_size(file_path: str) -> int:
+    """
+    Shifrlangan faylning asl hajmini aniqlash.
+
+    Segmentlangan formatda faqat header o'qiladi; eski Fernet fayllarni esa
+    to'liq decrypt qilishga to'g'ri keladi.
+    """
+    async with await storage.open_read(file_path) as f:
+        reader = await _open_plaintext(f)
+    if reader is not None:
+        return reader.size
+    return await run_cpu(_legacy_size, file_path)
+
+
+async def iter_file_range(file_path: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Faylning ``[start, end)`` oralig'ini decrypt qilib qaytarish.
+
+    Oraliq saqlangan (siqilgan bo'lsa - siqilgan) baytlar bo'yicha; asl tarkib
+    uchun ``iter_content_range``.
+
+    Segmentlangan formatda faqat shu oraliqni qoplaydigan segmentlar o'qiladi:
+    o'qish I/O hovuzida, decrypt CPU hovuzida bajariladi.
+    """
+    async with await storage.open_read(file_path) as f:
+        reader = await _open_plaintext(f)
+        if reader is None:
+            async for chunk in iterate_cpu(_iter_legacy_range(file_path, start, end)):
+                yield chunk
+            return
+        clock = StageClock()
+        try:
+            for index, lo, hi in reader.plan_range(start, end):
+                started = time.perf_counter()
+                sealed = await f.read_at(*reader.segment_span(index))
+                clock.add("read", time.perf_counter() - started)
+                data = await run_cpu(clock.call, "decrypt", reader.open_segment, index, sealed)
+                if hi > lo:
+                    yield data[lo:hi] if lo or hi < len(data) else data
+        finally:
+            clock.observe()
+
 
-    # Faylni shifrlash
-    encrypted_data = encrypt_file(file_data)
-    
-    with open(file_path, "wb") as f:
-        f.write(encrypted_data)
+def _decompress_range(decompressor, data: bytes, offset: int, start: int, end: Optional[int]) -> Tuple[bytes, int]:
+    """Ochilgan bo'lakning ``[start, end)`` ga tushgan qismi va keyingi bo'lak boshi"""
+    data = decompressor.decompress(data) if data is not None else decompressor.flush()
+    chunk_end = offset + len(data)
+    lo = max(start - offset, 0)
+    hi = len(data) if end is None else max(min(end - offset, len(data)), 0)
+    return data[lo:hi] if lo < hi else b"", chunk_end
 
-    return unique_name, file_path
 
+async def iter_content_range(file_path: str, codec: str = IDENTITY, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Asl tarkibning ``[start, end)`` oralig'i (decrypt va kerak bo'lsa siqilgandan ochish).
 
-def save_to_excel(file_data: dict, excel_path: str):
-    new_data = pd.DataFrame([file_data])
+    Siqilmagan faylda faqat kerakli segmentlar o'qiladi. Siqilgan fayl esa boshidan
+    ochiladi (gzip/zstd oqimida ixtiyoriy joyga o'tib bo'lmaydi), ``end`` ga yetganda to'xtaydi.
+    """
+    if codec == IDENTITY:
+        async for chunk in iter_file_range(file_path, start, end):
+            yield chunk
+        return
 
-    if not os.path.isfile(excel_path):
-        new_data.to_excel(excel_path, index=False)
-    else:
-        df = pd.read_excel(excel_path)
-        df = pd.concat([df, new_data], ignore_index=True)
-        df.to_excel(excel_path, index=False)
\ No newline at end of file
+    decompressor = new_decompressor(codec)
+    offset = 0
+    clock = StageClock()
+    try:
+        async for stored in iter_file_range(file_path):
+            data, offset = await run_cpu(clock.call, "decompress", _decompress_range, decompressor, stored, offset, start, end)
+            if data:
+                yield data
+            if end is not None and offset >= end:
+                return
+        data, offset = await run_cpu(clock.call, "decompress", _decompress_range, decompressor, None, offset, start, end)
+        if data:
+            yield data
+    finally:
+        clock.observe()
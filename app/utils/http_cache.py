@@ -0,0 +1,82 @@
+"""HTTP keshlash (ETag, Last-Modified, shartli GET) yordamchilari"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+
+def http_date(value: datetime) -> str:
+    """Datetime ni HTTP-date formatiga o'tkazish"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def make_etag(hash_code: str, encoding: Optional[str] = None) -> str:
+    """
+    Fayl tarkibining SHA-256 hashidan kuchli ETag.
+
+    Siqilgan (``Content-Encoding``) ko'rinish boshqa baytlar, shuning uchun uning ETag i farq qiladi.
+    """
+    if encoding:
+        return f'"{hash_code}-{encoding}"'
+    return f'"{hash_code}"'
+
+
+def cache_control(public: bool, max_age: int) -> str:
+    """
+    Saqlangan nom va tarkib o'zgarmaydi, shuning uchun public fayllar uzoq keshlanadi.
+    Xususiy fayllar har safar (arzon 304 bilan) tekshiriladi. Yuklab olish doim
+    ``Authorization`` bilan so'raladi, shuning uchun javob faqat brauzerda (``private``)
+    saqlanadi - umumiy (proxy, CDN) keshlarga tushmaydi.
+    """
+    if public:
+        return f"private, max-age={max_age}, immutable"
+    return "private, no-cache"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """``If-None-Match`` uchun kuchsiz solishtirish (RFC 9110 13.1.2)"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: datetime,
+) -> bool:
+    """
+    Mijozdagi nusxa hali ham yangi bo'lsa True (304 qaytarish kerak).
+
+    ``If-None-Match`` bor bo'lsa ``If-Modified-Since`` e'tiborga olinmaydi.
+    """
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since:
+        since = parse_http_date(if_modified_since)
+        if since is None:
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP-date sekund aniqligida
+        return last_modified.replace(microsecond=0) <= since
+    return False
@@ -0,0 +1,114 @@
+"""HTTP Range (RFC 9110) so'rovlarini qayta ishlash yordamchilari"""
+import uuid
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Tuple
+
+from .http_cache import http_date, parse_http_date
+
+# Juda ko'p mayda oraliqlar bilan serverni band qilishning oldini olish
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    """Hech bir oraliq fayl hajmiga to'g'ri kelmaganda (416)"""
+
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    ``Range`` headerini ``[start, end)`` oraliqlar ro'yxatiga aylantirish.
+
+    Header bo'lmasa yoki noto'g'ri bo'lsa None qaytaradi (to'liq javob yuboriladi).
+    Hech bir oraliq qanoatlantirilmasa ``RangeNotSatisfiable`` ko'tariladi.
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    parts = [part.strip() for part in spec.split(",") if part.strip()]
+    if not parts or len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) + 1 if last else max(size, start + 1)
+                if start < 0 or end <= start:
+                    return None
+            else:
+                # Suffix oraliq: oxirgi N bayt
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start, end = max(size - suffix, 0), size
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size)))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+    return ranges
+
+
+def if_range_matches(if_range: Optional[str], etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """
+    ``If-Range`` sharti bajarilsa (yoki header bo'lmasa) True.
+
+    ETag kuchli solishtiriladi, sana esa ``Last-Modified`` bilan aynan teng bo'lishi kerak.
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return etag is not None and not if_range.startswith("W/") and if_range == etag
+    if last_modified is None:
+        return False
+    since = parse_http_date(if_range)
+    return since is not None and since == parse_http_date(http_date(last_modified))
+
+
+def content_range(start: int, end: int, size: int) -> str:
+    return f"bytes {start}-{end - 1}/{size}"
+
+
+def multipart_byteranges(
+    ranges: List[Tuple[int, int]],
+    size: int,
+    content_type: str,
+    read_range: Callable[[int, int], AsyncIterable[bytes]],
+) -> Tuple[str, int, AsyncIterator[bytes]]:
+    """
+    ``multipart/byteranges`` javobini tayyorlash.
+
+    Returns:
+        Tuple[str, int, AsyncIterator[bytes]]: (Content-Type, Content-Length, body)
+    """
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: {content_range(start, end, size)}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    closing = f"--{boundary}--\r\n".encode()
+    length = sum(len(h) + (end - start) + 2 for h, (start, end) in zip(part_headers, ranges)) + len(closing)
+
+    async def body():
+        for header, (start, end) in zip(part_headers, ranges):
+            yield header
+            async for chunk in read_range(start, end):
+                yield chunk
+            yield b"\r\n"
+        yield closing
+
+    return f"multipart/byteranges; boundary={boundary}", length, body()
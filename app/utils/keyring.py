@@ -0,0 +1,161 @@
+"""
+Fayllarni shifrlash kalitlari to'plami: barcha workerlar va nodelar uchun umumiy, rotatsiya bilan.
+
+Kalitlar - Fernet formatidagi maxfiy kalitlar, birinchisi faol (yangi fayllar shu bilan
+shifrlanadi), qolganlari faqat o'qish uchun. Manba (birinchi berilgani):
+
+- ``ENCRYPTION_KEYS`` (JSON ro'yxat); ``FERNET_KEY`` berilgan bo'lsa oxiriga qo'shiladi
+- ``FERNET_KEY`` - yagona kalit (avvalgi sozlama)
+- ``encryption_key_file`` (``{"keys": [...]}``) - yo'q bo'lsa birinchi ishga tushgan worker
+  yaratadi, qolgan workerlar va qayta ishga tushishlar shu faylni o'qiydi. Bir nechta
+  nodeda fayl umumiy diskda bo'lishi yoki har bir nodega bir xil nusxasi qo'yilishi kerak.
+  Avvalgi standart joyda (``app/keys/encryption.json``) fayl bo'lsa yangisi uning
+  kalitlari bilan yaratiladi
+
+Segmentlangan fayl headeriga kalit id (AES kalitining SHA-256 boshi) yoziladi, shuning
+uchun kalit to'plamda turgan ekan u bilan shifrlangan fayllarni istalgan worker o'qiydi.
+
+Rotatsiya: ``python manage.py rotate_encryption_key`` kalit fayli boshiga yangi kalit
+qo'shadi. Workerlar faylni ``encryption_key_reload_seconds`` da bir tekshiradi (noma'lum
+kalit id uchrasa darhol). Eski fayllar ``python manage.py migrate_encryption`` bilan faol
+kalitga qayta shifrlanadi; shundan keyin eski kalitni fayldan olib tashlash mumkin.
+"""
+import base64
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.fernet import Fernet, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from app.core.config import get_settings
+
+
+def derive_segment_key(secret: bytes) -> bytes:
+    """Segmentlangan (AES-GCM) fayllar uchun kalit Fernet kalitidan HKDF bilan olinadi"""
+    return HKDF(
+        algorithm=hashes.SHA256(), length=32, salt=None, info=b"fastapi-file-server segments"
+    ).derive(base64.urlsafe_b64decode(secret))
+
+
+def segment_key_id(segment_key: bytes) -> str:
+    return hashlib.sha256(segment_key).hexdigest()[:16]
+
+
+class EncryptionKeyring:
+    """Kalit id -> AES-GCM; eski Fernet fayllari uchun ``fernet`` (shifrlash faol kalit bilan)"""
+
+    def __init__(self, secrets: List[bytes]):
+        if not secrets:
+            raise ValueError("Encryption keyring is empty")
+        self.secrets = list(dict.fromkeys(secrets))
+        self.ciphers: Dict[str, AESGCM] = {}
+        for secret in self.secrets:
+            segment_key = derive_segment_key(secret)
+            self.ciphers.setdefault(segment_key_id(segment_key), AESGCM(segment_key))
+        self.active_key_id = next(iter(self.ciphers))
+        self.active_cipher = self.ciphers[self.active_key_id]
+        self.fernet = MultiFernet([Fernet(secret) for secret in self.secrets])
+
+
+def read_key_file(path: str) -> List[bytes]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [key.encode() for key in json.load(f)["keys"]]
+
+
+def _write_temp(path: str, secrets: List[bytes]) -> str:
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    temp_path = os.path.join(folder, f".{uuid.uuid4().hex}.part")
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"keys": [secret.decode() for secret in secrets]}, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    return temp_path
+
+
+def create_key_file(path: str, secrets: Optional[List[bytes]] = None) -> bool:
+    """
+    Kalit faylini yaratish (``secrets`` berilmasa yangi kalit bilan). Bir vaqtda ishga tushgan
+    workerlardan faqat bittasiniki qoladi (``os.link`` mavjud faylni almashtirmaydi); yaratilmasa ``False``
+    """
+    temp_path = _write_temp(path, secrets or [Fernet.generate_key()])
+    try:
+        os.link(temp_path, path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(temp_path)
+
+
+def rotate_key_file(path: str) -> str:
+    """Kalit fayli boshiga yangi (faol) kalit qo'shish; uning kalit id sini qaytaradi"""
+    secrets = read_key_file(path) if os.path.exists(path) else []
+    secret = Fernet.generate_key()
+    os.replace(_write_temp(path, [secret] + secrets), path)
+    return segment_key_id(derive_segment_key(secret))
+
+
+# Avvalgi standart joy (manba papkasi ichida)
+LEGACY_KEY_FILE = "app/keys/encryption.json"
+
+
+def key_file_path() -> str:
+    return os.path.expanduser(get_settings().encryption_key_file)
+
+
+def _file_state(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+_keyring: Optional[EncryptionKeyring] = None
+# Kalit fayli (o'qilgan paytdagi holati) va oxirgi tekshiruv vaqti; sozlamadan olinganda None
+_loaded_state: Optional[Tuple[int, int, int]] = None
+_checked_at = 0.0
+
+
+def reload_keyring() -> EncryptionKeyring:
+    """Kalitlarni sozlamadan yoki (o'zgargan bo'lsa) kalit faylidan qayta o'qish"""
+    global _keyring, _loaded_state, _checked_at
+    settings = get_settings()
+    _checked_at = time.monotonic()
+    if settings.encryption_keys or settings.fernet_key:
+        secrets = [key.encode() for key in settings.encryption_keys]
+        if settings.fernet_key:
+            secrets.append(settings.fernet_key.encode())
+        if _keyring is None or _keyring.secrets != list(dict.fromkeys(secrets)):
+            _keyring = EncryptionKeyring(secrets)
+        _loaded_state = None
+        return _keyring
+
+    path = key_file_path()
+    state = _file_state(path)
+    if state is None:
+        # Eski joydagi kalitlar bilan shifrlangan fayllar o'qilishi uchun ular ko'chiriladi
+        legacy = read_key_file(LEGACY_KEY_FILE) if os.path.exists(LEGACY_KEY_FILE) else None
+        create_key_file(path, legacy)
+        state = _file_state(path)
+    if _keyring is None or state != _loaded_state:
+        _keyring = EncryptionKeyring(read_key_file(path))
+        _loaded_state = state
+    return _keyring
+
+
+def get_keyring() -> EncryptionKeyring:
+    if _keyring is None or (
+        _loaded_state is not None
+        and time.monotonic() - _checked_at >= get_settings().encryption_key_reload_seconds
+    ):
+        return reload_keyring()
+    return _keyring
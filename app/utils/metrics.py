@@ -0,0 +1,237 @@
+"""
+Prometheus ko'rsatkichlari (``GET /metrics``).
+
+- ``http_request_duration_seconds{method, route, status}`` - so'rov boshidan javobning
+  oxirgi baytigacha (oqimli yuklab olishlar ham to'liq); ``route`` - yo'l shabloni
+  (``/{date}/{filename}``), shuning uchun label lar soni cheklangan
+- ``http_request_bytes_total`` / ``http_response_bytes_total{route}`` - yuklangan va
+  yuklab olingan baytlar (tana bo'yicha)
+- ``file_server_stage_duration_seconds{stage}`` - fayl bo'yicha bosqichlar: hash, siqish,
+  shifrlash, diskka yozish/commit, decrypt, ochish, audit yozuvi
+- ``file_server_db_duration_seconds{operation}`` - ``app.crud`` funksiyalari; diskka yozadigan
+  yoki blob qulfini kutadiganlarida faqat ORM chaqiruvlari (``timed_query_parts``)
+- ``file_server_rate_limit_duration_seconds{result}`` - rate limit tekshiruvi (backend bo'yicha)
+- ``file_server_rate_limit_fallbacks_total`` - Redis ishlamagani uchun lokal hal qilingan tekshiruvlar
+- ``file_server_uploads_total{result}`` va ``file_server_dedup_hit_ratio`` - dedup
+- ``file_server_uploads_in_progress{kind}`` - hozir qabul qilinayotgan yuklashlar
+
+Bosqich vaqtlari har bir bo'lakda emas, fayl bo'yicha yig'ilib bir marta yoziladi
+(``StageClock``) - o'lchash xarajati bo'lak sonidan qat'i nazar bir nechta mikrosekund.
+Ko'rsatkichlar worker (jarayon) bo'yicha; ``PROMETHEUS_MULTIPROC_DIR`` berilsa barcha
+workerlarniki birlashtiriladi.
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from .timing import add_span
+
+# Bosqichlar mikrosekunddan (kichik bo'lak) sekundlargacha (50MB fayl)
+_FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the last response byte",
+    ["method", "route", "status"], buckets=_FAST_BUCKETS + (30, 60),
+)
+REQUEST_BYTES = Counter("http_request_bytes", "HTTP request body bytes received", ["route"])
+RESPONSE_BYTES = Counter("http_response_bytes", "HTTP response body bytes sent", ["route"])
+STAGE_SECONDS = Histogram(
+    "file_server_stage_duration_seconds", "Time spent per file in a processing stage", ["stage"], buckets=_FAST_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    "file_server_db_duration_seconds", "Time spent in app.crud operations", ["operation"], buckets=_FAST_BUCKETS,
+)
+RATE_LIMIT_SECONDS = Histogram(
+    "file_server_rate_limit_duration_seconds", "Time spent in the rate limit check", ["result"],
+    buckets=_FAST_BUCKETS,
+)
+RATE_LIMIT_FALLBACKS = Counter(
+    "file_server_rate_limit_fallbacks", "Rate limit checks decided locally because Redis was unavailable",
+)
+UPLOADS = Counter("file_server_uploads", "Stored uploads by deduplication result", ["result"])
+UPLOADS_IN_PROGRESS = Gauge(
+    "file_server_uploads_in_progress", "Uploads currently being received", ["kind"], multiprocess_mode="livesum",
+)
+DEDUP_HIT_RATIO = Gauge(
+    "file_server_dedup_hit_ratio", "Share of uploads that referenced an existing blob (this process)",
+    multiprocess_mode="liveall",
+)
+
+_upload_counts = {"new": 0, "duplicate": 0}
+DEDUP_HIT_RATIO.set_function(
+    lambda: _upload_counts["duplicate"] / max(_upload_counts["new"] + _upload_counts["duplicate"], 1)
+)
+
+
+def record_upload(duplicate: bool):
+    """Saqlangan yuklashni dedup natijasi bilan hisoblash"""
+    result = "duplicate" if duplicate else "new"
+    _upload_counts[result] += 1
+    UPLOADS.labels(result).inc()
+
+
+def observe_stage(stage: str, seconds: float):
+    """Bosqich vaqtini histogramga va joriy so'rovning span lariga yozish"""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    add_span(stage, seconds)
+
+
+class StageClock:
+    """
+    Bir fayl bo'yicha bosqichlar vaqtini yig'ib, oxirida bir marta histogramga yozish.
+
+    ``add`` CPU hovuzidagi funksiyalardan ham chaqiriladi; bir fayl bo'laklari ketma-ket
+    ishlanadi, shuning uchun qulf kerak emas.
+    """
+
+    __slots__ = ("totals",)
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def call(self, stage: str, func, *args):
+        """``func(*args)`` ni bajarib vaqtini ``stage`` ga qo'shish (hovuz navbatidagi kutish kirmaydi)"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def observe(self):
+        """Histogramga yozish va joriy so'rovning span lariga qo'shish (event loop da chaqiriladi)"""
+        for stage, seconds in self.totals.items():
+            observe_stage(stage, seconds)
+        self.totals.clear()
+
+
+def timed_query(func):
+    """``app.crud`` korutinasi vaqtini ``file_server_db_duration_seconds`` ga va ``db.<nom>`` span iga yozish"""
+    histogram = DB_SECONDS.labels(func.__name__)
+    span_name = f"db.{func.__name__}"
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            histogram.observe(seconds)
+            add_span(span_name, seconds)
+
+    return wrapper
+
+
+# ``timed_query_parts`` funksiyasining shu paytgacha o'lchangan DB vaqti
+_query_total: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar("query_total", default=None)
+
+
+def timed_query_parts(func):
+    """
+    ``timed_query`` kabi, lekin faqat ``query_part`` bilan belgilangan qismlar (ORM chaqiruvlari)
+    yig'iladi: disk I/O va blob qulfini kutish DB vaqtiga kirmaydi
+    """
+    histogram = DB_SECONDS.labels(func.__name__)
+    span_name = f"db.{func.__name__}"
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        total = [0.0]
+        token = _query_total.set(total)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _query_total.reset(token)
+            histogram.observe(total[0])
+            add_span(span_name, total[0])
+
+    return wrapper
+
+
+@contextmanager
+def query_part(name: Optional[str] = None):
+    """``timed_query_parts`` funksiyasining DB qismi; ``name`` berilsa alohida ``db.<name>`` span"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        total = _query_total.get()
+        if total is not None:
+            total[0] += seconds
+        if name:
+            add_span(f"db.{name}", seconds)
+
+
+class PrometheusMiddleware:
+    """So'rov vaqti va tana baytlarini yo'l shabloni bo'yicha yozuvchi ASGI middleware"""
+
+    def __init__(self, app):
+        self.app = app
+        # ``labels()`` har chaqiruvda qulf oladi; label kombinatsiyalari cheklangan, shuning uchun keshlanadi
+        self._children: Dict[tuple, tuple] = {}
+
+    def _metrics_for(self, method: str, route: str, status: int) -> tuple:
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                REQUEST_SECONDS.labels(method, route, str(status)),
+                REQUEST_BYTES.labels(route),
+                RESPONSE_BYTES.labels(route),
+            )
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        received = sent = 0
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            # Router mos kelgan yo'lni scope ga yozadi (FastAPI: scope["route"])
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            seconds, request_bytes, response_bytes = self._metrics_for(scope["method"], route, status)
+            seconds.observe(time.perf_counter() - start)
+            if received:
+                request_bytes.inc(received)
+            if sent:
+                response_bytes.inc(sent)
+
+
+def render() -> Tuple[bytes, str]:
+    """Prometheus matn formatidagi ko'rsatkichlar va ularning Content-Type i"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
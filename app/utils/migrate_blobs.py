@@ -0,0 +1,64 @@
+"""
+Blob jadvalidan oldingi fayllarni hash bo'yicha blob joylashuviga o'tkazish.
+
+Har bir hash uchun mavjud nusxalardan biri ``blobs/ab/cd/<hash>`` ga ko'chiriladi,
+shu hashdagi barcha yozuvlar unga yo'naltiriladi va ``ref_count`` yozuvlar soniga
+teng blob yaratiladi. Ortiqcha nusxalar (dedup dan oldin yuklanganlar) o'chiriladi.
+URL lar o'zgarmaydi: fayl saqlash nomi bo'yicha topiladi.
+"""
+import logging
+import os
+from typing import Dict
+
+from tortoise.transactions import in_transaction
+
+from app.models.file import Blob, File
+from . import storage
+from .executor import run_io
+from .file import blob_path
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate_blobs(blob_folder: str, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Returns:
+        Dict[str, int]: blobs (yaratilgan), files (yo'naltirilgan yozuvlar),
+        removed (o'chirilgan ortiqcha nusxalar), missing (fayli topilmagan hashlar)
+    """
+    stats = {"blobs": 0, "files": 0, "removed": 0, "missing": 0}
+    migrated = set(await Blob.all().values_list("hash_code", flat=True))
+    hashes = await File.exclude(hash_code__in=migrated).distinct().values_list("hash_code", flat=True)
+
+    for hash_code in hashes:
+        files = await File.filter(hash_code=hash_code).order_by("id")
+        paths = list(dict.fromkeys(file.path for file in files))
+        source = None
+        for path in paths:
+            if await storage.path_exists(path):
+                source = path
+                break
+        if source is None:
+            stats["missing"] += 1
+            logger.warning("No file on disk for %s", hash_code)
+            continue
+
+        stats["blobs"] += 1
+        stats["files"] += len(files)
+        stats["removed"] += len(paths) - 1
+        if dry_run:
+            continue
+
+        target = blob_path(blob_folder, hash_code)
+        await storage.ensure_dir(os.path.dirname(target))
+        await run_io(os.replace, source, target)
+        async with in_transaction() as connection:
+            await Blob.create(
+                hash_code=hash_code, path=target, size=files[0].size,
+                ref_count=len(files), using_db=connection
+            )
+            await File.filter(hash_code=hash_code).using_db(connection).update(path=target)
+        for path in paths:
+            if path != source:
+                await storage.remove_file(path)
+    return stats
@@ -0,0 +1,81 @@
+"""
+Eski Fernet bloblarini segmentlangan (AES-GCM) formatga o'tkazish va faol bo'lmagan
+(rotatsiyadan oldingi) kalit bilan shifrlangan fayllarni faol kalit bilan qayta shifrlash.
+
+Fayl yo'li o'zgarmaydi, shuning uchun DB yozuvlarini yangilash shart emas.
+Har bir fayl vaqtinchalik faylga yoziladi va ``os.replace`` bilan almashtiriladi,
+o'qiyotgan so'rovlar eski nusxani oxirigacha o'qiydi.
+"""
+import logging
+import os
+import uuid
+from typing import Dict
+
+from .encryption import MAGIC, SegmentReader, is_segmented
+from .keyring import get_keyring
+from .security import get_segment_cipher, iter_decrypt_legacy, new_encryptor
+
+logger = logging.getLogger(__name__)
+
+
+def _needs_migration(src) -> bool:
+    if not is_segmented(src.read(len(MAGIC))):
+        return True
+    return SegmentReader(src, get_segment_cipher).key_id != get_keyring().active_key_id
+
+
+def migrate_file(file_path: str) -> bool:
+    """
+    Bitta faylni yangi formatga (faol kalit bilan) o'tkazish. Fayl allaqachon
+    yangi formatda va faol kalit bilan shifrlangan bo'lsa False qaytaradi
+    """
+    with open(file_path, "rb") as src:
+        if is_segmented(src.read(len(MAGIC))):
+            reader = SegmentReader(src, get_segment_cipher)
+            if reader.key_id == get_keyring().active_key_id:
+                return False
+            chunks = iter(reader)
+        else:
+            src.seek(0)
+            chunks = iter_decrypt_legacy(src)
+
+        temp_path = os.path.join(os.path.dirname(file_path), f".{uuid.uuid4().hex}.part")
+        encryptor = new_encryptor()
+        try:
+            with open(temp_path, "wb") as dst:
+                for chunk in chunks:
+                    dst.write(encryptor.update(chunk))
+                dst.write(encryptor.finalize())
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return True
+
+
+def migrate_folder(upload_folder: str, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Papkadagi barcha eski formatdagi fayllarni o'tkazish.
+
+    Returns:
+        Dict[str, int]: migrated, skipped, failed sonlari
+    """
+    stats = {"migrated": 0, "skipped": 0, "failed": 0}
+    for root, _, files in os.walk(upload_folder):
+        for name in files:
+            if name.startswith("."):
+                continue
+            file_path = os.path.join(root, name)
+            try:
+                if dry_run:
+                    with open(file_path, "rb") as f:
+                        stats["migrated" if _needs_migration(f) else "skipped"] += 1
+                elif migrate_file(file_path):
+                    stats["migrated"] += 1
+                else:
+                    stats["skipped"] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                logger.warning("Failed to migrate %s: %r", file_path, e)
+    return stats
@@ -0,0 +1,47 @@
+"""
+Keyset (cursor) pagination uchun kursorlar.
+
+Kursor - sahifaning chekka yozuvi ``(sort_field qiymati, id)`` va yo'nalishni saqlovchi
+base64url JSON. Klient uchun u shaffof emas: faqat ``next_cursor`` / ``prev_cursor``
+sifatida olinadi va ``cursor`` parametri bilan qaytariladi.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+
+class InvalidCursor(ValueError):
+    """Kursor buzilgan yoki so'rovning saralash tartibiga mos emas"""
+
+
+def _encode_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(sort_field: str, sort_order: str, direction: str, value: Any, record_id: int) -> str:
+    payload = {"s": sort_field, "o": sort_order, "d": direction, "v": _encode_value(value), "id": record_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort_field: str, sort_order: str) -> dict:
+    """
+    Kursorni ochish va so'rov bilan mosligini tekshirish.
+
+    ``date`` maydoni uchun qiymat ``datetime`` ga qaytariladi.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict) or payload.get("d") not in ("next", "prev") or not isinstance(payload.get("id"), int):
+            raise InvalidCursor("Invalid cursor")
+        if sort_field == "date":
+            payload["v"] = datetime.fromisoformat(payload["v"])
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor")
+    if payload.get("s") != sort_field or payload.get("o") != sort_order:
+        raise InvalidCursor("Cursor does not match sort_by / sort_order")
+    return payload
@@ -0,0 +1,253 @@
+"""
+Bir nechta node: blob boshqa nodeda bo'lsa uni egasidan o'qish (read-through).
+
+- DB barcha nodelar uchun umumiy, disklar alohida. Har bir node yuklangan fayl yozuviga
+  o'z ``node_id`` sini (``files.server``) yozadi; dedup yozuvi blob egasining id sini oladi
+- ``GET /{date}/{filename}`` (va arxiv) blob lokal diskda yo'q bo'lsa uni
+  ``GET /internal/blobs/{hash}`` orqali oladi. Shifrlangan baytlar tarmoqdan o'zgarmasdan
+  o'tadi (shifrlash kalitlari nodelar uchun umumiy) va lokal faylga yoziladi, keyin
+  odatdagidek o'qiladi: Range, siqish, kontent keshi o'zgarishsiz ishlaydi
+- Nomzodlar: yozuvdagi server, keyin shu hashdagi boshqa yozuvlarning serverlari
+- Olingan nusxa ``peer_cache_dir/<hash>`` da qoladi. Jami hajm ``peer_cache_max_bytes`` dan
+  oshsa eng uzoq ishlatilmaganlari (mtime - barcha workerlar uchun umumiy) o'chiriladi;
+  oxirgi olingan blob hajmidan qat'i nazar keyingi yuklashgacha saqlanadi
+- Worker ichida bir hash uchun bir vaqtda bitta yuklash, qolgan so'rovlar uni kutadi
+- Node ichki endpointga ``{"node": node_id}`` claim li JWT bilan murojaat qiladi (JWT
+  kalitlari nodelar uchun umumiy bo'lishi kerak); foydalanuvchi tokenlari qabul qilinmaydi
+- Blobning oxirgi ishorasi istalgan nodeda o'chirilganda shu node keshidan chiqariladi va
+  barcha nodelarga ``DELETE /internal/blobs/{hash}`` yuboriladi: egasi (DB da ishora
+  qolmagan bo'lsa) diskdagi nusxani, qolganlari keshini o'chiradi. Ulanib bo'lmagan node
+  logga yoziladi; uning nusxasi qoladi
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import get_settings
+from . import storage
+from .executor import run_io
+from .metrics import observe_stage
+from .tokens import get_token_manager
+
+INTERNAL_BLOB_PATH = "/internal/blobs/{hash_code}"
+CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class PeerUnavailable(Exception):
+    """Blob egasi bo'lishi mumkin bo'lgan nodelarga ulanib bo'lmadi"""
+
+
+def _touch(path: str) -> bool:
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _evict(folder: str, max_bytes: int, keep: str) -> int:
+    """Jami hajm ``max_bytes`` gacha tushguncha eng eski ishlatilgan fayllarni o'chirish"""
+    entries: List[Tuple[float, str, int]] = []
+    total = 0
+    for entry in os.scandir(folder):
+        if entry.name.startswith(".") or not entry.is_file():
+            continue
+        stat = entry.stat()
+        entries.append((stat.st_mtime, entry.path, stat.st_size))
+        total += stat.st_size
+    evicted = 0
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+    return evicted
+
+
+async def iter_blob(f: storage.ReadFile) -> AsyncIterator[bytes]:
+    """Ochilgan blobning diskdagi (shifrlangan) baytlari; oxirida fayl yopiladi"""
+    async with f:
+        for offset in range(0, f.size, CHUNK_SIZE):
+            yield await f.read_at(offset, CHUNK_SIZE)
+
+
+class PeerFetcher:
+    def __init__(
+        self, node_id: str, peers: Dict[str, str], cache_folder: str, max_bytes: int, timeout: float,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.node_id = node_id
+        self.peers = peers
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._token: Optional[str] = None
+        self._token_refresh_at = 0.0
+        self.hits = 0
+        self.fetches = 0
+        self.fetched_bytes = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def cache_path(self, hash_code: str) -> str:
+        return os.path.join(self.cache_folder, hash_code)
+
+    async def cached_path(self, hash_code: str) -> Optional[str]:
+        """Keshdagi nusxa (ishlatilgan vaqti yangilanadi) yoki None"""
+        path = self.cache_path(hash_code)
+        if await run_io(_touch, path):
+            self.hits += 1
+            return path
+        return None
+
+    async def evict(self, hash_code: str) -> bool:
+        """Keshdagi nusxani o'chirish (blob endi ishlatilmaydi)"""
+        return await storage.remove_file(self.cache_path(hash_code))
+
+    async def release(self, hash_code: str):
+        """
+        Blobning oxirgi ishorasi o'chirildi: keshdan chiqarish va boshqa nodelarga xabar berish
+        (egasi diskdagi nusxasini, qolganlari keshdagisini o'chiradi)
+        """
+        await self.evict(hash_code)
+        servers = [server for server in self.peers if server != self.node_id]
+        await asyncio.gather(*(self._release(server, hash_code) for server in servers))
+
+    async def _release(self, server: str, hash_code: str):
+        url = self.peers[server].rstrip("/") + INTERNAL_BLOB_PATH.format(hash_code=hash_code)
+        try:
+            response = await self._http().delete(url, headers={"Authorization": f"Bearer {self._node_token()}"})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self.errors += 1
+            logger.warning("Releasing blob %s on %s failed: %r", hash_code, server, e)
+
+    def _node_token(self) -> str:
+        now = time.time()
+        if self._token is None or now >= self._token_refresh_at:
+            manager = get_token_manager()
+            self._token = manager.issue({"sub": f"node:{self.node_id}", "node": self.node_id})
+            # Muddatining yarmida yangilanadi
+            self._token_refresh_at = now + manager.expire_seconds / 2
+        return self._token
+
+    def _http(self) -> httpx.AsyncClient:
+        # Klient event loop ga bog'langan (testlar har safar yangi loop ochadi)
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(timeout=self.timeout, transport=self._transport)
+            self._client_loop = loop
+        return self._client
+
+    async def fetch(self, hash_code: str, servers: List[str]) -> Optional[str]:
+        """
+        Blobni nomzod nodelardan birinchi topilganidan keshga yuklash va yo'lini qaytarish.
+        Hech birida yo'q bo'lsa None; birortasiga ham ulanib bo'lmasa ``PeerUnavailable``
+        """
+        task = self._inflight.get(hash_code)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._fetch(hash_code, servers))
+            self._inflight[hash_code] = task
+            task.add_done_callback(lambda _: self._inflight.pop(hash_code, None))
+        # Birinchi so'rov uzilsa ham yuklash qolganlar uchun davom etadi
+        return await asyncio.shield(task)
+
+    async def _fetch(self, hash_code: str, servers: List[str]) -> Optional[str]:
+        candidates = [server for server in dict.fromkeys(servers) if server != self.node_id and server in self.peers]
+        failed = False
+        for server in candidates:
+            started = time.perf_counter()
+            try:
+                path = await self._download(server, hash_code)
+            except (httpx.HTTPError, OSError) as e:
+                self.errors += 1
+                failed = True
+                logger.warning("Fetching blob %s from %s failed: %r", hash_code, server, e)
+                continue
+            if path is not None:
+                observe_stage("peer_fetch", time.perf_counter() - started)
+                return path
+        if failed:
+            raise PeerUnavailable(f"No reachable node holds blob {hash_code}")
+        return None
+
+    async def _download(self, server: str, hash_code: str) -> Optional[str]:
+        url = self.peers[server].rstrip("/") + INTERNAL_BLOB_PATH.format(hash_code=hash_code)
+        headers = {"Authorization": f"Bearer {self._node_token()}"}
+        async with self._http().stream("GET", url, headers=headers) as response:
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            expected = response.headers.get("Content-Length")
+            temp = await storage.create_temp_file(self.cache_folder)
+            try:
+                received = 0
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    await temp.write(chunk)
+                    received += len(chunk)
+                if expected is not None and received != int(expected):
+                    raise httpx.ReadError(f"Blob truncated: {received} of {expected} bytes")
+                path = self.cache_path(hash_code)
+                await temp.commit(path)
+            except BaseException:
+                await temp.discard()
+                raise
+        self.fetches += 1
+        self.fetched_bytes += received
+        self.evictions += await run_io(_evict, self.cache_folder, self.max_bytes, path)
+        return path
+
+    async def close(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "peers": sorted(self.peers),
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "fetched_bytes": self.fetched_bytes,
+            "errors": self.errors,
+            "evictions": self.evictions,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_fetcher: Optional[PeerFetcher] = None
+
+
+def get_peer_fetcher() -> PeerFetcher:
+    global _fetcher
+    if _fetcher is None:
+        settings = get_settings()
+        _fetcher = PeerFetcher(
+            settings.node_id,
+            settings.peers,
+            settings.peer_cache_dir,
+            settings.peer_cache_max_bytes,
+            settings.peer_fetch_timeout_seconds,
+        )
+    return _fetcher
+
+
+async def close_peer_fetcher():
+    if _fetcher is not None:
+        await _fetcher.close()
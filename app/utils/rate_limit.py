@@ -0,0 +1,366 @@
+"""
+Rate limit: ``fastapi_limiter`` ``RateLimiter`` i, almashtiriladigan backend bilan.
+
+Routerlar shu yerdagi ``RateLimiter`` ni ishlatadi; limitlar, kalitlar
+(``prefix:identifier:route:dep``) va 429 javobi ``fastapi_limiter`` niki bilan bir xil.
+Backend ``rate_limit_backend`` sozlamasidan:
+
+- ``redis`` (standart) - ``fastapi_limiter`` Lua skripti (sobit oyna), limit barcha
+  workerlar uchun umumiy. Bir vaqtda kelgan tekshiruvlar navbatdagi bitta pipeline da
+  yuboriladi (yolg'iz so'rov - avvalgidek bitta EVALSHA). Redis ishlamasa tekshiruv
+  lokal token bucket ga o'tadi va ``rate_limit_retry_seconds`` dan keyin Redis qayta sinaladi
+- ``local`` - jarayon ichidagi token bucket: Redis ga so'rov yo'q (~1-2µs), lekin limit
+  worker bo'yicha (N worker - N barobar)
+- ``hybrid`` - avval lokal token bucket, keyin har ``rate_limit_sync_interval_ms`` da
+  qabul qilinganlar soni Redis dagi umumiy hisoblagichga qo'shiladi (bitta pipeline);
+  umumiy limit oshgan kalit oyna oxirigacha har bir workerda lokal bloklanadi. So'rov
+  Redis ni kutmaydi; evaziga umumiy limit sinxron oralig'ida qabul qilinganlar qadar oshishi mumkin
+
+Token bucket sig'imi ``times``, to'lishi ``times`` / oyna: portlash (burst) sobit
+oynadagidek ``times`` ta, uzoq muddatda ham oynaga ``times`` ta.
+"""
+import asyncio
+import logging
+import time
+from math import ceil
+from typing import Dict, List, Optional, Tuple
+
+from fastapi_limiter import FastAPILimiter, default_identifier, http_default_callback
+from fastapi_limiter.depends import RateLimiter as _RedisRateLimiter
+from redis.exceptions import NoScriptError, RedisError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import get_settings
+from .metrics import RATE_LIMIT_FALLBACKS, RATE_LIMIT_SECONDS
+from .timing import add_span
+
+DEFAULT_PREFIX = "fastapi-limiter"
+
+logger = logging.getLogger(__name__)
+
+# ``labels()`` har chaqiruvda qulf oladi - tekshiruv o'zidan qimmatroq
+_ALLOWED_SECONDS = RATE_LIMIT_SECONDS.labels("allowed")
+_LIMITED_SECONDS = RATE_LIMIT_SECONDS.labels("limited")
+
+# Hybrid: sinxron oralig'ida qabul qilinganlarni umumiy sobit oyna hisoblagichiga qo'shish
+SYNC_SCRIPT = """local current = redis.call('INCRBY', KEYS[1], ARGV[1])
+if current == tonumber(ARGV[1]) then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if current > tonumber(ARGV[3]) then
+    return redis.call('PTTL', KEYS[1])
+end
+return 0"""
+
+
+class LocalLimiter:
+    """Jarayon ichidagi token bucket lar (faqat event loop dan chaqiriladi - qulf kerak emas)"""
+
+    # Shuncha tekshiruvda bir marta to'lib qolgan (ya'ni kerak bo'lmagan) bucket lar o'chiriladi
+    SWEEP_EVERY = 4096
+
+    def __init__(self):
+        # kalit -> [tokenlar, yangilangan vaqt, to'ladigan vaqt]
+        self._buckets: Dict[str, list] = {}
+        self._calls = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def check(self, key: str, times: int, milliseconds: int) -> int:
+        """Ruxsat bo'lsa 0, aks holda keyingi token gacha millisekund"""
+        now = time.monotonic()
+        if times <= 0 or milliseconds <= 0:
+            return max(milliseconds, 1) if times <= 0 else 0
+        rate = times / milliseconds  # millisekundiga token
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(times), now, now]
+        else:
+            bucket[0] = min(float(times), bucket[0] + (now - bucket[1]) * 1000 * rate)
+            bucket[1] = now
+
+        self._calls += 1
+        if self._calls % self.SWEEP_EVERY == 0:
+            self.sweep(now)
+
+        if bucket[0] < 1:
+            return max(ceil((1 - bucket[0]) / rate), 1)
+        bucket[0] -= 1
+        bucket[2] = now + (times - bucket[0]) / rate / 1000
+        return 0
+
+    def sweep(self, now: Optional[float] = None):
+        """To'lib qolgan bucket larni o'chirish (ular yangisidan farq qilmaydi)"""
+        now = time.monotonic() if now is None else now
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class _RedisDown:
+    """Redis xatosidan keyin ``retry_seconds`` davomida uni chetlab o'tish"""
+
+    def __init__(self, retry_seconds: float):
+        self.retry_seconds = retry_seconds
+        self.until = 0.0
+
+    def active(self) -> bool:
+        return time.monotonic() < self.until
+
+    def mark(self, action: str, e: Exception):
+        if not self.active():
+            logger.warning("Rate limit %s failed, using local limits for %ss: %s", action, self.retry_seconds, e)
+        self.until = time.monotonic() + self.retry_seconds
+
+
+class _Scripts:
+    """Redis mijozi almashsa (masalan testlarda) Lua skriptlarini qayta ro'yxatdan o'tkazish"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self._client = None
+        self._script = None
+
+    def get(self, redis):
+        if redis is not self._client:
+            self._client, self._script = redis, redis.register_script(self.source)
+        return self._script
+
+
+async def _evalsha_pipeline(redis, script, calls: List[tuple]) -> list:
+    """
+    Bir nechta ``EVALSHA`` ni bitta pipeline da bajarish (natijalar orasida xatolar ham bo'lishi mumkin).
+
+    ``Script`` ni pipeline orqali chaqirish har safar ``SCRIPT EXISTS`` so'rovini qo'shadi,
+    shuning uchun skript faqat ``NoScriptError`` da yuklanadi.
+    """
+    for attempt in range(2):
+        pipeline = redis.pipeline(transaction=False)
+        for key, *args in calls:
+            pipeline.evalsha(script.sha, 1, key, *args)
+        results = await pipeline.execute(raise_on_error=False)
+        if attempt == 0 and any(isinstance(result, NoScriptError) for result in results):
+            await redis.script_load(script.script)
+            continue
+        return results
+
+
+class RedisBackend:
+    """``fastapi_limiter`` Lua skripti; parallel tekshiruvlar pipeline larga yig'iladi"""
+
+    def __init__(self, fallback: LocalLimiter, retry_seconds: float):
+        self.fallback = fallback
+        self.down = _RedisDown(retry_seconds)
+        self._script = _Scripts(FastAPILimiter.lua_script)
+        self._queue: List[Tuple[str, int, int, asyncio.Future]] = []
+        self._sending = False
+        self._loop = None
+        self.batches = 0
+
+    def _local(self, key: str, times: int, milliseconds: int) -> int:
+        RATE_LIMIT_FALLBACKS.inc()
+        return self.fallback.check(key, times, milliseconds)
+
+    async def check(self, key: str, times: int, milliseconds: int) -> int:
+        redis = FastAPILimiter.redis
+        if redis is None or self.down.active():
+            return self._local(key, times, milliseconds)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Yangi event loop (masalan har bir test o'zinikida): eskisidagi navbat hech qachon tugamaydi
+            self._loop, self._queue, self._sending = loop, [], False
+        if self._sending:
+            # Boshqa so'rovning Redis javobi kutilmoqda: keyingi pipeline ga qo'shilish
+            future = loop.create_future()
+            self._queue.append((key, times, milliseconds, future))
+            return await future
+
+        self._sending = True
+        try:
+            return await self._script.get(redis)(keys=[key], args=[str(times), str(milliseconds)])
+        except RedisError as e:
+            self.down.mark("check", e)
+            return self._local(key, times, milliseconds)
+        finally:
+            if self._queue:
+                asyncio.ensure_future(self._drain(redis))
+            else:
+                self._sending = False
+
+    async def _drain(self, redis):
+        """Navbatdagilarni bitta pipeline da yuborish, navbat bo'shaguncha"""
+        try:
+            while self._queue:
+                batch, self._queue = self._queue, []
+                calls = [(key, str(times), str(milliseconds)) for key, times, milliseconds, _ in batch]
+                try:
+                    results = await _evalsha_pipeline(redis, self._script.get(redis), calls)
+                    self.batches += 1
+                except RedisError as e:
+                    self.down.mark("check", e)
+                    results = [e] * len(batch)
+                for (key, times, milliseconds, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_result(self._local(key, times, milliseconds))
+                    else:
+                        future.set_result(result)
+        finally:
+            self._sending = False
+
+
+class HybridBackend:
+    """Lokal token bucket bilan darhol qaror; umumiy hisoblagich Redis da davriy sinxronlanadi"""
+
+    def __init__(self, local: LocalLimiter, sync_interval: float, retry_seconds: float):
+        self.local = local
+        self.sync_interval = sync_interval
+        self.down = _RedisDown(retry_seconds)
+        self._script = _Scripts(SYNC_SCRIPT)
+        # kalit -> [qabul qilinganlar, times, milliseconds] (oxirgi sinxrondan beri)
+        self._pending: Dict[str, list] = {}
+        # kalit -> umumiy limit oshgan, shu vaqtgacha (monotonic) rad etiladi
+        self._blocked: Dict[str, float] = {}
+        self._last_sync = time.monotonic()
+        self._sync_task: Optional[asyncio.Future] = None
+        self.syncs = 0
+
+    async def check(self, key: str, times: int, milliseconds: int) -> int:
+        now = time.monotonic()
+        until = self._blocked.get(key)
+        if until is not None:
+            if until > now:
+                return max(ceil((until - now) * 1000), 1)
+            del self._blocked[key]
+        pexpire = self.local.check(key, times, milliseconds)
+        if pexpire:
+            return pexpire
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [1, times, milliseconds]
+        else:
+            pending[0] += 1
+        sync_task = self._sync_task
+        idle = sync_task is None or sync_task.done() or sync_task.get_loop() is not asyncio.get_running_loop()
+        if now - self._last_sync >= self.sync_interval and idle:
+            self._last_sync = now
+            self._sync_task = asyncio.ensure_future(self.sync())
+        return 0
+
+    async def sync(self):
+        """Qabul qilinganlarni Redis ga qo'shish va umumiy limit oshgan kalitlarni bloklash"""
+        redis = FastAPILimiter.redis
+        if not self._pending or redis is None or self.down.active():
+            # Redis siz lokal limitlar ishlaydi; yig'ilgan son umumiy hisobga kirmaydi
+            self._pending.clear()
+            return
+        pending, self._pending = self._pending, {}
+        calls = [(key, count, milliseconds, times) for key, (count, times, milliseconds) in pending.items()]
+        try:
+            results = await _evalsha_pipeline(redis, self._script.get(redis), calls)
+        except RedisError as e:
+            self.down.mark("sync", e)
+            RATE_LIMIT_FALLBACKS.inc(len(pending))
+            return
+        self.syncs += 1
+        now = time.monotonic()
+        for key, pttl in zip(pending, results):
+            if isinstance(pttl, int) and pttl > 0:
+                self._blocked[key] = now + pttl / 1000
+        for key in [key for key, until in self._blocked.items() if until <= now]:
+            del self._blocked[key]
+
+
+_backend = None
+
+
+def get_limiter_backend():
+    global _backend
+    if _backend is None:
+        settings = get_settings()
+        local = LocalLimiter()
+        if settings.rate_limit_backend == "local":
+            _backend = local
+        elif settings.rate_limit_backend == "hybrid":
+            _backend = HybridBackend(
+                local, settings.rate_limit_sync_interval_ms / 1000, settings.rate_limit_retry_seconds
+            )
+        else:
+            _backend = RedisBackend(local, settings.rate_limit_retry_seconds)
+    return _backend
+
+
+async def check_limit(key: str, times: int, milliseconds: int) -> int:
+    backend = get_limiter_backend()
+    if isinstance(backend, LocalLimiter):
+        return backend.check(key, times, milliseconds)
+    return await backend.check(key, times, milliseconds)
+
+
+async def init_rate_limiter(redis):
+    """
+    ``FastAPILimiter`` ni sozlash. Redis ishga tushishda mavjud bo'lmasa ham ilova
+    ishlaydi: ``redis`` backend u qaytguncha lokal limitlardan foydalanadi.
+    """
+    try:
+        await FastAPILimiter.init(redis)
+    except RedisError as e:
+        logger.warning("Redis is unavailable for rate limiting, using local limits until it is back: %s", e)
+        FastAPILimiter.redis = redis
+        FastAPILimiter.prefix = DEFAULT_PREFIX
+        FastAPILimiter.identifier = default_identifier
+        FastAPILimiter.http_callback = http_default_callback
+
+
+class RateLimiter(_RedisRateLimiter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (yo'l, metod) -> kalit oxiri; faqat parametrsiz yo'llar uchun, shuning uchun cheklangan
+        self._route_keys: Dict[Tuple[str, str], str] = {}
+
+    def _route_key(self, request: Request) -> str:
+        """
+        ``fastapi_limiter`` dagi ``route_index:dep_index``.
+
+        U har so'rovda ilovaning barcha yo'llarini aylanib chiqadi va faqat yo'l shabloni
+        so'rov yo'liga teng bo'lganini topadi; parametrli yo'llar uchun natija ``0:0``.
+        """
+        path = request.scope["path"]
+        route = request.scope.get("route")
+        if getattr(route, "path", None) != path:
+            return "0:0"
+        cache_key = (path, request.method)
+        suffix = self._route_keys.get(cache_key)
+        if suffix is None:
+            route_index = dep_index = 0
+            for i, candidate in enumerate(request.app.routes):
+                if candidate.path == path and request.method in getattr(candidate, "methods", ()):
+                    route_index = i
+                    for j, dependency in enumerate(candidate.dependencies):
+                        if self is dependency.dependency:
+                            dep_index = j
+                            break
+            suffix = self._route_keys[cache_key] = f"{route_index}:{dep_index}"
+        return suffix
+
+    async def _check(self, key):
+        start = time.perf_counter()
+        pexpire = await check_limit(key, self.times, self.milliseconds)
+        seconds = time.perf_counter() - start
+        (_LIMITED_SECONDS if pexpire else _ALLOWED_SECONDS).observe(seconds)
+        add_span("rate_limit", seconds)
+        return pexpire
+
+    async def __call__(self, request: Request, response: Response):
+        identifier = self.identifier or FastAPILimiter.identifier or default_identifier
+        callback = self.callback or FastAPILimiter.http_callback or http_default_callback
+        rate_key = await identifier(request)
+        key = f"{FastAPILimiter.prefix or DEFAULT_PREFIX}:{rate_key}:{self._route_key(request)}"
+        pexpire = await self._check(key)
+        if pexpire != 0:
+            return await callback(request, response, pexpire)
@@ -0,0 +1,178 @@
+"""
+Fayl nomlari bo'yicha indeksli qidiruv.
+
+Rejimlar:
+
+- ``substring``: matn nomning istalgan joyida (``report`` -> ``annual_report.pdf``)
+- ``prefix``: nom shu matn bilan boshlanadi
+- ``token``: har bir so'z nomdagi biror so'zning boshi (``ann rep`` -> ``Annual report.pdf``)
+
+PostgreSQL: ``lower(name)`` ustida pg_trgm GIN indeksi (substring/prefix, reyting -
+``similarity``) va so'zlar uchun ``to_tsvector('simple', ...)`` GIN indeksi (token,
+reyting - ``ts_rank``). Ikkalasi ham ifoda indekslari, yozuvlar bilan avtomatik sinxron.
+
+SQLite: ``files`` ga bog'langan ikkita tashqi kontentli FTS5 jadvali - ``trigram``
+(substring/prefix) va ``unicode61`` (token), create/update/delete triggerlari bilan
+sinxronlanadi; reyting - ``bm25``.
+
+SQLite jadvallari ``init_search()`` da yaratiladi. Postgres indekslari katta jadvalni
+bloklamasligi uchun Alembic migratsiyasida (``0003``, ``CREATE INDEX CONCURRENTLY``);
+``init_search()`` faqat ular borligini tekshiradi. Indekslar bo'lmasa (migratsiya
+qilinmagan, boshqa DB, FTS5 siz SQLite) oddiy ``LIKE`` qidiruviga qaytiladi. Trigram indeks
+3 belgidan qisqa matnda ishlatilmaydi - bunday so'rovlar ham ``LIKE`` bilan bajariladi.
+"""
+import logging
+import re
+from typing import List, Optional
+
+from tortoise import connections
+from tortoise.expressions import RawSQL
+from tortoise.queryset import QuerySet
+
+SEARCH_MODES = ("substring", "prefix", "token")
+
+logger = logging.getLogger(__name__)
+
+# Trigram indeks ishlatiladigan eng qisqa matn
+TRIGRAM_MIN_LENGTH = 3
+
+_SQLITE_TABLES = {
+    "files_name_trigram": "tokenize='trigram'",
+    "files_name_tokens": "tokenize='unicode61', prefix='2 3'",
+}
+
+# Ifoda alembic/versions/0003_files_name_search_indexes.py dagi indeks bilan bir xil
+_PG_TSVECTOR = "to_tsvector('simple', regexp_replace({name}, '[^[:alnum:]]+', ' ', 'g'))"
+
+_PG_INDEXES = ("files_name_trgm_idx", "files_name_tsv_idx")
+
+# Joriy ulanishdagi qidiruv backendi: "postgres", "sqlite" yoki None (LIKE)
+_backend: Optional[str] = None
+
+
+def _sqlite_setup(table: str, options: str) -> List[str]:
+    return [
+        f"CREATE VIRTUAL TABLE {table} USING fts5(name, content='files', content_rowid='id', {options})",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON files BEGIN "
+        f"INSERT INTO {table}(rowid, name) VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON files BEGIN "
+        f"INSERT INTO {table}({table}, rowid, name) VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF name ON files BEGIN "
+        f"INSERT INTO {table}({table}, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {table}(rowid, name) VALUES (new.id, new.name); END",
+        # Jadval yaratilishidan oldingi yozuvlarni indekslash
+        f"INSERT INTO {table}({table}) VALUES ('rebuild')",
+    ]
+
+
+async def init_search() -> Optional[str]:
+    """
+    Qidiruv indekslarini yaratish (SQLite) yoki borligini tekshirish (Postgres - migratsiya).
+
+    Returns:
+        Optional[str]: ishlatiladigan backend yoki None (LIKE ga qaytilgan)
+    """
+    global _backend
+    connection = connections.get("default")
+    dialect = connection.capabilities.dialect
+    _backend = None
+    try:
+        if dialect == "postgres":
+            extension = await connection.execute_query_dict("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            indexes = await connection.execute_query_dict(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = ANY($1) AND i.indisvalid",
+                [list(_PG_INDEXES)],
+            )
+            if not extension or len(indexes) < len(_PG_INDEXES):
+                logger.warning("Search indexes are missing (run alembic upgrade head), falling back to LIKE")
+                return None
+        elif dialect == "sqlite":
+            for table, options in _SQLITE_TABLES.items():
+                exists = await connection.execute_query_dict(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", [table]
+                )
+                if not exists:
+                    for statement in _sqlite_setup(table, options):
+                        await connection.execute_script(statement)
+        else:
+            return None
+    except Exception as e:
+        logger.warning("Search index is not available, falling back to LIKE: %s", e)
+        return None
+    _backend = dialect
+    return _backend
+
+
+def search_backend() -> Optional[str]:
+    return _backend
+
+
+def _literal(value: str) -> str:
+    """SQL satr literali (RawSQL parametrlarni qabul qilmaydi)"""
+    return "'" + value.replace("\x00", "").replace("'", "''") + "'"
+
+
+def _like_pattern(value: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", value)
+
+
+def _words(text: str) -> List[str]:
+    # Indeksdagidek: harf va raqamlar, qolgan hamma belgi (jumladan "_") ajratuvchi
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def _fallback(query: QuerySet, text: str, mode: str) -> QuerySet:
+    if mode == "prefix":
+        return query.filter(name__istartswith=text)
+    if mode == "token":
+        for word in _words(text):
+            query = query.filter(name__icontains=word)
+        return query
+    return query.filter(name__icontains=text)
+
+
+def apply_search(query: QuerySet, text: str, mode: str = "substring", with_relevance: bool = False) -> QuerySet:
+    """
+    So'rovga qidiruv shartini qo'shish.
+
+    Moslik ``id IN (indeksdan olingan id lar)`` sharti bilan filtrlanadi, shuning uchun
+    jadval skan qilinmaydi. ``with_relevance`` bo'lsa natijaga ``relevance`` (kattasi
+    yaxshiroq) qo'shiladi; u faqat mos kelgan qatorlar uchun hisoblanadi.
+    """
+    words = _words(text)
+    indexed = (
+        _backend is not None
+        and (len(text) >= TRIGRAM_MIN_LENGTH if mode != "token" else bool(words))
+    )
+    if not indexed:
+        query = _fallback(query, text, mode)
+        return query.annotate(relevance=RawSQL("0")) if with_relevance else query
+
+    if _backend == "sqlite":
+        if mode == "token":
+            table = "files_name_tokens"
+            match = " ".join(f'"{word}"*' for word in words)
+        else:
+            table = "files_name_trigram"
+            match = '"' + text.replace('"', '""') + '"'
+        match = _literal(match)
+        query = query.filter(id__in=RawSQL(f"(SELECT rowid FROM {table} WHERE {table} MATCH {match})"))
+        if mode == "prefix":
+            # Trigram indeks nomzodlarni beradi, boshlanishi shu yerda tekshiriladi
+            query = query.filter(name__istartswith=text)
+        relevance = f'(SELECT -bm25({table}) FROM {table} WHERE {table} MATCH {match} AND rowid = "files"."id")'
+    else:
+        if mode == "token":
+            tsquery = _literal(" & ".join(f"{word}:*" for word in words))
+            condition = f"{_PG_TSVECTOR.format(name='name')} @@ to_tsquery('simple', {tsquery})"
+            vector = _PG_TSVECTOR.format(name='"files"."name"')
+            relevance = f"ts_rank({vector}, to_tsquery('simple', {tsquery}))"
+        else:
+            pattern = _like_pattern(text.lower())
+            pattern = pattern + "%" if mode == "prefix" else "%" + pattern + "%"
+            condition = f"lower(name) LIKE {_literal(pattern)}"
+            relevance = f'similarity(lower("files"."name"), {_literal(text.lower())})'
+        query = query.filter(id__in=RawSQL(f"(SELECT id FROM files WHERE {condition})"))
+
+    return query.annotate(relevance=RawSQL(relevance)) if with_relevance else query
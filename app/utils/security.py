@@ -1,40 +1,92 @@
-from jose import JWTError, jwt
+from jose import JWTError
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from cryptography.fernet import Fernet
-import os
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from dotenv import load_dotenv
+import io
+from typing import BinaryIO, Iterator, Optional
 
-# JWT settings
-SECRET_KEY = "your-secret-key-keep-it-secret"  # In production, use environment variable
-ALGORITHM = "HS256"
+from .encryption import (
+    MAGIC, EncryptionFormatError, SegmentEncryptor, SegmentReader, SegmentSealer, is_segmented
+)
+from .keyring import get_keyring, reload_keyring
+from .timing import span
+from .tokens import get_token_manager
 
-# File encryption key
-ENCRYPTION_KEY = Fernet.generate_key()
-cipher_suite = Fernet(ENCRYPTION_KEY)
+load_dotenv()
+
+# Legacy streamed files are stored as newline separated Fernet tokens (one per chunk).
+# Fernet tokens are urlsafe base64, so they never contain a newline themselves.
+TOKEN_SEPARATOR = b"\n"
 
 security = HTTPBearer()
 
+def get_segment_cipher(key_id: str) -> AESGCM:
+    """
+    Return the AES-GCM cipher for a key id stored in a container header. An unknown
+    id re-reads the keyring first: the key may have just been rotated in elsewhere
+    """
+    cipher = get_keyring().ciphers.get(key_id)
+    if cipher is None:
+        cipher = reload_keyring().ciphers.get(key_id)
+    if cipher is None:
+        raise EncryptionFormatError(f"Unknown encryption key id: {key_id}")
+    return cipher
+
+def new_encryptor() -> SegmentEncryptor:
+    """Create an incremental encryptor for the segmented format (active key)"""
+    keyring = get_keyring()
+    return SegmentEncryptor(keyring.active_cipher, keyring.active_key_id)
+
+def new_sealer(size: int, segment_size: int, nonce_prefix: Optional[bytes] = None, key_id: Optional[str] = None) -> SegmentSealer:
+    """
+    Create (or, given the stored nonce prefix and key id, recreate) a random
+    access sealer for a container of a known plaintext size
+    """
+    key_id = key_id or get_keyring().active_key_id
+    return SegmentSealer(get_segment_cipher(key_id), key_id, size, segment_size, nonce_prefix)
+
+def open_encrypted(f: BinaryIO, file_size: Optional[int] = None) -> SegmentReader:
+    """Open a segmented file for random access decryption"""
+    return SegmentReader(f, get_segment_cipher, file_size=file_size)
+
 def encrypt_file(file_data: bytes) -> bytes:
     """Encrypt file data"""
-    return cipher_suite.encrypt(file_data)
+    encryptor = new_encryptor()
+    return encryptor.update(file_data) + encryptor.finalize()
 
 def decrypt_file(encrypted_data: bytes) -> bytes:
-    """Decrypt file data"""
-    return cipher_suite.decrypt(encrypted_data)
+    """Decrypt file data (segmented or legacy Fernet)"""
+    return b"".join(iter_decrypt_file(io.BytesIO(encrypted_data)))
+
+def iter_decrypt_file(f: BinaryIO) -> Iterator[bytes]:
+    """Decrypt an encrypted file object chunk by chunk (segmented or legacy Fernet)"""
+    prefix = f.read(len(MAGIC))
+    f.seek(0)
+    if is_segmented(prefix):
+        return iter(SegmentReader(f, get_segment_cipher))
+    return iter_decrypt_legacy(f)
+
+def iter_decrypt_legacy(f: BinaryIO) -> Iterator[bytes]:
+    """Decrypt a legacy Fernet file (single token or newline separated tokens) with any keyring key"""
+    fernet = get_keyring().fernet
+    for token in f:
+        token = token.rstrip(TOKEN_SEPARATOR)
+        if token:
+            yield fernet.decrypt(token)
 
 def create_access_token(data: dict):
-    """Create JWT token"""
-    return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
+    """Create JWT token (exp/iat/jti claims, signed with the active keyring key)"""
+    return get_token_manager().issue(data)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
-    """Verify JWT token"""
+async def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """Verify JWT token (cached for repeated requests, rejected once revoked)"""
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        with span("auth"):
+            return await get_token_manager().verify(credentials.credentials)
     except JWTError:
         raise HTTPException(
             status_code=401,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,289 @@
+"""
+Event loop ni to'smaydigan disk I/O qatlami.
+
+Barcha bloklovchi chaqiruvlar (open, read, write, fsync, rename, remove, stat)
+I/O hovuzida bajariladi (``run_io``). Yozish har doim vaqtinchalik faylga
+bo'ladi va ``TempFile.commit`` da ``Settings.fsync_policy`` bo'yicha diskka
+tushirilib, ``os.replace`` bilan atomik ravishda joyiga qo'yiladi:
+
+- ``none``: fsync qilinmaydi (eng tez, elektr o'chsa oxirgi fayllar yo'qolishi mumkin)
+- ``per-file``: har bir fayl va uning papkasi alohida fsync qilinadi
+- ``batched``: bir necha millisekund ichida kelgan fsync lar bitta I/O ishida
+  bajariladi (group commit), har bir yozuvchi o'z guruhi tugashini kutadi
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from typing import List, Optional, Tuple, Union
+
+from app.core.config import get_settings
+from .executor import run_io
+from .metrics import observe_stage
+
+
+class TempFile:
+    """Yozish uchun ochilgan vaqtinchalik fayl"""
+
+    def __init__(self, path: str, fd: int):
+        self.path = path
+        self._fd = fd
+
+    async def write(self, data: bytes):
+        if data:
+            await run_io(_write_all, self._fd, data)
+
+    async def commit(self, final_path: str):
+        """Diskka tushirib (fsync siyosati bo'yicha), yopib, atomik ravishda doimiy nomga ko'chirish"""
+        started = time.perf_counter()
+        await fsync(self._fd)
+        await self.close()
+        await run_io(os.replace, self.path, final_path)
+        self.path = final_path
+        # Rename ham elektr o'chishidan keyin saqlanib qolishi uchun papka fsync qilinadi
+        await fsync(os.path.dirname(final_path) or ".")
+        observe_stage("commit", time.perf_counter() - started)
+
+    async def close(self):
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            await run_io(os.close, fd)
+
+    async def discard(self):
+        """Yopish va o'chirish (xato yoki dublikat bo'lganda)"""
+        await self.close()
+        await remove_file(self.path)
+
+
+class ReadFile:
+    """O'qish uchun ochilgan fayl; ``read_at`` pozitsiyaga bog'liq emas (pread)"""
+
+    def __init__(self, path: str, fd: int, size: int):
+        self.path = path
+        self.size = size
+        self._fd = fd
+        self._lock = threading.Lock()
+
+    def _pread(self, offset: int, length: int) -> bytes:
+        if hasattr(os, "pread"):
+            return os.pread(self._fd, length, offset)
+        # Windows: pread yo'q, seek + read ni qulf ostida bajarish
+        with self._lock:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            return os.read(self._fd, length)
+
+    async def read_at(self, offset: int, length: int) -> bytes:
+        return await run_io(self._pread, offset, length)
+
+    async def close(self):
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            await run_io(os.close, fd)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+# Windowsda fayllar matn rejimida ochilmasligi uchun
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+def _open_temp(folder: str) -> Tuple[str, int]:
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f".{uuid.uuid4().hex}.part")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | _O_BINARY, 0o600)
+    return path, fd
+
+
+def _open_read(path: str) -> Tuple[int, int]:
+    fd = os.open(path, os.O_RDONLY | _O_BINARY)
+    try:
+        return fd, os.fstat(fd).st_size
+    except BaseException:
+        os.close(fd)
+        raise
+
+
+def _fsync_target(target: Union[int, str]):
+    """Ochiq fayl deskriptori yoki papka yo'lini fsync qilish"""
+    if isinstance(target, int):
+        os.fsync(target)
+        return
+    # Windowsda papkani ochib bo'lmaydi (rename NTFS jurnalida), shuning uchun o'tkazib yuboriladi
+    if os.name == "nt":
+        return
+    fd = os.open(target, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_targets(targets: List[Union[int, str]]):
+    for target in dict.fromkeys(targets):
+        _fsync_target(target)
+
+
+def _write_at(fd: int, offset: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(fd, view, offset)
+        else:
+            # Windows: pwrite yo'q; deskriptor faqat shu chaqiruvga tegishli
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+
+def _open_write(path: str) -> int:
+    return os.open(path, os.O_WRONLY | _O_BINARY)
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class FsyncBatcher:
+    """Bir necha fsync so'rovini bitta I/O ishiga yig'ish (group commit)"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending: List[Tuple[Union[int, str], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.synced = 0
+
+    async def sync(self, target: Union[int, str]):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((target, future))
+        if self._flush_task is None or self._flush_task.done() or self._flush_task.get_loop() is not loop:
+            self._flush_task = loop.create_task(self._flush())
+        await future
+
+    async def _flush(self):
+        await asyncio.sleep(self.interval)
+        batch, self._pending = self._pending, []
+        # fsync davomida kelganlar keyingi guruhga qoladi
+        self._flush_task = None
+        if not batch:
+            return
+        try:
+            await run_io(_fsync_targets, [target for target, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.synced += len(batch)
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+
+_batcher: Optional[FsyncBatcher] = None
+
+
+def get_fsync_batcher() -> FsyncBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = FsyncBatcher(get_settings().fsync_batch_interval_ms / 1000)
+    return _batcher
+
+
+async def fsync(target: Union[int, str]):
+    """``Settings.fsync_policy`` bo'yicha fayl (deskriptor) yoki papkani (yo'l) diskka tushirish"""
+    policy = get_settings().fsync_policy
+    if policy == "per-file":
+        await run_io(_fsync_target, target)
+    elif policy == "batched":
+        await get_fsync_batcher().sync(target)
+
+
+async def create_temp_file(folder: str) -> TempFile:
+    """Papkada (kerak bo'lsa yaratib) yangi vaqtinchalik fayl ochish"""
+    path, fd = await run_io(_open_temp, folder)
+    return TempFile(path, fd)
+
+
+async def reopen_temp_file(path: str) -> TempFile:
+    """Oldin yaratilgan vaqtinchalik faylni (masalan yuklash sessiyasi) yakunlash uchun qayta ochish"""
+    fd = await run_io(_open_write, path)
+    return TempFile(path, fd)
+
+
+async def write_at(path: str, offset: int, data: bytes):
+    """
+    Mavjud faylning berilgan joyiga yozish va fsync siyosati bo'yicha diskka tushirish.
+
+    Har bir chaqiruv o'z deskriptorini ochadi, shuning uchun bir faylning turli
+    qismlariga parallel yozish mumkin.
+    """
+    fd = await run_io(_open_write, path)
+    try:
+        await run_io(_write_at, fd, offset, data)
+        await fsync(fd)
+    finally:
+        await run_io(os.close, fd)
+
+
+async def open_read(path: str) -> ReadFile:
+    fd, size = await run_io(_open_read, path)
+    return ReadFile(path, fd, size)
+
+
+async def path_exists(path: str) -> bool:
+    return await run_io(os.path.exists, path)
+
+
+def _list_dir(path: str) -> List[Tuple[str, float]]:
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return []
+    return sorted((entry.name, entry.stat().st_mtime) for entry in entries if entry.is_file())
+
+
+async def list_dir(path: str) -> List[Tuple[str, float]]:
+    """Papkadagi fayllar (nom, o'zgartirilgan vaqt) nom bo'yicha; papka yo'q bo'lsa bo'sh ro'yxat"""
+    return await run_io(_list_dir, path)
+
+
+async def ensure_dir(path: str):
+    await run_io(lambda: os.makedirs(path, exist_ok=True))
+
+
+async def remove_file(path: str) -> bool:
+    """Faylni o'chirish; fayl yo'q bo'lsa False"""
+    return await run_io(_remove, path)
+
+
+async def write_file(folder: str, final_name: str, data: bytes) -> str:
+    """Kichik ma'lumotni to'liq yozish (vaqtinchalik fayl + rename)"""
+    temp = await create_temp_file(folder)
+    try:
+        await temp.write(data)
+        final_path = os.path.join(folder, final_name)
+        await temp.commit(final_path)
+        return final_path
+    except BaseException:
+        await temp.discard()
+        raise
@@ -0,0 +1,207 @@
+"""
+Har bir so'rovning bosqichlari (span lar): ``Server-Timing`` header, JSON log va
+namunaviy (sampled) stek profili.
+
+``TimingMiddleware`` har bir so'rov uchun ``RequestTiming`` ochadi va uni context
+o'zgaruvchisiga qo'yadi. Mavjud o'lchovlar unga o'zi qo'shiladi:
+
+- ``auth`` (JWT), ``rate_limit`` (Redis), ``receive`` (so'rov tanasini o'qish)
+- ``db.<crud funksiya>`` (``timed_query``; yuklash va o'chirishda faqat ORM chaqiruvlari),
+  yuklashda alohida ``db.dedup_lookup`` va ``db.insert``
+- ``hash``, ``compress``, ``encrypt``, ``write``, ``commit``, ``read``, ``decrypt``,
+  ``decompress`` (``StageClock``), ``audit`` (audit log yozuvi, avvalgi Excel log)
+
+``Server-Timing`` javob sarlavhalari yuborilgan paytdagi span larni ko'rsatadi (``app`` -
+sarlavhalargacha o'tgan vaqt); oqimli javobda undan keyingi decrypt/o'qish faqat logda.
+Header ichki funksiya nomlarini ochib beradi, shuning uchun standart o'chirilgan
+(``server_timing_enabled``) - uni debug yoki ichki tarmoqda yoqing.
+Log ``app.timing`` loggeriga bitta JSON qator (``request_log_threshold_ms`` dan sekinlar).
+Profil oqimini to'xtatish va faylni yozish I/O hovuzida - event loop bloklanmaydi.
+
+Profiling (``profile_sample_rate > 0``): so'rovlarning shu ulushida fon oqimi event loop
+stekini ``profile_interval_ms`` da bir yozib boradi; so'rov ``profile_threshold_ms`` dan
+sekin bo'lsa stek ``profile_dir`` ga "collapsed" formatda yoziladi (flamegraph.pl,
+speedscope). Event loop bitta - parallel so'rovlarning steklari ham tushishi mumkin.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.core.config import get_settings
+from .executor import run_io
+
+logger = logging.getLogger("app.timing")
+if not logger.handlers:
+    # Ilovada logging sozlanmagan: JSON qatorlar stderr ga (uvicorn loglari bilan birga)
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_current: contextvars.ContextVar[Optional["RequestTiming"]] = contextvars.ContextVar("request_timing", default=None)
+
+# Server-Timing metrika nomi token bo'lishi kerak (RFC 9110 tchar)
+_NON_TOKEN = re.compile(r"[^!#$%&'*+\-.^_`|~0-9A-Za-z]")
+
+
+class RequestTiming:
+    """Bitta so'rov span lari (nom -> jami sekund)"""
+
+    __slots__ = ("spans", "started")
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self) -> str:
+        entries = [f"{_NON_TOKEN.sub('_', name)};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()]
+        entries.append(f"app;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+
+def add_span(name: str, seconds: float):
+    """Joriy so'rovga span qo'shish (so'rovdan tashqarida - hech narsa qilmaydi)"""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(name, time.perf_counter() - start)
+
+
+class StackSampler:
+    """Berilgan oqim stekini fon oqimida davriy yozib boruvchi profiler"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _profile_path(directory: str, method: str, route: str) -> str:
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    slug = re.sub(r"[^0-9A-Za-z]+", "_", route).strip("_") or "root"
+    return os.path.join(directory, f"{stamp}-{method}-{slug}.folded")
+
+
+def _write_profile(path: str, data: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(data)
+
+
+class TimingMiddleware:
+    """So'rov span larini yig'ib ``Server-Timing`` header, JSON log va profil chiqaruvchi ASGI middleware"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        settings = get_settings()
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status = 500
+        sampler = None
+        if settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate:
+            sampler = StackSampler(threading.get_ident(), settings.profile_interval_ms / 1000)
+            sampler.start()
+
+        async def timed_receive():
+            start = time.perf_counter()
+            message = await receive()
+            timing.add("receive", time.perf_counter() - start)
+            return message
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if not settings.server_timing_enabled:
+                    await send(message)
+                    return
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, timed_receive, timed_send)
+        finally:
+            _current.reset(token)
+            duration_ms = timing.elapsed() * 1000
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            profile = None
+            if sampler is not None:
+                # join va diskka yozish event loop ni to'xtatmasin
+                await run_io(sampler.stop)
+                if duration_ms >= settings.profile_threshold_ms and sampler.stacks:
+                    profile = _profile_path(settings.profile_dir, scope["method"], route)
+                    try:
+                        await run_io(_write_profile, profile, sampler.collapsed())
+                    except OSError as e:
+                        logger.warning("Failed to write profile %s: %s", profile, e)
+                        profile = None
+            if duration_ms >= settings.request_log_threshold_ms:
+                record = {
+                    "event": "request",
+                    "method": scope["method"],
+                    "route": route,
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(duration_ms, 2),
+                    "spans_ms": {name: round(seconds * 1000, 2) for name, seconds in timing.spans.items()},
+                }
+                if profile:
+                    record["profile"] = profile
+                logger.info(json.dumps(record))
@@ -0,0 +1,177 @@
+"""
+JWT access tokenlar: muddat, kalitlar to'plami (rotatsiya), tekshirilgan tokenlar keshi va bekor qilish.
+
+- Token ``exp``, ``iat``, ``jti`` bilan, headerda ``kid``. Imzo ``jwt_active_kid`` kaliti
+  bilan qo'yiladi, tekshirishda kalit ``kid`` bo'yicha ``jwt_keys`` dan olinadi. Rotatsiya:
+  yangi kalitni ``JWT_KEYS`` ga qo'shib ``JWT_ACTIVE_KID`` ni unga o'tkazish; eski kalit
+  u bilan berilgan tokenlar muddati (``jwt_expire_minutes``) tugaguncha qoldiriladi
+- Kesh (worker ichida, LRU): bir marta tekshirilgan token ``jwt_cache_ttl_seconds`` (va
+  ``exp``) gacha imzosi va denylist qayta tekshirilmasdan qabul qilinadi
+- Bekor qilish: ``jti`` Redis dagi denylistga (``auth:revoked:<jti>``) token qolgan umri
+  TTL i bilan yoziladi. Denylist faqat keshda yo'q token uchun so'raladi: shu workerda
+  bekor qilish darhol, boshqa workerlarda kesh TTL i ichida kuchga kiradi. Redis ishlamasa
+  tekshiruv denylistsiz davom etadi: xatodan keyin ``jwt_denylist_retry_seconds`` davomida
+  Redis so'ralmaydi va log shu oynada bir marta yoziladi
+"""
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi_limiter import FastAPILimiter
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+
+DENYLIST_PREFIX = "auth:revoked"
+
+logger = logging.getLogger(__name__)
+
+
+class Keyring:
+    """``kid`` -> maxfiy kalit; yangi tokenlar ``active_kid`` bilan imzolanadi"""
+
+    def __init__(self, keys: Dict[str, str], active_kid: str, algorithm: str = "HS256"):
+        if active_kid not in keys:
+            raise ValueError(f"Active JWT key id {active_kid!r} is not in the keyring")
+        self.keys = dict(keys)
+        self.active_kid = active_kid
+        self.algorithm = algorithm
+
+    @classmethod
+    def from_settings(cls, settings) -> "Keyring":
+        keys = settings.jwt_keys or {"default": settings.jwt_secret_key}
+        return cls(keys, settings.jwt_active_kid or next(iter(keys)), settings.jwt_algorithm)
+
+    def sign(self, claims: dict) -> str:
+        return jwt.encode(
+            claims, self.keys[self.active_kid], algorithm=self.algorithm, headers={"kid": self.active_kid}
+        )
+
+    def verify(self, token: str) -> dict:
+        """Imzo va muddatni tekshirib claims ni qaytarish (xato bo'lsa ``JWTError``)"""
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown key id: {kid}")
+        return jwt.decode(
+            token, key, algorithms=[self.algorithm],
+            options={"require_exp": True, "require_iat": True, "require_jti": True},
+        )
+
+
+class TokenManager:
+    """Token berish, tekshirish (kesh bilan) va bekor qilish"""
+
+    def __init__(
+        self, keyring: Keyring, expire_seconds: int, cache_size: int, cache_ttl: float, redis_retry: float = 5,
+    ):
+        self.keyring = keyring
+        self.expire_seconds = expire_seconds
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.redis_retry = redis_retry
+        # Redis xatosidan keyin shu vaqtgacha (monotonic) denylist so'ralmaydi
+        self._redis_retry_at = 0.0
+        # token -> (claims, shu vaqtgacha keshdan qabul qilinadi)
+        self._cache: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        # Shu workerda bekor qilinganlar: jti -> exp
+        self._revoked: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def issue(self, data: dict) -> str:
+        now = int(time.time())
+        claims = {**data, "iat": now, "exp": now + self.expire_seconds, "jti": uuid.uuid4().hex}
+        return self.keyring.sign(claims)
+
+    async def verify(self, token: str) -> dict:
+        now = time.time()
+        entry = self._cache.get(token)
+        if entry is not None:
+            claims, deadline = entry
+            if deadline > now and claims["jti"] not in self._revoked:
+                self._cache.move_to_end(token)
+                self.hits += 1
+                return claims
+            del self._cache[token]
+        self.misses += 1
+
+        claims = self.keyring.verify(token)
+        if await self.is_revoked(claims["jti"]):
+            raise JWTError("Token has been revoked")
+        if self.cache_size > 0:
+            self._cache[token] = (claims, min(now + self.cache_ttl, claims["exp"]))
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def _redis_failed(self, action: str, e: Exception):
+        if time.monotonic() >= self._redis_retry_at:
+            logger.warning("Token %s failed, skipping Redis for %ss: %s", action, self.redis_retry, e)
+        self._redis_retry_at = time.monotonic() + self.redis_retry
+
+    async def is_revoked(self, jti: str) -> bool:
+        if jti in self._revoked:
+            return True
+        redis = FastAPILimiter.redis
+        if redis is None or time.monotonic() < self._redis_retry_at:
+            return False
+        try:
+            return bool(await redis.exists(f"{DENYLIST_PREFIX}:{jti}"))
+        except RedisError as e:
+            self._redis_failed("denylist lookup", e)
+            return False
+
+    async def revoke(self, claims: dict) -> bool:
+        """
+        Tokenni muddati tugaguncha bekor qilish. Shu workerda darhol; ``False`` - Redis ga
+        yozilmadi (boshqa workerlar tokenni qabul qilishda davom etadi).
+        """
+        now = time.time()
+        ttl = int(claims["exp"] - now) + 1
+        if ttl <= 0:
+            return True
+        self._revoked[claims["jti"]] = claims["exp"]
+        for jti in [jti for jti, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[jti]
+        redis = FastAPILimiter.redis
+        if redis is None:
+            return False
+        try:
+            await redis.set(f"{DENYLIST_PREFIX}:{claims['jti']}", "1", ex=ttl)
+        except RedisError as e:
+            self._redis_failed("revocation store", e)
+            return False
+        return True
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_token_manager: Optional[TokenManager] = None
+
+
+def get_token_manager() -> TokenManager:
+    global _token_manager
+    if _token_manager is None:
+        settings = get_settings()
+        _token_manager = TokenManager(
+            Keyring.from_settings(settings),
+            settings.jwt_expire_minutes * 60,
+            settings.jwt_cache_size,
+            settings.jwt_cache_ttl_seconds,
+            settings.jwt_denylist_retry_seconds,
+        )
+    return _token_manager
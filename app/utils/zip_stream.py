@@ -0,0 +1,92 @@
+"""
+Bir nechta faylni ZIP arxiv sifatida oqim bilan berish.
+
+Arxiv vaqtinchalik faylsiz va to'liq xotiraga yig'ilmasdan quriladi: har bir a'zo
+segmentlab decrypt qilinadi va darhol arxivga yoziladi, yozilgan baytlar esa
+shu zahoti klientga yuboriladi. ``zipfile`` qaytib bo'lmaydigan (seek siz) oqimga
+yozganda hajm va CRC ni a'zo oxiridagi "data descriptor" ga yozadi, shuning uchun
+xotirada bir vaqtda bir nechta segment va siqish buferi turadi, xolos.
+"""
+import io
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Iterable, NamedTuple
+
+from .compression import COMPRESSIBLE_TYPES, IDENTITY
+from .executor import run_cpu
+from .file import iter_content_range
+
+
+class ZipMember(NamedTuple):
+    name: str  # arxiv ichidagi nom
+    path: str  # shifrlangan fayl yo'li
+    size: int  # asl hajm (ZIP64 kerakmi - shunga qarab)
+    date: datetime
+    format: str
+    codec: str = IDENTITY  # saqlangan fayl qanday siqilgan (arxivga asl tarkib yoziladi)
+
+
+class _StreamBuffer(io.RawIOBase):
+    """``zipfile`` yozadigan baytlarni yig'ib, ``drain()`` bilan berib turadigan seek siz oqim"""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def unique_name(name: str, used: set) -> str:
+    """Arxivda bir xil nomlar bo'lsa ``name (2).ext`` ko'rinishiga keltirish"""
+    candidate = name
+    stem, dot, extension = name.rpartition(".")
+    if not stem:
+        stem, dot, extension = name, "", ""
+    counter = 2
+    while candidate in used:
+        candidate = f"{stem} ({counter}){dot}{extension}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+async def stream_zip(members: Iterable[ZipMember]) -> AsyncIterator[bytes]:
+    """
+    ZIP arxivni bo'laklab qaytarish.
+
+    Siqiladigan a'zolar (``COMPRESSIBLE_TYPES``) deflate bilan siqiladi, qolganlari
+    o'zgarishsiz (stored) yoziladi; CRC32 va siqish CPU hovuzida hisoblanadi.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", allowZip64=True) as archive:
+        for member in members:
+            info = zipfile.ZipInfo(member.name, date_time=max(member.date.timetuple()[:6], (1980, 1, 1, 0, 0, 0)))
+            info.file_size = member.size
+            compress = member.format in COMPRESSIBLE_TYPES
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            with archive.open(info, "w", force_zip64=member.size > zipfile.ZIP64_LIMIT) as target:
+                async for chunk in iter_content_range(member.path, member.codec):
+                    # CRC32 (va deflate) CPU hovuzida
+                    await run_cpu(target.write, chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            # Data descriptor
+            yield buffer.drain()
+    # Markaziy katalog
+    yield buffer.drain()
@@ -0,0 +1,119 @@
+"""
+Katta yuklashlar paytida kichik so'rovlarning kechikishini o'lchash.
+
+Bir nechta katta fayl ``write_upload_to_temp`` orqali parallel yuklanadi, shu vaqtda
+``GET /`` ga (ASGI ilova ichida, tarmoqsiz) doimiy kichik so'rovlar yuboriladi.
+Eski (butun fayl inline), bo'laklab inline va bo'laklab hovuz bilan p50/p99 kechikishlar taqqoslanadi.
+
+Ishga tushirish:
+    python -m benchmarks.event_loop_latency
+    python -m benchmarks.event_loop_latency --uploads 8 --size 20 --workers 4
+"""
+import argparse
+import asyncio
+import hashlib
+import shutil
+import statistics
+import tempfile
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.utils import executor as executor_module
+from app.utils.executor import BoundedExecutor
+from app.utils.file import write_upload_to_temp
+from app.utils.security import encrypt_file
+from benchmarks.upload_memory import make_upload, MB
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def buffered_upload(upload):
+    """Eski usul: butun faylni o'qish, hash va shifrlash event loop ichida"""
+    file_data = await upload.read()
+    hashlib.sha256(file_data).hexdigest()
+    encrypt_file(file_data)
+
+
+async def run_scenario(workers: int, uploads: int, size: int, chunk_size: int, buffered: bool = False) -> dict:
+    executor_module.shutdown_executors()
+    executor_module._executors["cpu"] = BoundedExecutor(workers, 64, "cpu")
+    folder = tempfile.mkdtemp(prefix="loop-bench-")
+    latencies = []
+    done = asyncio.Event()
+
+    async def upload_one():
+        upload = make_upload(size)
+        try:
+            if buffered:
+                await buffered_upload(upload)
+                return
+            temp_file, _, _, _ = await write_upload_to_temp(folder, upload, chunk_size)
+            await temp_file.discard()
+        finally:
+            await upload.close()
+
+    async def probe(client: AsyncClient):
+        # So'rovlar belgilangan jadval bo'yicha yuboriladi; kechikish rejalashtirilgan vaqtdan
+        # hisoblanadi, shuning uchun event loop bloklangan vaqt ham o'lchovga kiradi
+        interval = 0.01
+        scheduled = time.perf_counter()
+        while not done.is_set():
+            response = await client.get("/")
+            assert response.status_code == 200
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+            scheduled += interval
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            probe_task = asyncio.create_task(probe(client))
+            started = time.perf_counter()
+            await asyncio.gather(*(upload_one() for _ in range(uploads)))
+            elapsed = time.perf_counter() - started
+            done.set()
+            await probe_task
+    finally:
+        executor_module.shutdown_executors()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    return {
+        "mode": "buffered" if buffered else f"workers={workers}",
+        "upload_seconds": elapsed,
+        "probes": len(latencies),
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+    }
+
+
+async def main(args):
+    print(f"{args.uploads} x {args.size}MB parallel yuklash ({args.chunk}KB bo'laklar), kichik so'rovlar: GET /")
+    print(f"{'mode':>10} {'upload s':>9} {'probes':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    size = int(args.size * MB)
+    chunk_size = args.chunk * 1024
+    scenarios = [
+        run_scenario(0, args.uploads, size, chunk_size, buffered=True),
+        run_scenario(0, args.uploads, size, chunk_size),
+        run_scenario(args.workers, args.uploads, size, chunk_size),
+    ]
+    for scenario in scenarios:
+        result = await scenario
+        print(
+            f"{result['mode']:>10} {result['upload_seconds']:>9.2f} {result['probes']:>7} "
+            f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['max_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=4, help="Parallel katta yuklashlar soni")
+    parser.add_argument("--size", type=float, default=20, help="Har bir fayl hajmi (MB)")
+    parser.add_argument("--workers", type=int, default=4, help="CPU hovuzi hajmi")
+    parser.add_argument("--chunk", type=int, default=64, help="Bo'lak hajmi (KB)")
+    asyncio.run(main(parser.parse_args()))
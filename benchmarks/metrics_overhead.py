@@ -0,0 +1,205 @@
+"""
+Prometheus o'lchovlarining xarajatini o'lchash.
+
+1. So'rov: bir xil FastAPI ilova ``PrometheusMiddleware`` bilan va usiz, ASGI darajasida
+   (tarmoq va httpx siz) - har bir so'rovga qo'shiladigan mikrosekundlar; hamda middleware
+   yolg'iz (ichidagi ilova hech narsa qilmaydi) - shovqinsiz aniq xarajat. ``TimingMiddleware``
+   (``Server-Timing``) ham xuddi shunday, JSON log o'chirilgan va yoqilgan holda.
+2. Yuklash: ``write_upload_to_temp`` (hash, shifrlash, yozish) ``StageClock`` bilan va
+   uning o'rniga hech narsa qilmaydigan soat bilan.
+3. Alohida amallar: histogram ``observe``, ``StageClock.add``, ``timed_query`` o'rami.
+
+Ishga tushirish:
+    python -m benchmarks.metrics_overhead
+    python -m benchmarks.metrics_overhead --requests 50000 --size 50
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from fastapi import FastAPI
+
+from app.utils import file as file_module
+from app.utils.file import write_upload_to_temp
+from app.core.config import get_settings
+from app.utils.metrics import STAGE_SECONDS, PrometheusMiddleware, StageClock, timed_query
+from app.utils.timing import TimingMiddleware, logger as timing_logger
+from benchmarks.upload_memory import MB, make_upload
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(PrometheusMiddleware)
+    return app
+
+
+async def asgi_request(app, path: str):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 1), "server": ("test", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure_requests(app, count: int) -> float:
+    """Bitta so'rovga o'rtacha mikrosekund"""
+    for _ in range(200):
+        await asgi_request(app, "/items/1")
+    started = time.perf_counter()
+    for i in range(count):
+        await asgi_request(app, f"/items/{i}")
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def measure_middleware(count: int, middleware=PrometheusMiddleware) -> float:
+    """Middleware ning o'z xarajati: bo'sh ASGI ilova bilan va usiz farq (mikrosekund)"""
+    class Route:
+        path = "/items/{item_id}"
+
+    async def inner(scope, receive, send):
+        scope["route"] = Route
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    timings = []
+    for app in (inner, middleware(inner)):
+        started = time.perf_counter()
+        for _ in range(count):
+            await app({"type": "http", "method": "GET", "path": "/items/1"}, receive, send)
+        timings.append((time.perf_counter() - started) / count * 1e6)
+    return timings[1] - timings[0]
+
+
+class NullClock(StageClock):
+    __slots__ = ()
+
+    def add(self, stage, seconds):
+        pass
+
+    def call(self, stage, func, *args):
+        return func(*args)
+
+    def observe(self):
+        pass
+
+
+async def measure_uploads(size_mb: int, repeat: int) -> dict:
+    """Bitta yuklashga median millisekund: soatsiz (``NullClock``) va ``StageClock`` bilan, navbatma-navbat"""
+    folder = tempfile.mkdtemp(prefix="metrics-bench-")
+    timings = {NullClock: [], StageClock: []}
+    try:
+        for _ in range(repeat):
+            for clock_class in timings:
+                file_module.StageClock = clock_class
+                upload = make_upload(size_mb * MB)
+                started = time.perf_counter()
+                temp_file, _, _, _ = await write_upload_to_temp(folder, upload)
+                timings[clock_class].append((time.perf_counter() - started) * 1000)
+                await temp_file.discard()
+    finally:
+        file_module.StageClock = StageClock
+        shutil.rmtree(folder, ignore_errors=True)
+    return {clock_class: statistics.median(values) for clock_class, values in timings.items()}
+
+
+def per_call_ns(func, count: int = 200_000) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - started) / count * 1e9
+
+
+async def run(args):
+    # Navbatma-navbat bir necha marta: isish va shovqin ikkala ilovaga teng tushadi
+    apps = {False: build_app(False), True: build_app(True)}
+    rounds = {False: [], True: []}
+    for _ in range(args.rounds):
+        for instrumented, app in apps.items():
+            rounds[instrumented].append(await measure_requests(app, args.requests // args.rounds))
+    plain, instrumented = statistics.median(rounds[False]), statistics.median(rounds[True])
+    print(f"request: {plain:.1f}us plain, {instrumented:.1f}us with middleware "
+          f"(+{instrumented - plain:.1f}us, {100 * (instrumented - plain) / plain:.1f}%)")
+    print(f"middleware alone: +{await measure_middleware(args.requests * 5):.1f}us per request")
+
+    settings = get_settings()
+    saved = settings.request_log_threshold_ms, settings.server_timing_enabled
+    settings.request_log_threshold_ms = float("inf")
+    print(f"timing middleware: +{await measure_middleware(args.requests * 5, TimingMiddleware):.1f}us per request "
+          f"(no header, no log)")
+    settings.server_timing_enabled = True
+    print(f"timing middleware: +{await measure_middleware(args.requests * 5, TimingMiddleware):.1f}us per request "
+          f"(with header)")
+    settings.request_log_threshold_ms = 0
+    # JSON va formatlash o'lchanadi, terminalga yozish emas
+    for handler in timing_logger.handlers:
+        handler.setStream(open(os.devnull, "w"))
+    print(f"timing middleware: +{await measure_middleware(args.requests * 5, TimingMiddleware):.1f}us per request "
+          f"(with header and JSON log)")
+    settings.request_log_threshold_ms, settings.server_timing_enabled = saved
+
+    uploads = await measure_uploads(args.size, args.repeat)
+    null, timed = uploads[NullClock], uploads[StageClock]
+    print(f"upload {args.size}MB: {null:.1f}ms without stage clock, {timed:.1f}ms with "
+          f"({100 * (timed - null) / null:+.2f}%)")
+
+    histogram = STAGE_SECONDS.labels("benchmark")
+    clock = StageClock()
+
+    @timed_query
+    async def query():
+        return None
+
+    async def bare():
+        return None
+
+    print(f"histogram.observe: {per_call_ns(lambda: histogram.observe(0.001)):.0f}ns")
+    print(f"StageClock.add: {per_call_ns(lambda: clock.add('hash', 0.001)):.0f}ns")
+    wrapped_ns = per_call_ns(lambda: _drive(query()), 100_000)
+    bare_ns = per_call_ns(lambda: _drive(bare()), 100_000)
+    print(f"timed_query: +{wrapped_ns - bare_ns:.0f}ns per call")
+
+
+def _drive(coroutine):
+    """Kutmaydigan korutinani event loop siz bajarish"""
+    try:
+        coroutine.send(None)
+    except StopIteration:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=20, help="Yuklanadigan fayl hajmi (MB)")
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--rounds", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
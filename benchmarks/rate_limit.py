@@ -0,0 +1,114 @@
+"""
+Rate limit tekshiruvining har bir so'rovga qo'shadigan xarajati.
+
+Ilovaning haqiqiy yo'llari bilan ``RateLimiter`` dependency si to'g'ridan-to'g'ri
+(HTTP siz) chaqiriladi:
+
+- ``fastapi_limiter`` - asl ``RateLimiter`` (har so'rovda barcha yo'llarni aylanib chiqish + EVALSHA)
+- ``redis`` / ``local`` / ``hybrid`` - ``app.utils.rate_limit`` backendlari
+
+Har biri ketma-ket (bitta so'rov - mikrosekund) va ``--concurrency`` ta parallel
+so'rov bilan (sekundiga tekshiruvlar; ``redis`` da parallel tekshiruvlar pipeline ga yig'iladi).
+Limitga yetmaslik uchun har bir so'rov alohida klient IP sidan keladi.
+
+Ishga tushirish:
+    python -m benchmarks.rate_limit
+    python -m benchmarks.rate_limit --redis-url redis://cache:6379 --requests 50000 --concurrency 128
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+from fastapi_limiter import FastAPILimiter
+from fastapi_limiter.depends import RateLimiter as OriginalRateLimiter
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.main import app
+from app.utils import rate_limit
+from app.utils.rate_limit import HybridBackend, LocalLimiter, RateLimiter, RedisBackend
+
+
+def find_route(path: str, method: str):
+    return next(route for route in app.routes if route.path == path and method in getattr(route, "methods", ()))
+
+
+def make_request(route, client: str) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": route.path, "headers": [], "query_string": b"",
+        "client": (client, 1), "app": app, "route": route,
+    })
+
+
+async def measure(limiter, route, requests: int, concurrency: int) -> tuple:
+    """(ketma-ket bitta tekshiruv mikrosekundda, parallel tekshiruvlar sekundiga)"""
+    clients = (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in itertools.count())
+    response = Response()
+    for _ in range(200):
+        await limiter(make_request(route, next(clients)), response)
+
+    batch = [make_request(route, next(clients)) for _ in range(requests)]
+    started = time.perf_counter()
+    for request in batch:
+        await limiter(request, response)
+    sequential = (time.perf_counter() - started) / requests * 1e6
+
+    batch = [make_request(route, next(clients)) for _ in range(requests)]
+    queue = iter(batch)
+
+    async def worker():
+        for request in queue:
+            await limiter(request, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    concurrent = requests / (time.perf_counter() - started)
+    return sequential, concurrent
+
+
+async def run(args):
+    route = find_route("/files", "GET")
+    redis = aioredis.from_url(args.redis_url, encoding="utf-8", decode_responses=True)
+    try:
+        await FastAPILimiter.init(redis)
+        redis_available = True
+    except RedisError as e:
+        print(f"Redis unavailable ({e}): only the local backend is measured")
+        redis_available = False
+
+    candidates = []
+    if redis_available:
+        candidates += [
+            ("fastapi_limiter", OriginalRateLimiter(times=30, seconds=60), None),
+            ("redis", RateLimiter(times=30, seconds=60), RedisBackend(LocalLimiter(), 5)),
+            ("hybrid", RateLimiter(times=30, seconds=60), HybridBackend(LocalLimiter(), 0.1, 5)),
+        ]
+    candidates.append(("local", RateLimiter(times=30, seconds=60), LocalLimiter()))
+
+    print(f"routes={len(app.routes)} requests={args.requests} concurrency={args.concurrency}")
+    try:
+        for name, limiter, backend in candidates:
+            rate_limit._backend = backend
+            sequential, concurrent = await measure(limiter, route, args.requests, args.concurrency)
+            print(f"{name:<16} {sequential:>8.1f}us per check   {concurrent:>10.0f} checks/s concurrent")
+    finally:
+        rate_limit._backend = None
+        if redis_available:
+            async for key in redis.scan_iter(f"{FastAPILimiter.prefix}:10.*"):
+                await redis.delete(key)
+        await redis.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://localhost")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Yuklash paytidagi xotira sarfini o'lchash.
+
+Eski usul (butun faylni ``file.read()`` bilan o'qish va bitta Fernet token
+bilan shifrlash) va bo'laklab yozish (``write_upload_to_temp``) taqqoslanadi.
+
+Ishga tushirish:
+    python -m benchmarks.upload_memory
+    python -m benchmarks.upload_memory --sizes 1 10 50
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from starlette.datastructures import UploadFile
+
+from app.utils.file import write_upload_to_temp
+from app.utils.security import encrypt_file
+
+MB = 1024 * 1024
+
+
+def make_upload(size: int) -> UploadFile:
+    """Starlette kabi diskka spool qilingan UploadFile yaratish"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    block = os.urandom(MB)
+    written = 0
+    while written < size:
+        part = block[:min(MB, size - written)]
+        spooled.write(part)
+        written += len(part)
+    spooled.seek(0)
+    return UploadFile(file=spooled, size=size, filename="bench.bin")
+
+
+async def buffered_upload(folder: str, upload: UploadFile):
+    """Eski usul: butun fayl xotirada"""
+    file_data = await upload.read()
+    encrypted = encrypt_file(file_data)
+    with open(os.path.join(folder, "buffered.bin"), "wb") as f:
+        f.write(encrypted)
+
+
+async def streamed_upload(folder: str, upload: UploadFile):
+    """Yangi usul: bo'laklab o'qish, shifrlash va yozish"""
+    temp_file, _, _, _ = await write_upload_to_temp(folder, upload)
+    await temp_file.discard()
+
+
+async def measure(func, folder: str, size: int) -> int:
+    upload = make_upload(size)
+    tracemalloc.start()
+    try:
+        await func(folder, upload)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        await upload.close()
+    return peak
+
+
+async def main(sizes):
+    folder = tempfile.mkdtemp(prefix="upload-bench-")
+    try:
+        print(f"{'size':>8} {'buffered peak':>16} {'streamed peak':>16}")
+        for size_mb in sizes:
+            size = int(size_mb * MB)
+            buffered = await measure(buffered_upload, folder, size)
+            streamed = await measure(streamed_upload, folder, size)
+            print(f"{size_mb:>6}MB {buffered / MB:>14.2f}MB {streamed / MB:>14.2f}MB")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1, 10, 50], help="Fayl hajmlari (MB)")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 import pytest
 import pytest_asyncio
 import asyncio
@@ -12,11 +13,16 @@ sys.path.insert(0, root_dir)
 
 # Test rejimida ekanligimizni belgilang (Tortoise uchun in-memory sqlite ishlatamiz)
 os.environ.setdefault("TESTING", "1")
+# Testlardagi shifrlash kaliti foydalanuvchining kalit fayliga tegmaydi
+os.environ.setdefault("ENCRYPTION_KEY_FILE", os.path.join(tempfile.gettempdir(), "fastapi-file-server-test-keys.json"))
 
 @pytest_asyncio.fixture(autouse=True)
 async def setup_redis():
     """Test muhiti uchun Redis ni ulash"""
     redis = await aioredis.from_url("redis://localhost", encoding="utf-8", decode_responses=True)
     await FastAPILimiter.init(redis)
+    # Har bir test o'z rate limit hisoblagichlari bilan boshlanadi
+    async for key in redis.scan_iter(f"{FastAPILimiter.prefix}:*"):
+        await redis.delete(key)
     yield redis
     await redis.close()
\ No newline at end of file
@@ -1,4 +1,88 @@
+import argparse
+import logging
+
 import uvicorn
 
+
+def runserver(args):
+    uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True)
+
+
+def migrate_encryption(args):
+    from app.routers.file import UPLOAD_FOLDER
+    from app.utils.migrate_encryption import migrate_folder
+
+    stats = migrate_folder(args.folder or UPLOAD_FOLDER, dry_run=args.dry_run)
+    print(", ".join(f"{key}: {value}" for key, value in stats.items()))
+
+
+def rotate_encryption_key(args):
+    from app.core.config import get_settings
+    from app.utils.keyring import key_file_path, rotate_key_file
+
+    settings = get_settings()
+    if settings.encryption_keys or settings.fernet_key:
+        print("Keys come from ENCRYPTION_KEYS/FERNET_KEY: put a new key first in ENCRYPTION_KEYS instead")
+        return
+    path = key_file_path()
+    key_id = rotate_key_file(path)
+    print(f"Active encryption key: {key_id} ({path})")
+
+
+def migrate_blobs(args):
+    from tortoise import run_async
+    from app.database import init
+    from app.routers.file import BLOB_FOLDER
+    from app.utils.migrate_blobs import migrate_blobs as run_migration
+
+    async def run():
+        await init()
+        stats = await run_migration(BLOB_FOLDER, dry_run=args.dry_run)
+        print(", ".join(f"{key}: {value}" for key, value in stats.items()))
+
+    run_async(run())
+
+
+def export_audit(args):
+    from app.utils.audit import get_audit_log
+
+    rows = get_audit_log().export_xlsx(args.output)
+    print(f"{rows} rows written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command")
+
+    server = subparsers.add_parser("runserver", help="Serverni ishga tushirish (standart)")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8000)
+    server.set_defaults(func=runserver)
+
+    migrate = subparsers.add_parser("migrate_encryption", help="Eski Fernet va eski kalitli fayllarni faol kalit bilan qayta shifrlash")
+    migrate.add_argument("--folder", default=None, help="Fayllar papkasi (standart: UPLOAD_FOLDER)")
+    migrate.add_argument("--dry-run", action="store_true", help="Faqat qancha fayl o'tkazilishini ko'rsatish")
+    migrate.set_defaults(func=migrate_encryption)
+
+    rotate = subparsers.add_parser("rotate_encryption_key", help="Kalit fayliga yangi faol shifrlash kalitini qo'shish")
+    rotate.set_defaults(func=rotate_encryption_key)
+
+    blobs = subparsers.add_parser("migrate_blobs", help="Eski fayllarni hash bo'yicha blob joylashuviga o'tkazish")
+    blobs.add_argument("--dry-run", action="store_true", help="Faqat nima o'zgarishini ko'rsatish")
+    blobs.set_defaults(func=migrate_blobs)
+
+    export = subparsers.add_parser("export_audit", help="Audit logdan Excel fayl qurish")
+    # Standart nom eski app/file_records.xlsx (audit logdan oldingi tarix) ni ustidan yozmaydi
+    export.add_argument("output", nargs="?", default="app/audit_export.xlsx", help="Natija fayli (xlsx)")
+    export.set_defaults(func=export_audit)
+
+    args = parser.parse_args()
+    # Buyruqlar (migratsiyalar) fayl bo'yicha xatolarni app.* loggerlariga yozadi
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    if args.command is None:
+        args = parser.parse_args(["runserver"])
+    args.func(args)
+
+
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
+    main()
@@ -10,14 +10,36 @@ from fastapi_limiter import FastAPILimiter
 from fastapi_limiter.depends import RateLimiter
 from redis import asyncio as aioredis
 from app.main import app
+from app.core.config import get_settings
 
 import asyncio
+import hashlib
 from tortoise import Tortoise
+from app.utils.search import init_search
+from app.utils.cache import get_metadata_cache
+from app.utils.content_cache import get_content_cache
 
 
 @pytest_asyncio.fixture(autouse=True)
-async def setup_test_db():
+async def setup_test_db(monkeypatch, tmp_path_factory):
     os.environ["TESTING"] = "1"
+    # Yuklangan fayllar, bloblar, peer keshi va audit log - testning vaqtinchalik papkasida
+    import app.routers.file as file_router
+    import app.routers.upload as upload_router
+    import app.routers.peer as peer_router
+    from app.utils import peers
+    storage_dir = tmp_path_factory.mktemp("storage")
+    blob_folder = str(storage_dir / "uploaded_files" / "blobs")
+    monkeypatch.setattr(file_router, "UPLOAD_FOLDER", str(storage_dir / "uploaded_files"))
+    monkeypatch.setattr(file_router, "BLOB_FOLDER", blob_folder)
+    monkeypatch.setattr(upload_router, "BLOB_FOLDER", blob_folder)
+    monkeypatch.setattr(peer_router, "BLOB_FOLDER", blob_folder)
+    monkeypatch.setattr(get_settings(), "peer_cache_dir", str(storage_dir / "peer_cache"))
+    monkeypatch.setattr(peers, "_fetcher", None)
+    # Audit log ham: singleton shu papka bilan qayta yaratiladi
+    from app.utils import audit
+    monkeypatch.setattr(get_settings(), "audit_log_dir", str(storage_dir / "audit_log"))
+    monkeypatch.setattr(audit, "_audit_log", None)
     redis = await aioredis.from_url("redis://localhost", encoding="utf-8", decode_responses=True)
     await FastAPILimiter.init(redis)
 
@@ -34,6 +56,10 @@ async def setup_test_db():
         }
     )
     await Tortoise.generate_schemas()
+    await init_search()
+    # Har bir test yangi (bo'sh) DB bilan: oldingi testlardan qolgan kesh ishlatilmasin
+    await get_metadata_cache().invalidate()
+    get_content_cache().clear()
 
     yield
 
@@ -168,6 +194,38 @@ async def test_rate_limiting():
         response = await ac.post("/upload/", headers=headers, files=files)
         assert response.status_code == 429
 
+@pytest.mark.asyncio
+async def test_rate_limiter_keys_match_fastapi_limiter(setup_redis):
+    """Rate limit kalitlari fastapi_limiter niki bilan bir xil (yo'l indeksi keshlanadi)"""
+    headers = {"Authorization": f"Bearer {await get_test_token()}"}
+    route_index = next(
+        i for i, route in enumerate(app.routes) if route.path == "/files" and "GET" in getattr(route, "methods", ())
+    )
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.get("/files", headers=headers)).status_code == 200
+        assert (await ac.get("/files", headers=headers)).status_code == 200
+
+    assert await setup_redis.get(f"fastapi-limiter:127.0.0.1:/files:{route_index}:0") == "2"
+
+@pytest.mark.asyncio
+async def test_token_expiry_and_revoke():
+    """Token muddati va kid bilan; bekor qilingan token 401"""
+    from jose import jwt
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/token", json={"username": TEST_USERNAME, "password": TEST_PASSWORD})
+        body = response.json()
+        claims = jwt.get_unverified_claims(body["access_token"])
+        assert claims["exp"] - claims["iat"] == body["expires_in"]
+        assert jwt.get_unverified_header(body["access_token"])["kid"]
+
+        headers = {"Authorization": f"Bearer {body['access_token']}"}
+        assert (await ac.get("/metrics/token-cache", headers=headers)).status_code == 200
+        response = await ac.post("/token/revoke", headers=headers)
+        assert response.status_code == 200
+        response = await ac.get("/metrics/token-cache", headers=headers)
+        assert response.status_code == 401
+
 @pytest.mark.asyncio
 async def test_duplicate_file():
     """Bir xil faylni qayta yuklash testi"""
@@ -216,4 +274,1055 @@ async def test_cleanup():
                     if file.name.startswith("test"):
                         file.unlink()
                 if not any(date_dir.iterdir()):
-                    date_dir.rmdir()
\ No newline at end of file
+                    date_dir.rmdir()
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cached", [True, False])
+async def test_download_range(monkeypatch, cached):
+    """Range so'rovlari (206, multi-range, 416, If-Range) testi (xotira keshi bilan va diskdan)"""
+    if not cached:
+        monkeypatch.setattr(get_content_cache(), "max_bytes", 0)
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = bytes(range(256)) * 1024  # 256KB, bir nechta segment
+    files = {"file": ("range.txt", content, "text/plain")}
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/upload/", headers=headers, files=files)
+        assert response.status_code == 200
+        file_url = response.json()["url"]
+
+        # To'liq javob
+        response = await ac.get(file_url, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.content == content
+
+        # Bitta oraliq (segment chegarasidan o'tadi)
+        response = await ac.get(file_url, headers={**headers, "Range": "bytes=65530-65545"})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 65530-65545/{len(content)}"
+        assert response.content == content[65530:65546]
+
+        # Suffix oraliq
+        response = await ac.get(file_url, headers={**headers, "Range": "bytes=-10"})
+        assert response.status_code == 206
+        assert response.content == content[-10:]
+
+        # Bir nechta oraliq
+        response = await ac.get(file_url, headers={**headers, "Range": "bytes=0-1,200000-200003"})
+        assert response.status_code == 206
+        assert response.headers["content-type"].startswith("multipart/byteranges")
+        assert content[0:2] in response.content and content[200000:200004] in response.content
+
+        # Qanoatlantirib bo'lmaydigan oraliq
+        response = await ac.get(file_url, headers={**headers, "Range": f"bytes={len(content)}-"})
+        assert response.status_code == 416
+
+        # If-Range mos kelmasa to'liq fayl qaytariladi
+        response = await ac.get(file_url, headers={**headers, "Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == content
+
+@pytest.mark.asyncio
+async def test_conditional_get():
+    """ETag / Last-Modified va 304 javoblari testi"""
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = b"conditional get content"
+    files = {"file": ("cond.txt", content, "text/plain")}
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/upload/", headers=headers, files=files)
+        assert response.status_code == 200
+        file_url = response.json()["url"]
+
+        response = await ac.get(file_url, headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        last_modified = response.headers["last-modified"]
+        assert etag == f'"{hashlib.sha256(content).hexdigest()}"'
+        # So'rov Authorization bilan: umumiy keshlarga tushmasligi kerak
+        assert response.headers["cache-control"].startswith("private, max-age=")
+
+        response = await ac.get(file_url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = await ac.get(file_url, headers={**headers, "If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+        # ETag mos kelmasa If-Modified-Since e'tiborga olinmaydi
+        response = await ac.get(file_url, headers={**headers, "If-None-Match": '"other"', "If-Modified-Since": last_modified})
+        assert response.status_code == 200
+        assert response.content == content
+
+@pytest.mark.asyncio
+async def test_executor_metrics():
+    """CPU hovuzi ko'rsatkichlari endpointi testi"""
+    token = await get_test_token()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/metrics/executor", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    for pool in ("cpu", "io"):
+        assert {"queue_depth", "active", "completed", "workers"} <= response.json()[pool].keys()
+
+@pytest.mark.asyncio
+async def test_blob_reference_counting():
+    """Dublikatlar bitta blobga ishora qiladi, fizik fayl oxirgi yozuv bilan o'chiriladi"""
+    from app.models.file import Blob, File as FileModel
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = os.urandom(1000)
+    files = {"file": ("blob.txt", content, "text/plain")}
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        url = (await ac.post("/upload/", headers=headers, files=files)).json()["url"]
+        response = await ac.post("/upload/", headers=headers, files=files)
+        assert response.json()["url"] == url
+
+        hash_code = hashlib.sha256(content).hexdigest()
+        blob = await Blob.get(hash_code=hash_code)
+        assert blob.ref_count == 2
+        assert blob.path.endswith(os.path.join(hash_code[:2], hash_code[2:4], hash_code))
+        first, second = await FileModel.filter(hash_code=hash_code).order_by("id")
+        assert first.path == second.path == blob.path
+
+        # Birinchi yozuv o'chirilganda fayl boshqa yozuv uchun saqlanib qoladi
+        response = await ac.delete(f"/files/{first.id}", headers=headers)
+        assert response.status_code == 200
+        assert (await Blob.get(hash_code=hash_code)).ref_count == 1
+        assert os.path.exists(blob.path)
+        response = await ac.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.content == content
+
+        response = await ac.delete(f"/files/{second.id}", headers=headers)
+        assert response.status_code == 200
+        assert not await Blob.exists(hash_code=hash_code)
+        assert not os.path.exists(blob.path)
+        assert (await ac.get(url, headers=headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_concurrent_delete_releases_one_reference():
+    """Bir yozuvni parallel o'chirish blob ishorasini bir marta kamaytiradi"""
+    from app.crud.file import delete_file
+    from app.models.file import Blob, File as FileModel
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = os.urandom(1000)
+    files = {"file": ("blob.txt", content, "text/plain")}
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        url = (await ac.post("/upload/", headers=headers, files=files)).json()["url"]
+        await ac.post("/upload/", headers=headers, files=files)
+        hash_code = hashlib.sha256(content).hexdigest()
+        first, second = await FileModel.filter(hash_code=hash_code).order_by("id")
+
+        results = await asyncio.gather(delete_file(first.id), delete_file(first.id))
+        assert sorted(results) == [(False, "File not found"), (True, None)]
+        blob = await Blob.get(hash_code=hash_code)
+        assert blob.ref_count == 1
+        assert os.path.exists(blob.path)
+        response = await ac.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.content == content
+
+
+@pytest.mark.asyncio
+async def test_migrate_blobs(tmp_path):
+    """Eski kunlik papkadagi nusxalarni blob joylashuviga o'tkazish"""
+    from app.models.file import Blob, File as FileModel
+    from app.utils.migrate_blobs import migrate_blobs
+    from app.utils.security import encrypt_file
+
+    content = os.urandom(100)
+    hash_code = hashlib.sha256(content).hexdigest()
+    legacy_paths = []
+    for day in ("2024-01-01", "2024-01-02"):
+        (tmp_path / day).mkdir()
+        path = tmp_path / day / "20240101000000000000_legacy"
+        path.write_bytes(encrypt_file(content))
+        legacy_paths.append(str(path))
+    for path in legacy_paths:
+        await FileModel.create(
+            name="legacy.txt", saved_name="20240101000000000000_legacy", path=path, hash_code=hash_code,
+            server="localhost", size=len(content), format="text/plain"
+        )
+
+    blob_folder = str(tmp_path / "blobs")
+    assert await migrate_blobs(blob_folder, dry_run=True) == {"blobs": 1, "files": 2, "removed": 1, "missing": 0}
+    assert not await Blob.exists(hash_code=hash_code)
+
+    assert await migrate_blobs(blob_folder) == {"blobs": 1, "files": 2, "removed": 1, "missing": 0}
+    blob = await Blob.get(hash_code=hash_code)
+    assert blob.ref_count == 2
+    assert set(await FileModel.filter(hash_code=hash_code).values_list("path", flat=True)) == {blob.path}
+    assert os.path.exists(blob.path)
+    assert not any(os.path.exists(path) for path in legacy_paths)
+
+@pytest.mark.asyncio
+async def test_resumable_upload(monkeypatch):
+    """Qismlab yuklash: qismlar istalgan tartibda va parallel, holat so'rovi va yakunlash"""
+    from app.core.config import get_settings
+    from app.utils.encryption import SEGMENT_SIZE
+
+    monkeypatch.setattr(get_settings(), "upload_chunk_size", SEGMENT_SIZE)
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = os.urandom(3 * SEGMENT_SIZE + 500)
+    chunks = [content[i:i + SEGMENT_SIZE] for i in range(0, len(content), SEGMENT_SIZE)]
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post(
+            "/uploads/", headers=headers, json={"name": "big.txt", "size": len(content), "format": "text/plain"}
+        )
+        assert response.status_code == 200
+        session = response.json()
+        upload_id = session["upload_id"]
+        assert session["chunk_count"] == 4 and session["offset"] == 0
+
+        # Oxirgi qism va birinchi qism parallel
+        responses = await asyncio.gather(
+            ac.put(f"/uploads/{upload_id}/chunks/3", headers=headers, content=chunks[3]),
+            ac.put(f"/uploads/{upload_id}/chunks/0", headers=headers, content=chunks[0]),
+        )
+        assert [r.status_code for r in responses] == [200, 200]
+
+        status = (await ac.get(f"/uploads/{upload_id}", headers=headers)).json()
+        assert status["received"] == [0, 3]
+        assert status["offset"] == SEGMENT_SIZE
+
+        response = await ac.post(f"/uploads/{upload_id}/complete", headers=headers)
+        assert response.status_code == 409
+        assert response.json()["detail"]["missing"] == [1, 2]
+
+        # Noto'g'ri hajm, checksum va bir raqamga boshqa tarkib
+        response = await ac.put(f"/uploads/{upload_id}/chunks/1", headers=headers, content=chunks[1][:10])
+        assert response.status_code == 400
+        response = await ac.put(
+            f"/uploads/{upload_id}/chunks/1", headers={**headers, "X-Chunk-SHA256": "0" * 64}, content=chunks[1]
+        )
+        assert response.status_code == 400
+        response = await ac.put(f"/uploads/{upload_id}/chunks/0", headers=headers, content=chunks[1])
+        assert response.status_code == 409
+
+        for number in (2, 1, 1):
+            response = await ac.put(f"/uploads/{upload_id}/chunks/{number}", headers=headers, content=chunks[number])
+            assert response.status_code == 200
+
+        response = await ac.post(f"/uploads/{upload_id}/complete", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["message"] == "File uploaded successfully"
+        file_url = response.json()["url"]
+
+        response = await ac.get(file_url, headers=headers)
+        assert response.status_code == 200
+        assert response.content == content
+        assert response.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+
+        assert (await ac.get(f"/uploads/{upload_id}", headers=headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_upload_sessions():
+    """Muddati o'tgan ochiq sessiyalar va yakunlashda to'xtab qolganlar fayli bilan o'chiriladi"""
+    from datetime import datetime, timedelta, timezone
+    from app.core.config import get_settings
+    from app.crud.upload import create_upload_session
+    from app.models.file import UploadSession
+    from app.routers import upload as upload_router
+    from app.utils import storage
+
+    ttl = get_settings().upload_session_ttl_seconds
+    now = datetime.now(timezone.utc)
+    cases = {
+        ("open", ttl + 60): False,
+        ("open", 60): True,
+        ("finalizing", ttl + upload_router.FINALIZE_GRACE_SECONDS + 60): False,
+        # Muddati o'tgan, lekin yakunlash hali davom etayotgan bo'lishi mumkin
+        ("finalizing", ttl + 60): True,
+    }
+    sessions = {}
+    for (status, age), kept in cases.items():
+        temp_file = await storage.create_temp_file(upload_router.BLOB_FOLDER)
+        await temp_file.close()
+        session = await create_upload_session("a.txt", "text/plain", 1, 1, temp_file.path, b"\0" * 8, "kid")
+        await UploadSession.filter(id=session.id).update(status=status, created_at=now - timedelta(seconds=age))
+        sessions[session.id] = (session.temp_path, kept)
+
+    await upload_router._purge_expired_sessions()
+    for session_id, (temp_path, kept) in sessions.items():
+        assert await UploadSession.exists(id=session_id) == kept
+        assert os.path.exists(temp_path) == kept
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_compresses_text(monkeypatch):
+    """Qismlab yuklangan matn fayl yakunlashda siqiladi; qismlar fayli o'chiriladi"""
+    from app.core.config import get_settings
+    from app.models.file import Blob, File as FileModel, UploadSession
+    from app.utils.encryption import SEGMENT_SIZE
+    from app.utils.file import get_plaintext_size
+
+    monkeypatch.setattr(get_settings(), "upload_chunk_size", SEGMENT_SIZE)
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = b"".join(b"line %d: the quick brown fox jumps over the lazy dog\n" % i for i in range(5000))
+    chunks = [content[i:i + SEGMENT_SIZE] for i in range(0, len(content), SEGMENT_SIZE)]
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post(
+            "/uploads/", headers=headers, json={"name": "notes.txt", "size": len(content), "format": "text/plain"}
+        )
+        upload_id = response.json()["upload_id"]
+        temp_path = (await UploadSession.get(id=upload_id)).temp_path
+        for number, chunk in enumerate(chunks):
+            response = await ac.put(f"/uploads/{upload_id}/chunks/{number}", headers=headers, content=chunk)
+            assert response.status_code == 200
+
+        response = await ac.post(f"/uploads/{upload_id}/complete", headers=headers)
+        assert response.status_code == 200
+        record = await FileModel.get(name="notes.txt")
+        assert record.codec == "gzip" and record.size == len(content)
+        assert record.hash_code == hashlib.sha256(content).hexdigest()
+        assert (await Blob.get(hash_code=record.hash_code)).codec == "gzip"
+        assert await get_plaintext_size(record.path) < len(content) // 5
+        assert not os.path.exists(temp_path)
+
+        response = await ac.get(response.json()["url"], headers=headers)
+        assert response.content == content
+
+
+@pytest.mark.asyncio
+async def test_upload_precheck():
+    """Hash oldindan tekshiruvi: ma'lum tarkib yuborilmasdan yozuv yaratiladi"""
+    from app.models.file import Blob, File as FileModel
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = os.urandom(500)
+    hash_code = hashlib.sha256(content).hexdigest()
+    precheck = {"name": "pre.txt", "size": len(content), "hash_code": hash_code, "format": "text/plain"}
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/upload/precheck", headers=headers, json=precheck)
+        assert response.status_code == 200
+        assert response.json() == {"message": "Upload needed", "upload_needed": True}
+        assert not await FileModel.exists(hash_code=hash_code)
+
+        url = (await ac.post("/upload/", headers=headers, files={"file": ("pre.txt", content, "text/plain")})).json()["url"]
+
+        # Hajm mos kelmasa tarkib yuklanishi kerak
+        response = await ac.post("/upload/precheck", headers=headers, json={**precheck, "size": 1})
+        assert response.json()["upload_needed"] is True
+
+        response = await ac.post("/upload/precheck", headers=headers, json={**precheck, "name": "copy.txt"})
+        assert response.status_code == 200
+        assert response.json()["upload_needed"] is False
+        assert response.json()["url"] == url
+        assert (await Blob.get(hash_code=hash_code)).ref_count == 2
+        assert await FileModel.filter(hash_code=hash_code, name="copy.txt").exists()
+
+        response = await ac.get(url, headers=headers)
+        assert response.content == content
+
+        response = await ac.post("/upload/precheck", headers=headers, json={**precheck, "hash_code": "xyz"})
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_by", ["date", "name", "size", "format"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+async def test_keyset_pagination(sort_by, sort_order):
+    """Kursorlar bilan oldinga va orqaga yurish OFFSET natijalari bilan bir xil (teng qiymatlar ham)"""
+    from app.crud.file import get_files
+    from app.models.file import File as FileModel
+    from app.schemas.file import CountMode, PaginationParams
+
+    for i in range(23):
+        await FileModel.create(
+            name=f"file{i % 5}.txt", saved_name=f"s{i}", path=f"p{i}", hash_code=f"h{i}",
+            server="localhost", size=i % 4, format=["text/plain", "image/png"][i % 2]
+        )
+
+    params = {"page_size": 5, "sort_by": sort_by, "sort_order": sort_order}
+    expected = []
+    for page in range(1, 6):
+        files, total, _, _ = await get_files(PaginationParams(page=page, **params))
+        expected.extend(file.id for file in files)
+    assert total == 23 and sorted(expected) == sorted(set(expected))
+
+    # Oldinga
+    pages, cursor = [], None
+    while True:
+        files, total, next_cursor, prev_cursor = await get_files(
+            PaginationParams(cursor=cursor, count=CountMode.none, **params)
+        )
+        assert total is None
+        assert (prev_cursor is None) == (cursor is None)
+        pages.append([file.id for file in files])
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    assert [i for page in pages for i in page] == expected
+
+    # Oxirgi sahifadan orqaga
+    back = []
+    while prev_cursor is not None:
+        files, _, _, prev_cursor = await get_files(PaginationParams(cursor=prev_cursor, count=CountMode.none, **params))
+        back.insert(0, [file.id for file in files])
+    assert back == pages[:-1]
+
+@pytest.mark.asyncio
+async def test_list_files_cursor_api():
+    """GET /files: next_cursor, count=none va noto'g'ri kursor"""
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for i in range(3):
+            await ac.post("/upload/", headers=headers, files={"file": (f"c{i}.txt", os.urandom(10), "text/plain")})
+
+        first = (await ac.get("/files", headers=headers, params={"page_size": 2})).json()
+        assert first["total"] == 3 and first["prev_cursor"] is None
+        second = (await ac.get(
+            "/files", headers=headers, params={"page_size": 2, "cursor": first["next_cursor"], "count": "none"}
+        )).json()
+        assert second["total"] is None and second["total_pages"] is None
+        assert len(second["items"]) == 1 and second["next_cursor"] is None
+        assert {item["id"] for item in first["items"] + second["items"]} == {1, 2, 3}
+
+        response = await ac.get("/files", headers=headers, params={"cursor": first["next_cursor"], "sort_by": "name"})
+        assert response.status_code == 400
+        response = await ac.get("/files", headers=headers, params={"cursor": "garbage"})
+        assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_search_modes_and_sync():
+    """Indeksli qidiruv: substring/prefix/token, create/update/delete bilan sinxron, reyting"""
+    from app.crud.file import get_files, update_file, delete_file
+    from app.models.file import File as FileModel
+    from app.schemas.file import FileUpdate, PaginationParams, SearchMode, SortField
+    from app.utils.search import search_backend
+
+    assert search_backend() == "sqlite"
+    names = ["Annual report 2024.pdf", "annual_budget.xlsx", "Report-final.docx", "photo.png", "my reports.txt"]
+    ids = {}
+    for name in names:
+        ids[name] = (await FileModel.create(
+            name=name, saved_name=name, path=name, hash_code=name, server="localhost", size=1, format="text/plain"
+        )).id
+
+    async def search(text, mode=SearchMode.substring, **kwargs):
+        files, total, _, _ = await get_files(PaginationParams(search=text, search_mode=mode, page_size=100, **kwargs))
+        assert total == len(files)
+        return {file.name for file in files}
+
+    assert await search("REPORT") == {"Annual report 2024.pdf", "Report-final.docx", "my reports.txt"}
+    assert await search("nnual") == {"Annual report 2024.pdf", "annual_budget.xlsx"}
+    assert await search("report", SearchMode.prefix) == {"Report-final.docx"}
+    assert await search("ann rep", SearchMode.token) == {"Annual report 2024.pdf"}
+    assert await search("budget annual", SearchMode.token) == {"annual_budget.xlsx"}
+    # Qisqa matn (trigramdan qisqa) LIKE bilan
+    assert await search("ph") == {"photo.png"}
+    # Maxsus belgilar so'rovni buzmaydi
+    assert await search("'\"%_") == set()
+
+    # Eng mos natija birinchi: to'liq so'z mosligi
+    files, _, _, _ = await get_files(PaginationParams(
+        search="report", search_mode=SearchMode.token, sort_by=SortField.relevance, page_size=100
+    ))
+    assert len(files) == 3 and all(hasattr(file, "relevance") for file in files)
+    assert files[0].relevance >= files[-1].relevance
+
+    await update_file(ids["photo.png"], FileUpdate(name="holiday report.png"))
+    assert "holiday report.png" in await search("report")
+    assert await search("photo") == set()
+
+    await delete_file(ids["my reports.txt"])
+    assert "my reports.txt" not in await search("report")
+
+@pytest.mark.asyncio
+async def test_search_relevance_cursor_api():
+    """sort_by=relevance kursor bilan ham ishlaydi va search siz 400"""
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for i in range(5):
+            await ac.post("/upload/", headers=headers, files={"file": (f"report {'x' * i}.txt", os.urandom(10), "text/plain")})
+
+        params = {"search": "report", "sort_by": "relevance", "page_size": 2}
+        seen, cursor = [], None
+        while True:
+            body = (await ac.get("/files", headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})).json()
+            seen.extend(item["id"] for item in body["items"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        assert sorted(seen) == [1, 2, 3, 4, 5]
+
+        response = await ac.get("/files", headers=headers, params={"sort_by": "relevance"})
+        assert response.status_code == 400
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filters", [{}, {"format": "image/png"}, {"public": False}, {"shareable": False}, {"public": True}])
+@pytest.mark.parametrize("sort_by", ["date", "name", "size", "format"])
+async def test_list_files_query_plans(monkeypatch, filters, sort_by):
+    """GET /files so'rov shakllari indeks bilan bajariladi: jadval skani va alohida saralash bosqichi yo'q"""
+    from tortoise import connections
+    from app.crud.file import get_files
+    from app.models.file import File as FileModel
+    from app.schemas.file import CountMode, PaginationParams
+
+    for i in range(30):
+        await FileModel.create(
+            name=f"file{i % 7}.txt", saved_name=f"s{i}", path=f"p{i}", hash_code=f"h{i}", server="localhost",
+            size=i % 5, format=["text/plain", "image/png", "application/pdf"][i % 3],
+            public=i % 4 != 0, shareable=i % 6 != 0
+        )
+
+    connection = connections.get("default")
+    selects = []
+    execute_query = connection.execute_query
+
+    async def capture(query, values=None):
+        if query.startswith("SELECT") and "ORDER BY" in query:
+            selects.append((query, values))
+        return await execute_query(query, values)
+
+    monkeypatch.setattr(connection, "execute_query", capture)
+    for sort_order in ("asc", "desc"):
+        params = {"page_size": 5, "sort_by": sort_by, "sort_order": sort_order, "count": CountMode.none, **filters}
+        _, _, next_cursor, _ = await get_files(PaginationParams(page=2, **params))
+        _, _, _, prev_cursor = await get_files(PaginationParams(cursor=next_cursor, **params))
+        await get_files(PaginationParams(cursor=prev_cursor, **params))
+    monkeypatch.undo()
+
+    assert len(selects) == 6
+    for query, values in selects:
+        plan = " | ".join(row["detail"] for row in await connection.execute_query_dict(f"EXPLAIN QUERY PLAN {query}", values))
+        assert "TEMP B-TREE" not in plan, (query, plan)
+        assert "USING INDEX files_" in plan or "USING COVERING INDEX files_" in plan, (query, plan)
+
+@pytest.mark.asyncio
+async def test_metadata_cache():
+    """GET /files va /files/{id} keshdan beriladi; yuklash, yangilash va o'chirish keshni eskirtiradi"""
+    from app.models.file import File as FileModel
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    cache = get_metadata_cache()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await ac.post("/upload/", headers=headers, files={"file": ("cached.txt", os.urandom(10), "text/plain")})
+        file_id = (await FileModel.first()).id
+
+        before = await ac.get("/metrics/cache", headers=headers)
+        hits, misses = before.json()["list"]["hits"], before.json()["list"]["misses"]
+        first = (await ac.get("/files", headers=headers)).json()
+        # DB ni chetlab o'tib o'zgartirish: keshdan kelgan javob eski bo'lib qoladi
+        await FileModel.filter(id=file_id).update(name="changed.txt")
+        second = (await ac.get("/files", headers=headers)).json()
+        assert first == second and second["items"][0]["name"] == "cached.txt"
+        stats = (await ac.get("/metrics/cache", headers=headers)).json()["list"]
+        assert (stats["hits"], stats["misses"]) == (hits + 1, misses + 1)
+
+        record = (await ac.get(f"/files/{file_id}", headers=headers)).json()
+        assert record["name"] == "changed.txt"
+        assert (await ac.get(f"/files/{file_id}", headers=headers)).json() == record
+        assert cache.stats()["file"]["hits"] >= 1
+
+        # Yangilash keshni eskirtiradi
+        response = await ac.put(f"/files/{file_id}", headers=headers, json={"name": "renamed.txt"})
+        assert response.status_code == 200
+        assert (await ac.get(f"/files/{file_id}", headers=headers)).json()["name"] == "renamed.txt"
+        assert (await ac.get("/files", headers=headers)).json()["items"][0]["name"] == "renamed.txt"
+
+        # Yuklash ham
+        await ac.post("/upload/", headers=headers, files={"file": ("second.txt", os.urandom(10), "text/plain")})
+        assert (await ac.get("/files", headers=headers)).json()["total"] == 2
+
+        # O'chirishdan keyin eski yozuv keshdan qaytmaydi
+        assert (await ac.delete(f"/files/{file_id}", headers=headers)).status_code == 200
+        assert (await ac.get(f"/files/{file_id}", headers=headers)).status_code == 404
+        assert (await ac.get("/files", headers=headers)).json()["total"] == 1
+
+@pytest.mark.asyncio
+async def test_content_cache_download():
+    """Kichik fayl ikkinchi yuklab olishda xotiradan beriladi; o'chirilganda keshdan chiqadi"""
+    from app.models.file import File as FileModel
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    cache = get_content_cache()
+    content = os.urandom(100_000)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/upload/", headers=headers, files={"file": ("logo.png", content, "image/png")})
+        file_url = response.json()["url"]
+        record = await FileModel.first()
+
+        hits, misses = cache.hits, cache.misses
+        first = await ac.get(file_url, headers=headers)
+        second = await ac.get(file_url, headers=headers)
+        assert first.content == second.content == content
+        assert second.headers["content-length"] == str(len(content))
+        assert (cache.hits, cache.misses) == (hits + 1, misses + 1)
+        assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == len(content)
+
+        response = await ac.get(file_url, headers={**headers, "Range": "bytes=10-19"})
+        assert response.status_code == 206 and response.content == content[10:20]
+        assert cache.hits == hits + 2
+
+        metrics = (await ac.get("/metrics/content-cache", headers=headers)).json()
+        assert metrics["hits"] == cache.hits and metrics["entries"] == 1
+
+        assert (await ac.delete(f"/files/{record.id}", headers=headers)).status_code == 200
+        assert cache.stats()["entries"] == 0 and cache.size == 0
+        assert (await ac.get(file_url, headers=headers)).status_code == 404
+
+@pytest.mark.asyncio
+async def test_compressed_storage(monkeypatch):
+    """Matn fayllar shifrlashdan oldin siqiladi; Accept-Encoding mos bo'lsa siqilgan holicha beriladi"""
+    import io
+    import zipfile
+    from app.core.config import get_settings
+    from app.models.file import Blob, File as FileModel
+    from app.utils.file import get_plaintext_size
+
+    monkeypatch.setattr(get_content_cache(), "max_bytes", 0)
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = b"".join(b"line %d: the quick brown fox jumps over the lazy dog\n" % i for i in range(20000))
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/upload/", headers=headers, files={"file": ("notes.txt", content, "text/plain")})
+        file_url = response.json()["url"]
+        record = await FileModel.first()
+        assert record.codec == "gzip" and record.size == len(content)
+        assert (await Blob.get(hash_code=record.hash_code)).codec == "gzip"
+        assert record.hash_code == hashlib.sha256(content).hexdigest()
+        stored_size = await get_plaintext_size(record.path)
+        assert stored_size < len(content) // 5
+
+        # Siqilgan baytlar o'zgarishsiz (httpx o'zi ochadi)
+        response = await ac.get(file_url, headers={**headers, "Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-length"] == str(stored_size)
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == f'"{record.hash_code}-gzip"'
+        assert response.content == content
+        encoded_etag = response.headers["etag"]
+        response = await ac.get(file_url, headers={**headers, "Accept-Encoding": "gzip", "If-None-Match": encoded_etag})
+        assert response.status_code == 304
+
+        # Qabul qilmaydigan klient uchun oqim bilan ochiladi
+        for accept in ("identity", "gzip;q=0, br"):
+            response = await ac.get(file_url, headers={**headers, "Accept-Encoding": accept})
+            assert "content-encoding" not in response.headers
+            assert response.headers["content-length"] == str(len(content))
+            assert response.headers["etag"] == f'"{record.hash_code}"'
+            assert response.content == content
+
+        # Range asl tarkib bo'yicha
+        response = await ac.get(file_url, headers={**headers, "Accept-Encoding": "gzip", "Range": "bytes=500000-500099"})
+        assert response.status_code == 206 and "content-encoding" not in response.headers
+        assert response.content == content[500000:500100]
+
+        # Dublikat blob kodekini oladi; arxivga asl tarkib yoziladi
+        await ac.post("/upload/", headers=headers, files={"file": ("copy.txt", content, "text/plain")})
+        copy = await FileModel.get(name="copy.txt")
+        assert copy.codec == "gzip" and copy.path == record.path
+        response = await ac.get("/files/archive", headers=headers, params={"ids": [record.id, copy.id]})
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert archive.read("notes.txt") == archive.read("copy.txt") == content
+
+        # Siqilmaydigan tarkib va tur, o'chirilgan siqish - identity
+        await ac.post("/upload/", headers=headers, files={"file": ("random.txt", os.urandom(50_000), "text/plain")})
+        await ac.post("/upload/", headers=headers, files={"file": ("image.png", content[:1000], "image/png")})
+        monkeypatch.setattr(get_settings(), "compression_codec", "none")
+        await ac.post("/upload/", headers=headers, files={"file": ("plain.txt", content[:1000], "text/plain")})
+        for name in ("random.txt", "image.png", "plain.txt"):
+            assert (await FileModel.get(name=name)).codec == "identity"
+
+
+@pytest.mark.asyncio
+async def test_prometheus_metrics():
+    """/metrics: so'rov vaqti yo'l shabloni bo'yicha, baytlar, bosqichlar, DB, rate limit va dedup"""
+    from prometheus_client import REGISTRY
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = os.urandom(200_000)
+    route = "/{date}/{filename}"
+    before = {
+        "upload": sample("http_request_duration_seconds_count", method="POST", route="/upload/", status="200"),
+        "download": sample("http_request_duration_seconds_count", method="GET", route=route, status="200"),
+        "uploaded": sample("http_request_bytes_total", route="/upload/"),
+        "downloaded": sample("http_response_bytes_total", route=route),
+        "encrypt": sample("file_server_stage_duration_seconds_count", stage="encrypt"),
+        "decrypt": sample("file_server_stage_duration_seconds_count", stage="decrypt"),
+        "commit": sample("file_server_stage_duration_seconds_count", stage="commit"),
+        "db": sample("file_server_db_duration_seconds_count", operation="get_file_by_saved_name"),
+        "limit": sample("file_server_rate_limit_duration_seconds_count", result="allowed"),
+        "new": sample("file_server_uploads_total", result="new"),
+        "duplicate": sample("file_server_uploads_total", result="duplicate"),
+    }
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for _ in range(2):
+            response = await ac.post("/upload/", headers=headers, files={"file": ("m.png", content, "image/png")})
+        response = await ac.get(response.json()["url"], headers=headers)
+        assert response.content == content
+        assert (await ac.get("/no/such/path/here")).status_code == 404
+
+        scraped = await ac.get("/metrics")
+        assert scraped.status_code == 200 and scraped.headers["content-type"].startswith("text/plain")
+
+    assert sample("http_request_duration_seconds_count", method="POST", route="/upload/", status="200") == before["upload"] + 2
+    assert sample("http_request_duration_seconds_count", method="GET", route=route, status="200") == before["download"] + 1
+    assert sample("http_request_bytes_total", route="/upload/") >= before["uploaded"] + 2 * len(content)
+    assert sample("http_response_bytes_total", route=route) == before["downloaded"] + len(content)
+    assert sample("file_server_stage_duration_seconds_count", stage="encrypt") == before["encrypt"] + 2
+    assert sample("file_server_stage_duration_seconds_count", stage="decrypt") == before["decrypt"] + 1
+    assert sample("file_server_stage_duration_seconds_count", stage="commit") == before["commit"] + 1
+    assert sample("file_server_db_duration_seconds_count", operation="get_file_by_saved_name") == before["db"] + 1
+    assert sample("file_server_rate_limit_duration_seconds_count", result="allowed") >= before["limit"] + 3
+    assert sample("file_server_uploads_total", result="new") == before["new"] + 1
+    assert sample("file_server_uploads_total", result="duplicate") == before["duplicate"] + 1
+    assert sample("file_server_uploads_in_progress", kind="stream") == 0
+    assert 0 < sample("file_server_dedup_hit_ratio") < 1
+
+    text = scraped.text
+    assert 'http_request_duration_seconds_bucket{le="0.001",method="POST",route="/upload/",status="200"}' in text
+    assert 'route="<unmatched>"' in text
+    assert "file_server_dedup_hit_ratio" in text
+
+
+@pytest.mark.asyncio
+async def test_server_timing(monkeypatch, tmp_path, caplog):
+    """Server-Timing: auth, rate limit, DB va yuklash bosqichlari; JSON log; sekin so'rov profili"""
+    import json
+    import logging
+    from app.core.config import get_settings
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    settings = get_settings()
+    monkeypatch.setattr(settings, "profile_sample_rate", 1.0)
+    monkeypatch.setattr(settings, "profile_threshold_ms", 0)
+    monkeypatch.setattr(settings, "profile_interval_ms", 1)
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "server_timing_enabled", True)
+    monkeypatch.setattr(settings, "request_log_threshold_ms", 0)
+
+    def spans(response):
+        return {entry.split(";")[0].strip() for entry in response.headers["server-timing"].split(",")}
+
+    logger = logging.getLogger("app.timing")
+    monkeypatch.setattr(logger, "propagate", True)
+    with caplog.at_level(logging.INFO, logger="app.timing"):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            response = await ac.post("/upload/", headers=headers, files={"file": ("t.png", os.urandom(300_000), "image/png")})
+            assert response.status_code == 200
+            assert {"auth", "rate_limit", "receive", "hash", "encrypt", "write", "commit",
+                    "db.add_file_reference", "db.dedup_lookup", "db.insert", "audit", "app"} <= spans(response)
+
+            response = await ac.get("/files", headers=headers)
+            assert {"auth", "rate_limit", "db.get_files", "app"} <= spans(response)
+
+            monkeypatch.setattr(settings, "server_timing_enabled", False)
+            assert "server-timing" not in (await ac.get("/files", headers=headers)).headers
+            assert "server-timing" not in (await ac.get("/files")).headers
+
+    records = [json.loads(record.getMessage()) for record in caplog.records if record.name == "app.timing"]
+    upload = next(record for record in records if record["route"] == "/upload/")
+    assert upload["method"] == "POST" and upload["status"] == 200
+    # DB vaqti faqat ORM qismlari: blob faylini ko'chirish (commit) kirmaydi
+    db_ms = upload["spans_ms"]
+    assert db_ms["db.add_file_reference"] == pytest.approx(db_ms["db.dedup_lookup"] + db_ms["db.insert"], abs=0.02)
+    assert upload["spans_ms"]["encrypt"] >= 0 and upload["duration_ms"] > 0
+    assert os.path.exists(upload["profile"]) and upload["profile"].endswith(".folded")
+    assert any(path.suffix == ".folded" for path in tmp_path.iterdir())
+    # Header o'chirilganda ham log yoziladi
+    assert any(record["route"] == "/files" and record["status"] == 403 for record in records)
+
+
+@pytest.mark.asyncio
+async def test_batch_operations():
+    """Ommaviy yuklash, yangilash va o'chirish: har bir element uchun natija, bloblar to'g'ri hisoblanadi"""
+    from app.models.file import Blob, File as FileModel
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    existing, fresh = os.urandom(500), os.urandom(700)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        existing_url = (await ac.post(
+            "/upload/", headers=headers, files={"file": ("existing.txt", existing, "text/plain")}
+        )).json()["url"]
+
+        response = await ac.post("/upload/batch", headers=headers, files=[
+            ("files", ("a.txt", fresh, "text/plain")),
+            ("files", ("b.txt", fresh, "text/plain")),  # partiya ichidagi dublikat
+            ("files", ("c.txt", existing, "text/plain")),  # mavjud blob
+            ("files", ("d.exe", b"MZ", "application/x-msdownload")),  # rad etiladi
+        ])
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["uploaded"], body["duplicates"], body["failed"]) == (1, 2, 1)
+        a, b, c, d = body["results"]
+        assert a["message"] == "File uploaded successfully" and b["message"] == "File already exists"
+        assert a["url"] == b["url"] and c["url"] == existing_url
+        assert d["status_code"] == 400 and "error" in d
+
+        fresh_blob = await Blob.get(hash_code=hashlib.sha256(fresh).hexdigest())
+        existing_blob = await Blob.get(hash_code=hashlib.sha256(existing).hexdigest())
+        assert fresh_blob.ref_count == 2 and existing_blob.ref_count == 2
+        assert (await ac.get(a["url"], headers=headers)).content == fresh
+        assert await FileModel.all().count() == 4
+
+        ids = sorted(await FileModel.all().values_list("id", flat=True))
+        response = await ac.post("/files/batch/update", headers=headers, json={
+            "ids": ids[:2] + [999], "update": {"public": False}
+        })
+        body = response.json()
+        assert body["updated"] == 2 and body["failed"] == 1
+        assert body["results"][-1] == {"file_id": 999, "error": "File not found"}
+        assert await FileModel.filter(public=False).count() == 2
+
+        response = await ac.post("/files/batch/update", headers=headers, json={
+            "filter": {"public": False, "search": "existing"}, "update": {"name": "renamed.txt"}
+        })
+        assert [item["file_id"] for item in response.json()["results"]] == [ids[0]]
+        assert (await FileModel.get(id=ids[0])).name == "renamed.txt"
+        for bad in ({"update": {"public": True}}, {"ids": [1], "filter": {"public": True}, "update": {}},
+                    {"filter": {}, "update": {"public": True}}):
+            assert (await ac.post("/files/batch/update", headers=headers, json=bad)).status_code == 422
+
+        # Yangi blobga ikkala ishora ham o'chirilsa fizik fayl o'chadi, mavjud blobda bittasi qoladi
+        fresh_ids = await FileModel.filter(hash_code=fresh_blob.hash_code).values_list("id", flat=True)
+        existing_ids = await FileModel.filter(hash_code=existing_blob.hash_code).order_by("id").values_list("id", flat=True)
+        response = await ac.post("/files/batch/delete", headers=headers, json={
+            "ids": list(fresh_ids) + [existing_ids[1], 999]
+        })
+        body = response.json()
+        assert body["deleted"] == 3 and body["failed"] == 1
+        assert body["results"][-1] == {"file_id": 999, "error": "File not found"}
+        assert not await Blob.exists(hash_code=fresh_blob.hash_code) and not os.path.exists(fresh_blob.path)
+        assert (await Blob.get(hash_code=existing_blob.hash_code)).ref_count == 1
+        assert (await ac.get(existing_url, headers=headers)).content == existing
+
+@pytest.mark.asyncio
+async def test_download_archive():
+    """ID lar yoki sana bo'yicha ZIP arxiv: tarkib decrypt qilingan, bir xil nomlar ajratiladi"""
+    import io
+    import shutil
+    import zipfile
+    from app.models.file import File as FileModel
+    from app.routers.file import UPLOAD_FOLDER
+    from app.utils.security import encrypt_file
+
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    text = b"line of text\n" * 20000
+    image = os.urandom(200_000)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for name, content, content_type in (
+            ("notes.txt", text, "text/plain"), ("logo.png", image, "image/png"), ("notes.txt", b"other", "text/plain")
+        ):
+            await ac.post("/upload/", headers=headers, files={"file": (name, content, content_type)})
+        ids = list(await FileModel.all().order_by("id").values_list("id", flat=True))
+
+        response = await ac.get("/files/archive", headers=headers, params={"ids": ids + [999]})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert archive.testzip() is None
+        assert archive.namelist() == ["notes.txt", "logo.png", "notes (2).txt"]
+        assert archive.read("notes.txt") == text and archive.read("logo.png") == image
+        assert archive.read("notes (2).txt") == b"other"
+        # Matn siqiladi, rasm o'zgarishsiz yoziladi
+        assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("logo.png").compress_type == zipfile.ZIP_STORED
+
+        # Sana bo'yicha: shu kunning yozuvlari va papkadagi yozuvsiz eski fayllar
+        date = (await ac.get(f"/files/{ids[0]}", headers=headers)).json()["url"].split("/")[1]
+        response = await ac.get("/files/archive", headers=headers, params={"date": date})
+        assert response.status_code == 200
+        names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+        assert {"notes.txt", "logo.png", "notes (2).txt"} <= set(names)
+
+        legacy_folder = os.path.join(UPLOAD_FOLDER, "1999-12-31")
+        os.makedirs(legacy_folder, exist_ok=True)
+        try:
+            with open(os.path.join(legacy_folder, "19991231000000000000_old.txt"), "wb") as f:
+                f.write(encrypt_file(b"legacy content"))
+            response = await ac.get("/files/archive", headers=headers, params={"date": "1999-12-31"})
+            archive = zipfile.ZipFile(io.BytesIO(response.content))
+            assert archive.read("19991231000000000000_old.txt") == b"legacy content"
+        finally:
+            shutil.rmtree(legacy_folder)
+
+        assert (await ac.get("/files/archive", headers=headers)).status_code == 400
+        assert (await ac.get("/files/archive", headers=headers, params={"date": "../etc"})).status_code == 422
+        assert (await ac.get("/files/archive", headers=headers, params={"ids": [999]})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_stream_zip_memory_is_bounded(tmp_path):
+    """Arxiv bo'laklari segment hajmi atrofida: katta fayl ham to'liq xotiraga yig'ilmaydi"""
+    import io
+    import zipfile
+    from datetime import datetime, timezone
+    from app.utils.file import write_upload_to_temp
+    from app.utils.zip_stream import ZipMember, stream_zip
+
+    content = os.urandom(3 * 1024 * 1024)
+
+    class Upload:
+        def __init__(self):
+            self.position = 0
+
+        async def read(self, size):
+            chunk = content[self.position:self.position + size]
+            self.position += len(chunk)
+            return chunk
+
+    temp_file, _, size, _ = await write_upload_to_temp(str(tmp_path), Upload())
+    path = str(tmp_path / "blob")
+    await temp_file.commit(path)
+
+    now = datetime.now(timezone.utc)
+    members = [ZipMember("a.bin", path, size, now, "image/png"), ZipMember("b.txt", path, size, now, "text/plain")]
+    chunks = [chunk async for chunk in stream_zip(members)]
+    assert max(len(chunk) for chunk in chunks) <= 128 * 1024
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.read("a.bin") == content and archive.read("b.txt") == content
+
+
+@pytest.mark.asyncio
+async def test_peer_read_through(monkeypatch, tmp_path):
+    """Blob boshqa nodeda: ichki endpoint orqali olinadi, keshlanadi va yozuv belgilanadi"""
+    import httpx
+    from app.core.config import get_settings
+    from app.models.file import File as FileModel
+    from app.utils import peers
+    from app.utils.tokens import get_token_manager
+
+    settings = get_settings()
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = os.urandom(200_000)
+
+    # node-a: yuklash va ichki endpoint
+    monkeypatch.setattr(settings, "node_id", "node-a")
+    monkeypatch.setattr(settings, "peers", {"node-b": "http://node-b"})
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/upload/", headers=headers, files={"file": ("photo.png", content, "image/png")})
+        file_url = response.json()["url"]
+        record = await FileModel.first()
+        assert record.server == "node-a" and not record.is_used_by_other_servers
+        with open(record.path, "rb") as f:
+            stored = f.read()
+
+        internal = f"/internal/blobs/{record.hash_code}"
+        assert (await ac.get(internal, headers=headers)).status_code == 403
+        node_token = get_token_manager().issue({"sub": "node:node-b", "node": "node-b"})
+        response = await ac.get(internal, headers={"Authorization": f"Bearer {node_token}"})
+        assert response.status_code == 200 and response.content == stored
+    os.remove(record.path)
+
+    # node-b: blob diskda yo'q, node-a dan olinadi (shifrlangan baytlar)
+    requests = []
+
+    def node_a(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path != internal:
+            return httpx.Response(404)
+        return httpx.Response(200, content=stored)
+
+    monkeypatch.setattr(settings, "node_id", "node-b")
+    monkeypatch.setattr(settings, "peers", {"node-a": "http://node-a"})
+    fetcher = peers.PeerFetcher("node-b", settings.peers, str(tmp_path), 1 << 20, 5, transport=httpx.MockTransport(node_a))
+    monkeypatch.setattr(peers, "_fetcher", fetcher)
+    get_content_cache().clear()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(file_url, headers=headers)
+        assert response.status_code == 200 and response.content == content
+        response = await ac.get(file_url, headers={**headers, "Range": "bytes=100-199"})
+        assert response.status_code == 206 and response.content == content[100:200]
+        assert len(requests) == 1 and fetcher.hits >= 1
+        assert (await FileModel.get(id=record.id)).is_used_by_other_servers
+
+        # Keshdan chiqarilgan va egasiga ulanib bo'lmaydi - 502, hech bir node sozlanmagan - 404
+        def node_a_down(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("connection refused", request=request)
+
+        os.remove(fetcher.cache_path(record.hash_code))
+        get_content_cache().clear()
+        fetcher = peers.PeerFetcher("node-b", settings.peers, str(tmp_path), 1 << 20, 5, transport=httpx.MockTransport(node_a_down))
+        monkeypatch.setattr(peers, "_fetcher", fetcher)
+        assert (await ac.get(file_url, headers=headers)).status_code == 502
+        monkeypatch.setattr(settings, "peers", {})
+        assert (await ac.get(file_url, headers=headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_peer_delete_releases_blob(monkeypatch, tmp_path):
+    """Oxirgi ishora boshqa nodeda o'chirildi: uning keshi tozalanadi, egasi blobni o'chiradi"""
+    import httpx
+    from app.models.file import File as FileModel
+    from app.utils import peers
+    from app.utils.tokens import get_token_manager
+
+    settings = get_settings()
+    token = await get_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    content = os.urandom(100_000)
+
+    monkeypatch.setattr(settings, "node_id", "node-a")
+    monkeypatch.setattr(settings, "peers", {"node-b": "http://node-b"})
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/upload/", headers=headers, files={"file": ("photo.png", content, "image/png")})
+        file_url = response.json()["url"]
+    record = await FileModel.first()
+    with open(record.path, "rb") as f:
+        stored = f.read()
+    os.remove(record.path)
+    internal = f"/internal/blobs/{record.hash_code}"
+
+    # node-b: blobni node-a dan keshga oladi, keyin yozuvni o'chiradi
+    requests = []
+
+    def node_a(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        return httpx.Response(200, content=stored) if request.method == "GET" else httpx.Response(204)
+
+    monkeypatch.setattr(settings, "node_id", "node-b")
+    monkeypatch.setattr(settings, "peers", {"node-a": "http://node-a"})
+    fetcher = peers.PeerFetcher("node-b", settings.peers, str(tmp_path), 1 << 20, 5, transport=httpx.MockTransport(node_a))
+    monkeypatch.setattr(peers, "_fetcher", fetcher)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.get(file_url, headers=headers)).status_code == 200
+        assert await fetcher.cached_path(record.hash_code)
+        assert (await ac.delete(f"/files/{record.id}", headers=headers)).status_code == 200
+    assert await fetcher.cached_path(record.hash_code) is None
+    assert requests == [("GET", internal), ("DELETE", internal)]
+
+    # node-a: blob diskdan o'chiriladi; qayta yuklangan (ishorasi bor) blob qoladi
+    monkeypatch.setattr(settings, "node_id", "node-a")
+    monkeypatch.setattr(settings, "peers", {"node-b": "http://node-b"})
+    monkeypatch.setattr(peers, "_fetcher", None)
+    node_headers = {"Authorization": f"Bearer {get_token_manager().issue({'sub': 'node:node-b', 'node': 'node-b'})}"}
+    with open(record.path, "wb") as f:
+        f.write(stored)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.delete(internal, headers=headers)).status_code == 403
+        assert (await ac.delete(internal, headers=node_headers)).status_code == 204
+        assert not os.path.exists(record.path)
+
+        await ac.post("/upload/", headers=headers, files={"file": ("photo.png", content, "image/png")})
+        assert (await ac.delete(internal, headers=node_headers)).status_code == 204
+        assert os.path.exists(record.path)
+
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import pytest
+from openpyxl import load_workbook
+
+from app.utils.audit import AUDIT_COLUMNS, AuditLog
+
+
+def make_log(tmp_path, **kwargs):
+    options = {"segment_max_bytes": 1024 * 1024, "batch_size": 50, "flush_interval": 0.01}
+    options.update(kwargs)
+    return AuditLog(str(tmp_path / "audit"), **options)
+
+
+def read_lines(log):
+    return [json.loads(line) for path in log.segments() for line in open(path, encoding="utf-8")]
+
+
+@pytest.mark.asyncio
+async def test_background_writer_batches(tmp_path):
+    """Fon yozuvchi parallel yozuvlarni yo'qotmasdan to'plab yozishi"""
+    log = make_log(tmp_path)
+    await log.start()
+    await asyncio.gather(*(log.record("upload", {"name": f"f{i}.txt", "size": i}) for i in range(200)))
+    await log.stop()
+
+    records = read_lines(log)
+    assert len(records) == 200
+    assert {r["name"] for r in records} == {f"f{i}.txt" for i in range(200)}
+    assert log.batches < 200
+
+
+@pytest.mark.asyncio
+async def test_record_without_writer_and_rotation(tmp_path):
+    """Fon yozuvchisiz darhol yozish va segment aylantirish"""
+    log = make_log(tmp_path, segment_max_bytes=300)
+    for i in range(10):
+        await log.record("upload", {"name": f"f{i}.txt", "hash_code": "x" * 64})
+    assert len(log.segments()) > 1
+    assert len(read_lines(log)) == 10
+
+
+@pytest.mark.asyncio
+async def test_export_xlsx(tmp_path):
+    log = make_log(tmp_path, segment_max_bytes=300)
+    for i in range(5):
+        await log.record("upload", {"name": f"f{i}.txt", "size": i, "public": True})
+
+    output = tmp_path / "records.xlsx"
+    assert log.export_xlsx(str(output)) == 5
+
+    rows = list(load_workbook(output).active.iter_rows(values_only=True))
+    assert list(rows[0]) == AUDIT_COLUMNS
+    assert [row[AUDIT_COLUMNS.index("name")] for row in rows[1:]] == [f"f{i}.txt" for i in range(5)]
@@ -0,0 +1,32 @@
+from app.utils.content_cache import ContentCache
+
+
+def test_lru_eviction_and_budget():
+    cache = ContentCache(max_bytes=10, max_file_size=4)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"  # a - eng so'nggi ishlatilgan
+
+    cache.put("c", b"cc")
+    assert cache.size == 10 and cache.evictions == 0
+    cache.put("d", b"d")
+    # Byudjetdan oshdi: eng eski ishlatilgan (b) chiqariladi
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("d") == b"d"
+    assert cache.size == 7 and cache.evictions == 1
+
+    # Chegaradan katta fayl keshlanmaydi
+    cache.put("big", b"12345")
+    assert cache.get("big") is None
+
+    cache.invalidate("a")
+    assert cache.get("a") is None and cache.size == 3
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["hits"] == 3 and stats["misses"] == 3
+
+
+def test_disabled_cache():
+    cache = ContentCache(max_bytes=0, max_file_size=1024)
+    assert not cache.admits(1)
+    cache.put("a", b"a")
+    assert cache.get("a") is None and cache.size == 0
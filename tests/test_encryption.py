@@ -0,0 +1,167 @@
+import io
+import json
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from app.core.config import get_settings
+from app.utils import keyring
+from app.utils.encryption import SEGMENT_SIZE, TAG_SIZE, EncryptionFormatError, SegmentEncryptor, SegmentReader
+from app.utils.keyring import EncryptionKeyring, get_keyring, read_key_file, reload_keyring, rotate_key_file
+from app.utils.migrate_encryption import migrate_folder
+from app.utils.security import (
+    TOKEN_SEPARATOR, decrypt_file, encrypt_file, get_segment_cipher, new_sealer, open_encrypted
+)
+
+
+@pytest.fixture
+def key_file(tmp_path, monkeypatch):
+    """Alohida kalit fayli bilan kalit to'plami (har bir test boshida yangi worker kabi)"""
+    path = tmp_path / "keys" / "encryption.json"
+    settings = get_settings()
+    monkeypatch.setattr(settings, "encryption_keys", [])
+    monkeypatch.setattr(settings, "fernet_key", "")
+    monkeypatch.setattr(settings, "encryption_key_file", str(path))
+    monkeypatch.setattr(keyring, "_keyring", None)
+    yield path
+    monkeypatch.undo()
+    reload_keyring()
+
+
+@pytest.mark.parametrize("size", [0, 1, SEGMENT_SIZE - 1, SEGMENT_SIZE, SEGMENT_SIZE + 1, 3 * SEGMENT_SIZE + 5])
+def test_segmented_roundtrip(size):
+    """Turli hajmdagi ma'lumotni shifrlash va qayta ochish"""
+    content = os.urandom(size)
+    encrypted = encrypt_file(content)
+    assert decrypt_file(encrypted) == content
+    # Base64 yo'q: qo'shimcha joy faqat header va har bir segment uchun tag
+    segments = max(1, -(-size // SEGMENT_SIZE))
+    assert len(encrypted) - size < 64 + segments * TAG_SIZE
+
+
+def test_segmented_random_access():
+    """Istalgan oraliqni faqat kerakli segmentlarni o'qib olish"""
+    content = os.urandom(5 * SEGMENT_SIZE + 123)
+    reader = open_encrypted(io.BytesIO(encrypt_file(content)))
+    assert reader.size == len(content)
+    for start, end in [(0, 10), (SEGMENT_SIZE - 3, SEGMENT_SIZE + 3), (2 * SEGMENT_SIZE, 4 * SEGMENT_SIZE + 1), (len(content) - 5, len(content))]:
+        assert b"".join(reader.iter_range(start, end)) == content[start:end]
+
+
+def test_segmented_truncation_detected():
+    """Oxirgi segment kesib tashlansa xato berilishi"""
+    encrypted = encrypt_file(os.urandom(2 * SEGMENT_SIZE + 10))
+    truncated = encrypted[:-(10 + TAG_SIZE)]
+    with pytest.raises(InvalidTag):
+        b"".join(SegmentReader(io.BytesIO(truncated), get_segment_cipher, file_size=len(truncated)))
+
+
+def test_unknown_key_id_rejected():
+    encrypted = bytearray(encrypt_file(b"data"))
+    encrypted[6] ^= 0x01  # key id ning birinchi belgisi
+    with pytest.raises(EncryptionFormatError):
+        open_encrypted(io.BytesIO(bytes(encrypted)))
+
+
+def test_legacy_fernet_still_readable():
+    """Eski Fernet (bitta va bo'laklangan token) fayllarni o'qish"""
+    content = b"legacy content" * 1000
+    cipher_suite = get_keyring().fernet
+    assert decrypt_file(cipher_suite.encrypt(content)) == content
+    chunked = b"".join(cipher_suite.encrypt(content[i:i + 4096]) + TOKEN_SEPARATOR for i in range(0, len(content), 4096))
+    assert decrypt_file(chunked) == content
+
+
+def test_migrate_folder(tmp_path):
+    """Migratsiya eski fayllarni yangi formatga o'tkazishi va yangilarini tashlab ketishi"""
+    day = tmp_path / "2025-11-03"
+    day.mkdir()
+    legacy_content = os.urandom(100_000)
+    (day / "legacy").write_bytes(get_keyring().fernet.encrypt(legacy_content))
+    (day / "current").write_bytes(encrypt_file(b"already migrated"))
+
+    assert migrate_folder(str(tmp_path), dry_run=True) == {"migrated": 1, "skipped": 1, "failed": 0}
+    assert migrate_folder(str(tmp_path)) == {"migrated": 1, "skipped": 1, "failed": 0}
+    assert decrypt_file((day / "legacy").read_bytes()) == legacy_content
+    assert migrate_folder(str(tmp_path)) == {"migrated": 0, "skipped": 2, "failed": 0}
+
+
+def test_sealer_matches_stream_encryptor_in_any_order():
+    """Segmentlarni istalgan tartibda muhrlash oqim bilan shifrlangan natijaga teng"""
+    content = os.urandom(3 * SEGMENT_SIZE + 123)
+    sealer = new_sealer(len(content), SEGMENT_SIZE)
+    out = io.BytesIO()
+    out.write(sealer.header)
+    for index in reversed(range(sealer.segment_count)):
+        out.seek(sealer.segment_offset(index))
+        out.write(sealer.seal(index, content[index * SEGMENT_SIZE:(index + 1) * SEGMENT_SIZE]))
+    assert b"".join(open_encrypted(out)) == content
+
+    # Qayta yaratilgan sealer (boshqa so'rov yoki worker) aynan shu baytlarni beradi
+    again = new_sealer(len(content), SEGMENT_SIZE, sealer.nonce_prefix)
+    assert again.header == sealer.header
+    assert again.seal(1, content[SEGMENT_SIZE:2 * SEGMENT_SIZE]) == sealer.seal(1, content[SEGMENT_SIZE:2 * SEGMENT_SIZE])
+
+    with pytest.raises(ValueError):
+        sealer.seal(0, b"short")
+
+    empty = new_sealer(0, SEGMENT_SIZE)
+    assert b"".join(open_encrypted(io.BytesIO(empty.header + empty.seal(0, b"")))) == b""
+
+
+def test_key_file_shared_by_workers(key_file):
+    """Kalit fayli bir marta yaratiladi; boshqa worker (va qayta ishga tushish) shu kalitni o'qiydi"""
+    encrypted = encrypt_file(b"shared")
+    assert key_file.exists()
+    keyring._keyring = None
+    assert decrypt_file(encrypted) == b"shared"
+    assert len(json.loads(key_file.read_text())["keys"]) == 1
+
+
+def test_key_file_adopts_legacy_location(key_file, tmp_path, monkeypatch):
+    """Yangi joyda kalit fayli yo'q, eski joyda bor - kalitlar ko'chiriladi, eski fayllar o'qiladi"""
+    legacy = tmp_path / "legacy" / "encryption.json"
+    keyring.create_key_file(str(legacy))
+    monkeypatch.setattr(keyring, "LEGACY_KEY_FILE", str(legacy))
+    assert reload_keyring().secrets == read_key_file(str(legacy))
+    assert read_key_file(str(key_file)) == read_key_file(str(legacy))
+
+
+def test_key_rotation_and_reencryption(key_file, tmp_path, monkeypatch):
+    """Rotatsiyadan keyin eski fayllar o'qiladi, yangilari yangi kalit bilan; migratsiya qayta shifrlaydi"""
+    blobs = tmp_path / "blobs"
+    blobs.mkdir()
+    content = os.urandom(2 * SEGMENT_SIZE + 7)
+    (blobs / "old").write_bytes(encrypt_file(content))
+    (blobs / "legacy").write_bytes(get_keyring().fernet.encrypt(b"legacy"))
+    old_key_id = get_keyring().active_key_id
+
+    # Rotatsiya boshqa workerda: bu worker eski kalitni qayta tekshiruv oralig'igacha ishlatadi
+    new_key_id = rotate_key_file(str(key_file))
+    assert get_keyring().active_key_id == old_key_id
+    monkeypatch.setattr(get_settings(), "encryption_key_reload_seconds", 0)
+    assert get_keyring().active_key_id == new_key_id != old_key_id
+    assert open_encrypted(io.BytesIO(encrypt_file(b"new"))).key_id == new_key_id
+    assert decrypt_file((blobs / "old").read_bytes()) == content
+
+    assert migrate_folder(str(blobs)) == {"migrated": 2, "skipped": 0, "failed": 0}
+    assert open_encrypted(io.BytesIO((blobs / "old").read_bytes())).key_id == new_key_id
+    assert migrate_folder(str(blobs), dry_run=True) == {"migrated": 0, "skipped": 2, "failed": 0}
+
+    # Qayta shifrlangandan keyin eski kalitni olib tashlash mumkin
+    key_file.write_text(json.dumps({"keys": json.loads(key_file.read_text())["keys"][:1]}))
+    reload_keyring()
+    assert old_key_id not in get_keyring().ciphers
+    assert decrypt_file((blobs / "old").read_bytes()) == content
+    assert decrypt_file((blobs / "legacy").read_bytes()) == b"legacy"
+
+
+def test_unknown_key_id_reloads_keyring(key_file):
+    """Boshqa workerda rotatsiya qilingan kalit bilan yozilgan fayl darhol o'qiladi"""
+    reload_keyring()
+    rotate_key_file(str(key_file))
+    other_worker = EncryptionKeyring(read_key_file(str(key_file)))
+    encryptor = SegmentEncryptor(other_worker.active_cipher, other_worker.active_key_id)
+    encrypted = encryptor.update(b"rotated") + encryptor.finalize()
+    assert decrypt_file(encrypted) == b"rotated"
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.utils.executor import BoundedExecutor
+
+
+@pytest.mark.asyncio
+async def test_executor_runs_off_loop_thread():
+    """Ish event loop threadidan tashqarida bajarilishi"""
+    executor = BoundedExecutor(max_workers=2, max_queue=4)
+    try:
+        thread_name = await executor.run(lambda: threading.current_thread().name)
+        assert thread_name.startswith("cpu")
+        assert executor.stats()["completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_executor_inline_mode():
+    """workers=0 bo'lsa ish joyida bajariladi"""
+    executor = BoundedExecutor(max_workers=0, max_queue=0)
+    assert await executor.run(lambda x: x * 2, 21) == 42
+    assert threading.current_thread() is threading.main_thread()
+
+
+@pytest.mark.asyncio
+async def test_executor_queue_is_bounded():
+    """Navbat chegarasidan ortiq ishlar hovuzga yuborilmaydi"""
+    executor = BoundedExecutor(max_workers=1, max_queue=2)
+    release = threading.Event()
+    try:
+        tasks = [asyncio.create_task(executor.run(release.wait)) for _ in range(6)]
+        await asyncio.sleep(0.05)
+        stats = executor.stats()
+        assert stats["active"] == 1
+        assert stats["queue_depth"] == 2
+        release.set()
+        await asyncio.gather(*tasks)
+        stats = executor.stats()
+        assert stats["completed"] == 6
+        assert stats["max_queue_depth"] <= 3
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_executor_iterate():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    try:
+        assert [item async for item in executor.iterate(iter(range(5)))] == [0, 1, 2, 3, 4]
+    finally:
+        executor.shutdown()
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import tempfile
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import Headers, UploadFile
+
+from app.utils import file as file_utils
+from app.utils.compression import accepts_encoding
+from app.utils.file import write_upload_to_temp, iter_content_range
+from app.utils.security import decrypt_file
+
+
+def make_upload(content: bytes, content_type: str = None) -> UploadFile:
+    spooled = tempfile.SpooledTemporaryFile()
+    spooled.write(content)
+    spooled.seek(0)
+    headers = Headers({"content-type": content_type}) if content_type else None
+    return UploadFile(file=spooled, filename="test.txt", headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_streamed_upload_roundtrip(tmp_path):
+    """Bo'laklab yozilgan fayl to'g'ri hash va tarkibga ega bo'lishi"""
+    content = os.urandom(200 * 1024 + 17)
+    temp_file, hash_code, size, codec = await write_upload_to_temp(str(tmp_path), make_upload(content), chunk_size=64 * 1024)
+    temp_path = temp_file.path
+
+    assert hash_code == hashlib.sha256(content).hexdigest()
+    assert size == len(content)
+    assert codec == "identity"
+
+    file_path = str(tmp_path / "blob")
+    await temp_file.commit(file_path)
+    assert not os.path.exists(temp_path)
+    with open(file_path, "rb") as f:
+        assert decrypt_file(f.read()) == content
+
+
+@pytest.mark.asyncio
+async def test_compressed_upload_ranges(tmp_path):
+    """Siqilgan fayl: hash va hajm asl tarkibniki, istalgan oraliq to'g'ri ochiladi"""
+    content = b"".join(b"%08d compressible row\n" % i for i in range(40000))
+    temp_file, hash_code, size, codec = await write_upload_to_temp(
+        str(tmp_path), make_upload(content, "text/plain"), chunk_size=64 * 1024
+    )
+    assert codec == "gzip"
+    assert hash_code == hashlib.sha256(content).hexdigest() and size == len(content)
+    path = str(tmp_path / "blob")
+    await temp_file.commit(path)
+    assert os.path.getsize(path) < len(content) // 4
+
+    for start, end in ((0, None), (0, 10), (123456, 654321), (len(content) - 5, None), (10, 10)):
+        data = b"".join([chunk async for chunk in iter_content_range(path, codec, start, end)])
+        assert data == content[start:end]
+
+
+def test_accepts_encoding():
+    assert accepts_encoding("gzip, deflate, br", "gzip")
+    assert accepts_encoding("br;q=1.0, *;q=0.5", "zstd")
+    assert not accepts_encoding("gzip;q=0", "gzip")
+    assert not accepts_encoding("gzip;q=0, *", "gzip")
+    assert not accepts_encoding("br", "gzip")
+    assert not accepts_encoding(None, "gzip")
+    assert not accepts_encoding("*", "identity")
+
+
+@pytest.mark.asyncio
+async def test_streamed_upload_size_limit_removes_temp(tmp_path, monkeypatch):
+    """Hajm cheklovi oshganda vaqtinchalik fayl o'chirilishi"""
+    monkeypatch.setattr(file_utils, "MAX_FILE_SIZE", 1024)
+    with pytest.raises(HTTPException) as exc:
+        await write_upload_to_temp(str(tmp_path), make_upload(b"0" * 4096), chunk_size=512)
+    assert exc.value.status_code == 400
+    assert os.listdir(tmp_path) == []
+
+
+def test_blob_path_and_url():
+    """Blob joylashuvi hash bo'yicha bo'linadi, URL sanasi saqlash nomidan olinadi"""
+    hash_code = "abcdef" + "0" * 58
+    assert file_utils.blob_path("blobs", hash_code) == os.path.join("blobs", "ab", "cd", hash_code)
+
+    saved_name = "20250102030405123456_abc"
+    assert file_utils.build_file_url(saved_name, os.path.join("blobs", "ab", "cd", hash_code)) == f"/2025-01-02/{saved_name}"
+    assert file_utils.build_file_url("legacy.txt", os.path.join("uploads", "2024-05-06", "legacy.txt")) == "/2024-05-06/legacy.txt"
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+from app.utils.http_cache import cache_control, etag_matches, http_date, is_not_modified
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+
+
+def test_is_not_modified():
+    modified = datetime(2025, 11, 3, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    etag = '"abc"'
+    assert not is_not_modified(None, None, etag, modified)
+    assert is_not_modified(None, http_date(modified), etag, modified)
+    assert not is_not_modified(None, "Mon, 03 Nov 2025 11:59:59 GMT", etag, modified)
+    assert not is_not_modified(None, "not a date", etag, modified)
+    # If-None-Match ustunlik qiladi
+    assert not is_not_modified('"x"', http_date(modified), etag, modified)
+
+
+def test_cache_control():
+    assert cache_control(True, 60) == "private, max-age=60, immutable"
+    assert cache_control(False, 60) == "private, no-cache"
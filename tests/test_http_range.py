@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.http_cache import http_date
+from app.utils.http_range import MAX_RANGES, RangeNotSatisfiable, if_range_matches, parse_range_header
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, None),
+    ("bytes=0-99", [(0, 100)]),
+    ("bytes=100-", [(100, 1000)]),
+    ("bytes=-100", [(900, 1000)]),
+    ("bytes=-5000", [(0, 1000)]),
+    ("bytes=990-5000", [(990, 1000)]),
+    ("bytes=0-0, 10-19", [(0, 1), (10, 20)]),
+    ("bytes=0-9,2000-3000", [(0, 10)]),
+    ("items=0-9", None),
+    ("bytes=abc", None),
+    ("bytes=9-0", None),
+    ("bytes=" + ",".join(["0-1"] * (MAX_RANGES + 1)), None),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+def test_parse_range_not_satisfiable():
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=1000-", 1000)
+
+
+def test_if_range_matches():
+    modified = datetime(2025, 11, 3, 12, 0, 0, 123456, tzinfo=timezone.utc)
+    assert if_range_matches(None, '"abc"', modified)
+    assert if_range_matches('"abc"', '"abc"', modified)
+    assert not if_range_matches('W/"abc"', '"abc"', modified)
+    assert not if_range_matches('"other"', '"abc"', modified)
+    assert if_range_matches(http_date(modified), '"abc"', modified)
+    assert not if_range_matches("Mon, 03 Nov 2025 11:00:00 GMT", '"abc"', modified)
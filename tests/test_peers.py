@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+import pytest
+from jose import jwt
+
+from app.utils.peers import PeerFetcher, PeerUnavailable
+
+BLOBS = {"a" * 64: b"x" * 100, "b" * 64: b"y" * 100}
+
+
+class FakePeer:
+    """Boshqa node ning ``/internal/blobs/{hash}`` endpointi"""
+
+    def __init__(self, blobs, fail=False):
+        self.blobs = blobs
+        self.fail = fail
+        self.requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.fail:
+            raise httpx.ConnectError("connection refused", request=request)
+        await asyncio.sleep(0.01)
+        data = self.blobs.get(request.url.path.rsplit("/", 1)[-1])
+        if data is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=data)
+
+
+def make_fetcher(tmp_path, handlers, max_bytes=1024):
+    """node-c: har bir boshqa node o'z handleri bilan"""
+    def route(request):
+        return handlers[request.url.host](request)
+
+    peers = {name: f"http://{name}" for name in handlers}
+    return PeerFetcher("node-c", peers, str(tmp_path), max_bytes, 5, transport=httpx.MockTransport(route))
+
+
+@pytest.mark.asyncio
+async def test_fetch_is_cached_and_shared(tmp_path):
+    peer = FakePeer(BLOBS)
+    fetcher = make_fetcher(tmp_path, {"node-a": peer})
+    hash_code = "a" * 64
+
+    # Bir vaqtdagi so'rovlar bitta yuklashni kutadi
+    paths = await asyncio.gather(*(fetcher.fetch(hash_code, ["node-a"]) for _ in range(5)))
+    assert len(set(paths)) == 1 and len(peer.requests) == 1
+    with open(paths[0], "rb") as f:
+        assert f.read() == BLOBS[hash_code]
+    assert await fetcher.cached_path(hash_code) == paths[0]
+
+    claims = jwt.get_unverified_claims(peer.requests[0].headers["Authorization"].split()[1])
+    assert claims["node"] == "node-c"
+    assert fetcher.stats()["fetches"] == 1 and fetcher.stats()["fetched_bytes"] == 100
+
+
+@pytest.mark.asyncio
+async def test_fetch_candidates_and_errors(tmp_path):
+    down, empty, owner = FakePeer(BLOBS, fail=True), FakePeer({}), FakePeer(BLOBS)
+    fetcher = make_fetcher(tmp_path, {"node-down": down, "node-empty": empty, "node-a": owner})
+    hash_code = "a" * 64
+
+    # O'zi va noma'lum nodelar tashlab ketiladi, ishlamaydigan nodedan keyin keyingisi sinaladi
+    servers = ["node-c", "unknown", "node-down", "node-empty", "node-a"]
+    assert await fetcher.fetch(hash_code, servers) is not None
+    assert [len(peer.requests) for peer in (down, empty, owner)] == [1, 1, 1]
+    assert fetcher.errors == 1
+
+    # Hech kimda yo'q - None; ulanib bo'lmadi - PeerUnavailable
+    assert await fetcher.fetch("c" * 64, ["node-empty", "node-a"]) is None
+    with pytest.raises(PeerUnavailable):
+        await fetcher.fetch("c" * 64, ["node-empty", "node-down"])
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used(tmp_path):
+    fetcher = make_fetcher(tmp_path, {"node-a": FakePeer({**BLOBS, "c" * 64: b"z" * 100})}, max_bytes=250)
+    first, second, third = "a" * 64, "b" * 64, "c" * 64
+
+    await fetcher.fetch(first, ["node-a"])
+    await asyncio.sleep(0.02)
+    await fetcher.fetch(second, ["node-a"])
+    await asyncio.sleep(0.02)
+    # Birinchisi ishlatildi: endi eng eskisi ikkinchisi
+    assert await fetcher.cached_path(first)
+    await fetcher.fetch(third, ["node-a"])
+
+    assert fetcher.evictions == 1
+    assert await fetcher.cached_path(second) is None
+    assert await fetcher.cached_path(first) and await fetcher.cached_path(third)
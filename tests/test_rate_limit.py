@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi_limiter import FastAPILimiter
+from redis import asyncio as aioredis
+
+from app.utils import rate_limit
+from app.utils.metrics import RATE_LIMIT_FALLBACKS
+from app.utils.rate_limit import HybridBackend, LocalLimiter, RedisBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_local_token_bucket(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    limiter = LocalLimiter()
+
+    # 3 ta so'rov / 1000ms: 3 tasi darhol, keyingisi token to'lguncha (~334ms) rad etiladi
+    assert [limiter.check("k", 3, 1000) for _ in range(3)] == [0, 0, 0]
+    assert 300 < limiter.check("k", 3, 1000) <= 334
+    assert limiter.check("other", 3, 1000) == 0
+
+    clock.now += 0.34
+    assert limiter.check("k", 3, 1000) == 0
+    assert limiter.check("k", 3, 1000) > 0
+
+    # To'lgan bucket lar o'chiriladi
+    clock.now += 1
+    limiter.sweep()
+    assert len(limiter) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_batches_concurrent_checks(setup_redis):
+    backend = RedisBackend(LocalLimiter(), retry_seconds=5)
+    key = "fastapi-limiter:test:batch"
+
+    results = await asyncio.gather(*(backend.check(key, 5, 60000) for _ in range(20)))
+
+    # Limit fastapi_limiter niki bilan bir xil: oynada 5 ta, qolganlari pttl bilan rad etiladi
+    assert results.count(0) == 5
+    assert all(0 < result <= 60000 for result in results if result)
+    assert await setup_redis.get(key) == "5"
+    # Birinchisi yolg'iz EVALSHA, qolganlari pipeline larda
+    assert backend.batches >= 1
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_falls_back_to_local(monkeypatch):
+    unreachable = aioredis.from_url("redis://localhost:1", socket_connect_timeout=0.2)
+    monkeypatch.setattr(FastAPILimiter, "redis", unreachable)
+    backend = RedisBackend(LocalLimiter(), retry_seconds=5)
+    before = RATE_LIMIT_FALLBACKS._value.get()
+
+    results = [await backend.check("fastapi-limiter:test:down", 2, 60000) for _ in range(3)]
+
+    assert results[:2] == [0, 0] and results[2] > 0
+    assert backend.down.active()
+    assert RATE_LIMIT_FALLBACKS._value.get() == before + 3
+    await unreachable.close()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_backend_shares_limit_across_workers(setup_redis):
+    key = "fastapi-limiter:test:hybrid"
+    # Ikki worker, har biri o'z lokal bucket i bilan
+    workers = [HybridBackend(LocalLimiter(), sync_interval=3600, retry_seconds=5) for _ in range(2)]
+
+    for worker in workers:
+        assert [await worker.check(key, 10, 60000) for _ in range(6)] == [0] * 6
+    for worker in workers:
+        await worker.sync()
+
+    # Umumiy hisob 12 > 10: ikkinchi worker sinxronda bilib oladi va oyna oxirigacha rad etadi
+    assert await setup_redis.get(key) == "12"
+    assert 0 < await workers[1].check(key, 10, 60000) <= 60000
+    # Birinchisi oshgan hisobni keyingi sinxronda ko'radi (oshish - bitta sinxron oralig'idagi so'rovlar)
+    assert await workers[0].check(key, 10, 60000) == 0
+    await workers[0].sync()
+    assert 0 < await workers[0].check(key, 10, 60000) <= 60000
@@ -0,0 +1,79 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core.config import get_settings
+from app.utils import storage
+from app.utils.storage import FsyncBatcher
+
+
+@pytest.fixture
+def fsync_policy(monkeypatch):
+    def set_policy(policy):
+        monkeypatch.setattr(get_settings(), "fsync_policy", policy)
+    return set_policy
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", ["none", "per-file", "batched"])
+async def test_temp_file_commit(tmp_path, fsync_policy, policy):
+    """Vaqtinchalik fayl har bir fsync siyosatida atomik ravishda joyiga qo'yilishi"""
+    fsync_policy(policy)
+    folder = tmp_path / "2025-11-03"
+    temp = await storage.create_temp_file(str(folder))
+    assert os.path.basename(temp.path).startswith(".")
+    await temp.write(b"hello ")
+    await temp.write(b"world")
+
+    final_path = str(folder / "final")
+    await temp.commit(final_path)
+    assert temp.path == final_path
+    assert os.listdir(folder) == ["final"]
+
+    async with await storage.open_read(final_path) as f:
+        assert f.size == 11
+        assert await f.read_at(6, 5) == b"world"
+
+
+@pytest.mark.asyncio
+async def test_temp_file_discard(tmp_path):
+    temp = await storage.create_temp_file(str(tmp_path))
+    await temp.write(b"data")
+    await temp.discard()
+    assert os.listdir(tmp_path) == []
+    assert not await storage.remove_file(temp.path)
+
+
+@pytest.mark.asyncio
+async def test_fsync_batcher_groups_requests(tmp_path):
+    """Bir vaqtda kelgan fsync lar bitta guruhda bajarilishi"""
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"f{i}"
+        path.write_bytes(b"x")
+        paths.append(str(path))
+
+    batcher = FsyncBatcher(interval=0.01)
+    await asyncio.gather(*(batcher.sync(path) for path in paths))
+    assert batcher.synced == 5
+    assert batcher.batches == 1
+
+    # Keyingi so'rov yangi guruhda
+    await batcher.sync(str(tmp_path))
+    assert batcher.batches == 2
+
+
+@pytest.mark.asyncio
+async def test_write_at_parallel_then_commit(tmp_path):
+    """Bir faylning turli joylariga parallel yozish va keyin qayta ochib joyiga qo'yish"""
+    temp = await storage.create_temp_file(str(tmp_path))
+    await temp.close()
+    parts = [bytes([i]) * 1000 for i in range(5)]
+    await asyncio.gather(*(storage.write_at(temp.path, i * 1000, part) for i, part in reversed(list(enumerate(parts)))))
+
+    reopened = await storage.reopen_temp_file(temp.path)
+    final_path = str(tmp_path / "final")
+    await reopened.commit(final_path)
+    with open(final_path, "rb") as f:
+        assert f.read() == b"".join(parts)
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+from app.utils.tokens import Keyring, TokenManager
+
+
+def make_manager(keyring: Keyring, **kwargs) -> TokenManager:
+    options = {"expire_seconds": 3600, "cache_size": 2, "cache_ttl": 30, **kwargs}
+    return TokenManager(keyring, **options)
+
+
+@pytest.mark.asyncio
+async def test_token_claims_and_cache(monkeypatch):
+    manager = make_manager(Keyring({"k1": "secret-1"}, "k1"))
+    token = manager.issue({"sub": "alice"})
+
+    assert jwt.get_unverified_header(token)["kid"] == "k1"
+    claims = await manager.verify(token)
+    assert claims["sub"] == "alice" and claims["exp"] - claims["iat"] == 3600 and claims["jti"]
+
+    # Takroriy so'rov imzo tekshiruvisiz keshdan
+    def fail(token):
+        raise AssertionError("signature verified again")
+
+    monkeypatch.setattr(manager.keyring, "verify", fail)
+    assert await manager.verify(token) == claims
+    assert manager.stats()["hits"] == 1 and manager.stats()["misses"] == 1
+
+    # LRU: hajmdan oshganda eng eskisi chiqariladi
+    monkeypatch.undo()
+    others = [manager.issue({"sub": name}) for name in ("bob", "carol")]
+    for other in others:
+        await manager.verify(other)
+    assert manager.stats()["entries"] == 2
+    await manager.verify(token)
+    assert manager.stats()["misses"] == 4
+
+
+@pytest.mark.asyncio
+async def test_expired_and_unknown_tokens():
+    keyring = Keyring({"k1": "secret-1"}, "k1")
+    manager = make_manager(keyring, expire_seconds=-10)
+    with pytest.raises(JWTError):
+        await manager.verify(manager.issue({"sub": "alice"}))
+
+    # exp siz (eski) token va noma'lum kid rad etiladi
+    legacy = jwt.encode({"sub": "alice"}, "secret-1", algorithm="HS256", headers={"kid": "k1"})
+    foreign = jwt.encode({"sub": "alice", "exp": time.time() + 60}, "secret-1", algorithm="HS256", headers={"kid": "k9"})
+    for token in (legacy, foreign):
+        with pytest.raises(JWTError):
+            await make_manager(keyring).verify(token)
+
+
+@pytest.mark.asyncio
+async def test_key_rotation():
+    old = make_manager(Keyring({"k1": "secret-1"}, "k1"))
+    token = old.issue({"sub": "alice"})
+
+    # Yangi kalit faol, eskisi tekshirish uchun qoldirilgan
+    rotated = make_manager(Keyring({"k1": "secret-1", "k2": "secret-2"}, "k2"))
+    assert (await rotated.verify(token))["sub"] == "alice"
+    assert jwt.get_unverified_header(rotated.issue({"sub": "bob"}))["kid"] == "k2"
+
+    # Eski kalit olib tashlangach uning tokenlari o'tmaydi
+    with pytest.raises(JWTError):
+        await make_manager(Keyring({"k2": "secret-2"}, "k2")).verify(token)
+    with pytest.raises(ValueError):
+        Keyring({"k1": "secret-1"}, "k2")
+
+
+@pytest.mark.asyncio
+async def test_revocation_is_shared_through_redis(setup_redis):
+    keyring = Keyring({"k1": "secret-1"}, "k1")
+    worker_a, worker_b = make_manager(keyring), make_manager(keyring, cache_ttl=0)
+    token = worker_a.issue({"sub": "alice"})
+    claims = await worker_a.verify(token)
+    await worker_b.verify(token)
+
+    assert await worker_a.revoke(claims)
+    assert await setup_redis.ttl(f"auth:revoked:{claims['jti']}") > 3500
+    # Bekor qilgan worker keshdagi tokenni ham darhol rad etadi, boshqasi Redis dan biladi
+    for worker in (worker_a, worker_b):
+        with pytest.raises(JWTError):
+            await worker.verify(token)
+
+
+@pytest.mark.asyncio
+async def test_denylist_skipped_while_redis_is_down(monkeypatch, caplog):
+    """Redis xatosidan keyin retry oynasida denylist so'ralmaydi va log bir marta"""
+    from fastapi_limiter import FastAPILimiter
+    from redis.exceptions import ConnectionError
+
+    class DownRedis:
+        calls = 0
+
+        async def exists(self, key):
+            DownRedis.calls += 1
+            raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(FastAPILimiter, "redis", DownRedis())
+    manager = make_manager(Keyring({"k1": "secret-1"}, "k1"), cache_size=0, redis_retry=60)
+    with caplog.at_level("WARNING", logger="app.utils.tokens"):
+        for _ in range(3):
+            assert (await manager.verify(manager.issue({"sub": "alice"})))["sub"] == "alice"
+    assert DownRedis.calls == 1
+    assert len([record for record in caplog.records if record.name == "app.utils.tokens"]) == 1